@@ -109,6 +109,7 @@ from maasserver.storage_layouts import (
 from maasserver.utils.django_urls import reverse
 from maasserver.utils.orm import (
     get_first,
+    get_first_skip_locked,
     reload_object,
 )
 from piston3.utils import rc
@@ -2190,94 +2191,101 @@ class MachinesHandler(NodesHandler, PowersMixin):
         if not form.is_valid():
             raise MAASAPIValidationError(form.errors)
 
-        # This lock prevents a machine we've picked as available from
-        # becoming unavailable before our transaction commits.
-        with locks.node_acquire:
-            machines = (
-                self.base_model.objects.get_available_machines_for_acquisition(
-                    request.user)
-                )
-            machines, storage, interfaces = form.filter_nodes(machines)
+        machines = (
+            self.base_model.objects.get_available_machines_for_acquisition(
+                request.user)
+            )
+        machines, storage, interfaces = form.filter_nodes(machines)
+        if dry_run:
             machine = get_first(machines)
-            if machine is None:
-                cores = form.cleaned_data.get('cpu_count')
-                if cores is not None:
-                    cores = int(cores)
-                memory = form.cleaned_data.get('mem')
-                if memory is not None:
-                    memory = int(memory)
-                architecture = None
-                architectures = form.cleaned_data.get('arch')
-                if architectures is not None:
-                    architecture = (
-                        None if len(architectures) == 0
-                        else min(architectures))
-                storage = form.cleaned_data.get('storage')
-                interfaces = form.cleaned_data.get('interfaces')
-                data = {
-                    "cores": cores,
-                    "memory": memory,
-                    "architecture": architecture,
-                    "storage": storage,
-                    "interfaces": interfaces,
-                }
-                pods = Pod.objects.get_pods(
-                    request.user, PodPermission.dynamic_compose)
-                if zone is not None:
-                    pods = pods.filter(zone__name=zone)
-                if pods:
+        else:
+            # Lock the cheapest machine that no concurrent allocation has
+            # already locked, so that it cannot become unavailable before our
+            # transaction commits. Concurrent allocations each get a different
+            # machine rather than contending for the same one.
+            machine = get_first_skip_locked(machines)
+        if machine is None:
+            cores = form.cleaned_data.get('cpu_count')
+            if cores is not None:
+                cores = int(cores)
+            memory = form.cleaned_data.get('mem')
+            if memory is not None:
+                memory = int(memory)
+            architecture = None
+            architectures = form.cleaned_data.get('arch')
+            if architectures is not None:
+                architecture = (
+                    None if len(architectures) == 0
+                    else min(architectures))
+            storage = form.cleaned_data.get('storage')
+            interfaces = form.cleaned_data.get('interfaces')
+            data = {
+                "cores": cores,
+                "memory": memory,
+                "architecture": architecture,
+                "storage": storage,
+                "interfaces": interfaces,
+            }
+            pods = Pod.objects.get_pods(
+                request.user, PodPermission.dynamic_compose)
+            if zone is not None:
+                pods = pods.filter(zone__name=zone)
+            if pods:
+                # This lock prevents concurrent allocations from composing
+                # machines from the same pod resources.
+                with locks.node_acquire:
                     machine, storage, interfaces = (
                         get_allocated_composed_machine(
                             request, data, storage, interfaces, pods, form,
                             input_constraints)
                     )
 
-            if machine is None:
-                constraints = form.describe_constraints()
-                if constraints == '':
-                    # No constraints. That means no machines at all were
-                    # available.
-                    message = "No machine available."
-                else:
-                    message = (
-                        'No available machine matches constraints: %s '
-                        '(resolved to "%s")' % (
-                            str(input_constraints), constraints))
-                raise NodesNotAvailable(message)
-            if not dry_run:
-                machine.acquire(
-                    request.user, get_oauth_token(request),
-                    agent_name=options.agent_name, comment=options.comment,
-                    bridge_all=options.bridge_all,
-                    bridge_stp=options.bridge_stp, bridge_fd=options.bridge_fd)
-            machine.constraint_map = storage.get(machine.id, {})
-            machine.constraints_by_type = {}
-            # Need to get the interface constraints map into the proper format
-            # to return it here.
-            # Backward compatibility: provide the storage constraints in both
-            # formats.
-            if len(machine.constraint_map) > 0:
-                machine.constraints_by_type['storage'] = {}
-                new_storage = machine.constraints_by_type['storage']
-                # Convert this to the "new style" constraints map format.
-                for storage_key in machine.constraint_map:
-                    # Each key in the storage map is actually a value which
-                    # contains the ID of the matching storage device.
-                    # Convert this to a label: list-of-matches format, to
-                    # match how the constraints will be done going forward.
-                    new_key = machine.constraint_map[storage_key]
-                    matches = new_storage.get(new_key, [])
-                    matches.append(storage_key)
-                    new_storage[new_key] = matches
-            if len(interfaces) > 0:
-                machine.constraints_by_type['interfaces'] = {
-                    label: interfaces.get(label, {}).get(machine.id)
-                    for label in interfaces
-                }
-            if verbose:
-                machine.constraints_by_type['verbose_storage'] = storage
-                machine.constraints_by_type['verbose_interfaces'] = interfaces
-            return machine
+        if machine is None:
+            constraints = form.describe_constraints()
+            if constraints == '':
+                # No constraints. That means no machines at all were
+                # available.
+                message = "No machine available."
+            else:
+                message = (
+                    'No available machine matches constraints: %s '
+                    '(resolved to "%s")' % (
+                        str(input_constraints), constraints))
+            raise NodesNotAvailable(message)
+        if not dry_run:
+            machine.acquire(
+                request.user, get_oauth_token(request),
+                agent_name=options.agent_name, comment=options.comment,
+                bridge_all=options.bridge_all,
+                bridge_stp=options.bridge_stp, bridge_fd=options.bridge_fd)
+        machine.constraint_map = storage.get(machine.id, {})
+        machine.constraints_by_type = {}
+        # Need to get the interface constraints map into the proper format
+        # to return it here.
+        # Backward compatibility: provide the storage constraints in both
+        # formats.
+        if len(machine.constraint_map) > 0:
+            machine.constraints_by_type['storage'] = {}
+            new_storage = machine.constraints_by_type['storage']
+            # Convert this to the "new style" constraints map format.
+            for storage_key in machine.constraint_map:
+                # Each key in the storage map is actually a value which
+                # contains the ID of the matching storage device.
+                # Convert this to a label: list-of-matches format, to
+                # match how the constraints will be done going forward.
+                new_key = machine.constraint_map[storage_key]
+                matches = new_storage.get(new_key, [])
+                matches.append(storage_key)
+                new_storage[new_key] = matches
+        if len(interfaces) > 0:
+            machine.constraints_by_type['interfaces'] = {
+                label: interfaces.get(label, {}).get(machine.id)
+                for label in interfaces
+            }
+        if verbose:
+            machine.constraints_by_type['verbose_storage'] = storage
+            machine.constraints_by_type['verbose_interfaces'] = interfaces
+        return machine
 
     @admin_method
     @operation(idempotent=False)
@@ -63,11 +63,15 @@ from maasserver.testing.fixtures import RBACEnabled
 from maasserver.testing.matchers import HasStatusCode
 from maasserver.testing.osystems import make_usable_osystem
 from maasserver.testing.testclient import MAASSensibleOAuthClient
-from maasserver.utils import ignore_unused
+from maasserver.utils import (
+    ignore_unused,
+    orm,
+)
 from maasserver.utils.django_urls import reverse
 from maasserver.utils.orm import reload_object
 from maastesting.djangotestcase import count_queries
 from maastesting.matchers import (
+    MockCalledOnce,
     MockCalledOnceWith,
     MockCalledWith,
     MockNotCalled,
@@ -1163,16 +1167,22 @@ class TestMachinesAPI(APITestCase.ForUser):
         machine = Machine.objects.get(system_id=machine.system_id)
         self.assertEqual(self.user, machine.owner)
 
-    def test_POST_allocate_uses_machine_acquire_lock(self):
-        # The "allocate" operation allocates the machine it returns.
+    def test_POST_allocate_locks_machine_skipping_locked_machines(self):
+        # The "allocate" operation locks the machine it returns, skipping
+        # those locked by concurrent allocations, rather than serialising
+        # all allocations with the machine acquire lock.
         available_status = NODE_STATUS.READY
         factory.make_Node(
             status=available_status, owner=None, with_boot_disk=True)
         machine_acquire = self.patch(machines_module.locks, 'node_acquire')
-        self.client.post(reverse('machines_handler'), {'op': 'allocate'})
-        self.assertThat(machine_acquire.__enter__, MockCalledOnceWith())
-        self.assertThat(
-            machine_acquire.__exit__, MockCalledOnceWith(None, None, None))
+        get_first_skip_locked = self.patch(
+            machines_module, 'get_first_skip_locked')
+        get_first_skip_locked.side_effect = orm.get_first_skip_locked
+        response = self.client.post(
+            reverse('machines_handler'), {'op': 'allocate'})
+        self.assertThat(response, HasStatusCode(http.client.OK))
+        self.assertThat(get_first_skip_locked, MockCalledOnce())
+        self.assertThat(machine_acquire.__enter__, MockNotCalled())
 
     def test_POST_allocate_sets_agent_name(self):
         available_status = NODE_STATUS.READY
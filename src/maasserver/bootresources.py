@@ -4,6 +4,8 @@
 """Boot Resources."""
 
 __all__ = [
+    "BootResourceFileCache",
+    "BootResourceFilesResource",
     "ensure_boot_source_definition",
     "get_simplestream_endpoint",
     "ImportResourcesProgressService",
@@ -15,9 +17,12 @@ __all__ = [
 ]
 
 from datetime import timedelta
+import hashlib
 from operator import itemgetter
 import os
+import queue
 from subprocess import CalledProcessError
+import tempfile
 from textwrap import dedent
 import threading
 import time
@@ -93,6 +98,7 @@ from provisioningserver.logger import (
     get_maas_logger,
     LegacyLogger,
 )
+from provisioningserver.path import get_data_path
 from provisioningserver.rpc.cluster import (
     ListBootImages,
     ListBootImagesV2,
@@ -102,6 +108,8 @@ from provisioningserver.utils.fs import tempdir
 from provisioningserver.utils.shell import ExternalProcessError
 from provisioningserver.utils.twisted import (
     asynchronous,
+    callOut,
+    DeferredValue,
     FOREVER,
     pause,
     synchronous,
@@ -119,9 +127,16 @@ from twisted.internet.defer import (
     Deferred,
     DeferredList,
     inlineCallbacks,
+    succeed,
 )
 from twisted.protocols.amp import UnhandledCommand
 from twisted.python.failure import Failure
+from twisted.web.resource import (
+    NoResource,
+    Resource,
+)
+from twisted.web.server import NOT_DONE_YET
+from twisted.web.static import File
 
 
 maaslog = get_maas_logger("bootresources")
@@ -350,21 +365,8 @@ class SimpleStreamsHandler:
     def files_handler(
             self, request, os, arch, subarch, series, version, filename):
         """Handles requests for getting the boot resource data."""
-        if os == "custom":
-            name = series
-        else:
-            name = '%s/%s' % (os, series)
-        arch = '%s/%s' % (arch, subarch)
-        resource = get_object_or_404(
-            BootResource, name=name, architecture=arch)
-        try:
-            resource_set = resource.sets.get(version=version)
-        except BootResourceSet.DoesNotExist:
-            raise Http404()
-        try:
-            rfile = resource_set.files.get(filename=filename)
-        except BootResourceFile.DoesNotExist:
-            raise Http404()
+        rfile = get_boot_resource_file(
+            os, arch, subarch, series, version, filename)
         response = StreamingHttpResponse(
             ConnectionWrapper(rfile.largefile.content),
             content_type='application/octet-stream')
@@ -372,6 +374,187 @@ class SimpleStreamsHandler:
         return response
 
 
+def get_boot_resource_file(os, arch, subarch, series, version, filename):
+    """Return the `BootResourceFile` for a simplestreams file path.
+
+    :raise Http404: When the file does not exist.
+    """
+    if os == "custom":
+        name = series
+    else:
+        name = '%s/%s' % (os, series)
+    arch = '%s/%s' % (arch, subarch)
+    resource = get_object_or_404(
+        BootResource, name=name, architecture=arch)
+    try:
+        resource_set = resource.sets.get(version=version)
+    except BootResourceSet.DoesNotExist:
+        raise Http404()
+    try:
+        return resource_set.files.get(filename=filename)
+    except BootResourceFile.DoesNotExist:
+        raise Http404()
+
+
+class BootResourceFileCache:
+    """On-disk cache of `LargeFile` content, keyed by its SHA256.
+
+    Streaming a boot resource out of the database holds a database
+    connection for the whole download. Instead the content is copied to disk
+    once per region and served from there to every rack.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = get_data_path('/var/lib/maas/image-cache')
+        self.path = path
+        self._filling = {}
+
+    def get_path(self, sha256):
+        """Return the path of the cached content for `sha256`."""
+        return os.path.join(self.path, sha256)
+
+    def has_file(self, sha256, size):
+        """Return True if the content for `sha256` is in the cache."""
+        try:
+            return os.stat(self.get_path(sha256)).st_size == size
+        except FileNotFoundError:
+            return False
+
+    @asynchronous
+    def ensure_file(self, sha256, size):
+        """Return a `Deferred` that fires with the path of the cached content
+        for `sha256`, copying it out of the database if needed.
+
+        Concurrent requests for the same content share one copy.
+        """
+        if self.has_file(sha256, size):
+            return succeed(self.get_path(sha256))
+        value = self._filling.get(sha256)
+        if value is None:
+            value = self._filling[sha256] = DeferredValue()
+            d = deferToDatabase(self.fill, sha256)
+            d.addBoth(callOut, self._filling.pop, sha256)
+            value.capture(d)
+        return value.get()
+
+    @synchronous
+    @transactional
+    def fill(self, sha256):
+        """Copy the content for `sha256` from the database into the cache.
+
+        :raise Http404: When the content does not exist or is incomplete.
+        """
+        largefile = LargeFile.objects.get_file(sha256)
+        if largefile is None or not largefile.complete:
+            raise Http404()
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix='.' + sha256)
+        try:
+            digest = hashlib.sha256()
+            with os.fdopen(fd, 'wb') as output:
+                with largefile.content.open('rb') as stream:
+                    for data in stream:
+                        digest.update(data)
+                        output.write(data)
+            if digest.hexdigest() != sha256:
+                raise IOError(
+                    "Content of %s does not match its SHA256." % largefile)
+            os.rename(tmp_path, self.get_path(sha256))
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        # Every region fills its own cache, so each also removes the content
+        # of files deleted since, such as those of replaced images, as new
+        # content arrives.
+        self.prune(LargeFile.objects.values_list('sha256', flat=True))
+        return self.get_path(sha256)
+
+    def prune(self, keep):
+        """Remove all cached content whose SHA256 is not in `keep`."""
+        keep = set(keep)
+        try:
+            filenames = os.listdir(self.path)
+        except FileNotFoundError:
+            return
+        for filename in filenames:
+            if filename.startswith('.') or filename in keep:
+                continue
+            try:
+                os.unlink(os.path.join(self.path, filename))
+            except FileNotFoundError:
+                pass
+
+
+class BootResourceFileResource(Resource):
+    """Serves a single boot resource file from the `BootResourceFileCache`.
+
+    The file is served by `twisted.web.static.File`, which supports HTTP
+    range requests, so no database connection is held during the download.
+    """
+
+    isLeaf = True
+
+    def __init__(self, cache):
+        super(BootResourceFileResource, self).__init__()
+        self.cache = cache
+
+    @transactional
+    def get_largefile_info(self, path):
+        """Return (sha256, total_size) for the file at `path`."""
+        rfile = get_boot_resource_file(*path)
+        return rfile.largefile.sha256, rfile.largefile.total_size
+
+    def render_GET(self, request):
+        path = [
+            element.decode("utf-8")
+            for element in request.prepath[-1:] + request.postpath
+        ]
+        if len(path) != 6:
+            return NoResource().render(request)
+
+        def serve(cache_path):
+            output = File(
+                cache_path, defaultType="application/octet-stream").render(
+                request)
+            if output is not NOT_DONE_YET:
+                request.write(output)
+                request.finish()
+
+        def failed(failure):
+            if failure.check(Http404):
+                request.write(NoResource().render(request))
+            else:
+                log.err(failure, "Failed to serve boot resource file.")
+                request.setResponseCode(500)
+            request.finish()
+
+        d = deferToDatabase(self.get_largefile_info, path)
+        d.addCallback(lambda info: self.cache.ensure_file(*info))
+        d.addCallback(serve)
+        d.addErrback(failed)
+        return NOT_DONE_YET
+
+    render_HEAD = render_GET
+
+
+class BootResourceFilesResource(Resource):
+    """Serves boot resource files under `images-stream`.
+
+    Requests for the simplestreams indexes under `streams` are left to
+    `simplestreams_stream_handler` in the Django application.
+    """
+
+    def __init__(self, cache):
+        super(BootResourceFilesResource, self).__init__()
+        self.fileResource = BootResourceFileResource(cache)
+
+    def getChild(self, path, request):
+        if path == b'streams':
+            return NoResource()
+        return self.fileResource
+
+
 def simplestreams_stream_handler(request, filename):
     handler = SimpleStreamsHandler()
     return handler.streams_handler(request, filename)
@@ -384,6 +567,37 @@ def simplestreams_file_handler(
         request, os, arch, subarch, series, version, filename)
 
 
+class BackgroundChecksummer:
+    """Feeds data to a checksummer from a separate thread.
+
+    `hashlib` releases the GIL while hashing large buffers, so the checksum
+    is calculated while the next chunk is being read and written.
+    """
+
+    def __init__(self, cksummer, max_pending=2):
+        self.cksummer = cksummer
+        self._pending = queue.Queue(max_pending)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            buf = self._pending.get()
+            if buf is None:
+                break
+            self.cksummer.update(buf)
+
+    def update(self, buf):
+        """Queue `buf` to be added to the checksum."""
+        self._pending.put(buf)
+
+    def finish(self):
+        """Wait for all queued data to be hashed; return the checksummer."""
+        self._pending.put(None)
+        self._thread.join()
+        return self.cksummer
+
+
 class BootResourceStore(ObjectStore):
     """Stores the simplestream data into the `BootResource` model.
 
@@ -419,6 +633,12 @@ class BootResourceStore(ObjectStore):
     # Read at 10MiB per chunk.
     read_size = 1024 * 1024 * 10
 
+    # Commit the written content and its size after at most 200MiB or 10
+    # seconds, whichever comes first. Committing less often cuts down on the
+    # per-transaction overhead; committing at all keeps progress reporting.
+    commit_size = 1024 * 1024 * 200
+    commit_interval = 10
+
     def __init__(self):
         """Initialize store."""
         self.cache_current_resources()
@@ -752,8 +972,8 @@ class BootResourceStore(ObjectStore):
             return rfile, ident
 
         rfile, ident = get_rfile_and_ident()
-        cksummer = sutil.checksummer(
-            {'sha256': rfile.largefile.sha256})
+        hasher = BackgroundChecksummer(
+            sutil.checksummer({'sha256': rfile.largefile.sha256}))
         log.debug("Finalizing boot image {ident}.", ident=ident)
 
         # Ensure that the size of the largefile starts at zero.
@@ -761,29 +981,41 @@ class BootResourceStore(ObjectStore):
         transactional(rfile.largefile.save)(update_fields=['size'])
 
         @transactional
-        def write_chunk():
-            """Write a chunk into the database with a transaction per trunk.
+        def write_batch():
+            """Write a batch of chunks into the database in one transaction.
 
-            This ensures that the content and the size is committed into the
-            database per chunk. This makes the process be reported correctly.
+            The large object is opened once and chunks are written to it
+            until `commit_size` bytes have been written or `commit_interval`
+            seconds have passed. The content and the size are then committed
+            together, so the progress is still reported correctly.
             """
+            written, done = 0, False
+            started = time.monotonic()
             with rfile.largefile.content.open('wb') as stream:
-                buf = reader.read(self.read_size)
                 stream.seek(0, 2)
-                stream.write(buf)
-                cksummer.update(buf)
-                buf_len = len(buf)
-                rfile.largefile.size += buf_len
-                rfile.largefile.save(update_fields=['size'])
-                if buf_len != self.read_size:
-                    return True
-                else:
-                    return False
-
-        # Write chunks until it says its done.
-        while not self._cancel_finalize:
-            if write_chunk():
-                break
+                while not self._cancel_finalize:
+                    buf = reader.read(self.read_size)
+                    stream.write(buf)
+                    hasher.update(buf)
+                    written += len(buf)
+                    if len(buf) != self.read_size:
+                        done = True
+                        break
+                    elif written >= self.commit_size:
+                        break
+                    elif time.monotonic() - started >= self.commit_interval:
+                        break
+            rfile.largefile.size += written
+            rfile.largefile.save(update_fields=['size'])
+            return done
+
+        # Write batches until it says its done.
+        try:
+            while not self._cancel_finalize:
+                if write_batch():
+                    break
+        finally:
+            cksummer = hasher.finish()
 
         # Don't check the checksum if finalization was cancelled.
         if self._cancel_finalize:
@@ -809,35 +1041,42 @@ class BootResourceStore(ObjectStore):
     def perform_write(self):
         """Performs all writing of content into the object storage.
 
-        This method will spawn threads to perform the writing. Maximum of
-        `write_threads` will be running at once."""
-        threads = []
-        while True:
-            # Update list to only those that are still running.
-            threads = [thread for thread in threads if thread.isAlive()]
-            if len(threads) >= self.write_threads:
-                # Cannot start any more threads as the maximum is already
-                # running. Lets wait a second and try again.
-                time.sleep(1)
-                continue
+        This method will spawn `write_threads` threads. Each one takes the
+        next queued resource file as soon as it has finished the previous
+        one, so independent files are finalized in parallel."""
+        lock = threading.Lock()
 
-            if self._cancel_finalize or len(self._content_to_finalize) == 0:
-                # No more threads to spawn because the finalization has been
-                # cancelled or all of the content has been de-queued. Wait for
-                # all the remaining running threads to finish.
-                for thread in threads:
-                    thread.join()
-                break
-
-            # Spawn a writer thread with a resource file and reader from
-            # the queue of content to be saved.
-            rid, reader = self._content_to_finalize.popitem()
-            # FIXME: Use deferToDatabase and the coiterator if possible.
-            thread = threading.Thread(
-                target=self.write_content_thread,
-                args=(rid, reader))
+        def get_next_content():
+            with lock:
+                if (self._cancel_finalize or
+                        len(self._content_to_finalize) == 0):
+                    return None
+                else:
+                    return self._content_to_finalize.popitem()
+
+        def write_all_content():
+            while True:
+                content = get_next_content()
+                if content is None:
+                    break
+                rid, reader = content
+                try:
+                    self.write_content_thread(rid, reader)
+                except Exception:
+                    # Keep going with the remaining files; this one will be
+                    # written again on the next import.
+                    log.err(None, "Failed to finalize boot image.")
+
+        # FIXME: Use deferToDatabase and the coiterator if possible.
+        threads = [
+            threading.Thread(target=write_all_content)
+            for _ in range(
+                min(self.write_threads, len(self._content_to_finalize)))
+        ]
+        for thread in threads:
             thread.start()
-            threads.append(thread)
+        for thread in threads:
+            thread.join()
 
     def _other_resources_exists(self, os, arch, subarch, series):
         """Return `True` when simplestreams provided an image with the same
@@ -84,6 +84,23 @@ from twisted.protocols import amp
 log = LegacyLogger()
 
 
+def get_shared(cache, key, make, *args):
+    """Return the result of `make(*args)`, shared through `cache`.
+
+    DHCP configurations for several rack controllers are often computed
+    together, and racks serving the same VLANs need many of the same pieces
+    of configuration. Those are computed once and kept in `cache`, a dict
+    that lives only as long as that pass. When `cache` is `None` this calls
+    `make` every time.
+    """
+    if cache is None:
+        return make(*args)
+    try:
+        return cache[key]
+    except KeyError:
+        return cache.setdefault(key, make(*args))
+
+
 def get_omapi_key():
     """Return the OMAPI key for all DHCP servers that are ran by MAAS."""
     key = Config.objects.get_config("omapi_key")
@@ -401,12 +418,14 @@ def make_pools_for_subnet(subnet, failover_peer=None):
 def make_subnet_config(
         rack_controller, subnet, default_dns_servers: Optional[list],
         ntp_servers: Union[list, dict], default_domain, search_list=None,
-        failover_peer=None, subnets_dhcp_snippets: list=None, peer_rack=None):
+        failover_peer=None, subnets_dhcp_snippets: list=None, peer_rack=None,
+        cache=None):
     """Return DHCP subnet configuration dict for a rack interface.
 
     :param ntp_servers: Either a list of NTP server addresses or hostnames to
         include in DHCP responses, or a dict; if the latter, it ought to match
         the output from `get_ntp_server_addresses_for_rack`.
+    :param cache: See `get_shared`.
     """
     ip_network = subnet.get_ipnetwork()
     if subnet.dns_servers is not None and len(subnet.dns_servers) > 0:
@@ -428,9 +447,12 @@ def make_subnet_config(
             '' if not subnet.gateway_ip
             else str(subnet.gateway_ip)),
         'dns_servers': dns_servers,
-        'ntp_servers': get_ntp_servers(ntp_servers, subnet, peer_rack),
+        'ntp_servers': get_ntp_servers(
+            ntp_servers, subnet, peer_rack, cache),
         'domain_name': default_domain.name,
-        'pools': make_pools_for_subnet(subnet, failover_peer),
+        'pools': get_shared(
+            cache, ("pools", subnet.id, failover_peer),
+            make_pools_for_subnet, subnet, failover_peer),
         'dhcp_snippets': [
             make_dhcp_snippet(dhcp_snippet)
             for dhcp_snippet in subnets_dhcp_snippets
@@ -465,7 +487,7 @@ def make_failover_peer_config(vlan, rack_controller):
     )
 
 
-def get_ntp_servers(ntp_servers, subnet, peer_rack):
+def get_ntp_servers(ntp_servers, subnet, peer_rack, cache=None):
     """Return the list of NTP servers, based on the initial input list of
     servers or dictionary, the subnet the servers will be advertised on,
     and the peer rack controller (if present).
@@ -481,7 +503,9 @@ def get_ntp_servers(ntp_servers, subnet, peer_rack):
             return []
         else:
             if peer_rack is not None:
-                alternates = get_ntp_server_addresses_for_rack(peer_rack)
+                alternates = get_shared(
+                    cache, ("ntp_servers", peer_rack.id),
+                    get_ntp_server_addresses_for_rack, peer_rack)
                 alternate_ntp_server = alternates.get(space_address_family)
                 if alternate_ntp_server is not None:
                     return [ntp_server, alternate_ntp_server]
@@ -562,8 +586,11 @@ def get_default_dns_servers(rack_controller, subnet, use_rack_proxy=True):
 def get_dhcp_configure_for(
         ip_version: int, rack_controller, vlan, subnets: list,
         ntp_servers: Union[list, dict], domain, search_list=None,
-        dhcp_snippets: Iterable=None, use_rack_proxy=True):
-    """Get the DHCP configuration for `ip_version`."""
+        dhcp_snippets: Iterable=None, use_rack_proxy=True, cache=None):
+    """Get the DHCP configuration for `ip_version`.
+
+    :param cache: See `get_shared`.
+    """
     # Select the best interface for this VLAN. This is an interface that
     # at least has an IP address.
     interfaces = get_interfaces_with_ip_on_vlan(
@@ -598,26 +625,73 @@ def get_dhcp_configure_for(
             make_subnet_config(
                 rack_controller, subnet, maas_dns_servers, ntp_servers,
                 domain, search_list, peer_name, subnets_dhcp_snippets,
-                peer_rack))
+                peer_rack, cache))
 
-    # Generate the hosts for all subnets.
-    hosts = make_hosts_for_subnets(subnets, nodes_dhcp_snippets)
+    # Generate the hosts for all subnets. These are the same for every rack
+    # controller serving this VLAN.
+    hosts = get_shared(
+        cache, ("hosts", ip_version, vlan.id),
+        make_hosts_for_subnets, subnets, nodes_dhcp_snippets)
     return (
         peer_config, sorted(subnet_configs, key=itemgetter("subnet")),
         hosts, None if interface is None else interface.name)
 
 
+def make_global_dhcp_snippets(dhcp_snippets):
+    """Return the global DHCP snippets, those for no node or subnet."""
+    return [
+        make_dhcp_snippet(dhcp_snippet)
+        for dhcp_snippet in dhcp_snippets
+        if dhcp_snippet.node is None and dhcp_snippet.subnet is None
+        ]
+
+
+def get_external_ntp_servers():
+    """Return the external NTP servers, if only those are to be used.
+
+    :return: A list of NTP servers, or `None` if the rack controllers should
+        each be used as the NTP server instead.
+    """
+    if Config.objects.get_config("ntp_external_only"):
+        ntp_servers = Config.objects.get_config("ntp_servers")
+        return list(split_string_list(ntp_servers))
+    else:
+        return None
+
+
+def get_default_domain_and_search_list():
+    """Return the default domain and the DNS search list to use with it."""
+    default_domain = Domain.objects.get_default_domain()
+    search_list = [default_domain.name] + [
+        name
+        for name in sorted(get_dns_search_paths())
+        if name != default_domain.name
+    ]
+    return default_domain, search_list
+
+
 @synchronous
 @transactional
-def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
+def get_dhcp_configuration(
+        rack_controller, test_dhcp_snippet=None, cache=None):
     """Return tuple with IPv4 and IPv6 configurations for the
-    rack controller."""
+    rack controller.
+
+    :param cache: A dict in which to share the parts of the configuration
+        that do not depend on `rack_controller` with other calls in the same
+        pass. See `get_shared`. It's ignored when testing a DHCP snippet.
+    """
+    if test_dhcp_snippet is not None:
+        cache = None
+
     # Get list of all vlans that are being managed by the rack controller.
     vlans = gen_managed_vlans_for(rack_controller)
 
     # Group the subnets on each VLAN into IPv4 and IPv6 subnets.
     vlan_subnets = {
-        vlan: split_managed_ipv4_ipv6_subnets(vlan.subnet_set.all())
+        vlan: get_shared(
+            cache, ("subnets", vlan.id), split_managed_ipv4_ipv6_subnets,
+            vlan.subnet_set.all())
         for vlan in vlans
     }
 
@@ -625,7 +699,9 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
     # 1 + (the number of DHCP snippets used in this VLAN) instead of
     # 1 + (the number of subnets in this VLAN) +
     #     (the number of nodes in this VLAN)
-    dhcp_snippets = DHCPSnippet.objects.filter(enabled=True)
+    dhcp_snippets = get_shared(
+        cache, "dhcp_snippets", list,
+        DHCPSnippet.objects.filter(enabled=True))
     # If we're testing a DHCP Snippet insert it into our list
     if test_dhcp_snippet is not None:
         dhcp_snippets = list(dhcp_snippets)
@@ -641,11 +717,9 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
         # disabled snippet
         if not replaced_snippet:
             dhcp_snippets.append(test_dhcp_snippet)
-    global_dhcp_snippets = [
-        make_dhcp_snippet(dhcp_snippet)
-        for dhcp_snippet in dhcp_snippets
-        if dhcp_snippet.node is None and dhcp_snippet.subnet is None
-        ]
+    global_dhcp_snippets = get_shared(
+        cache, "global_dhcp_snippets", make_global_dhcp_snippets,
+        dhcp_snippets)
 
     # Configure both DHCPv4 and DHCPv6 on the rack controller.
     failover_peers_v4 = []
@@ -659,29 +733,27 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
 
     # DNS can either go through the rack controller or directly to the
     # region controller.
-    use_rack_proxy = Config.objects.get_config('use_rack_proxy')
+    use_rack_proxy = get_shared(
+        cache, "use_rack_proxy", Config.objects.get_config, 'use_rack_proxy')
 
     # NTP configuration can get tricky...
-    ntp_external_only = Config.objects.get_config("ntp_external_only")
-    if ntp_external_only:
-        ntp_servers = Config.objects.get_config("ntp_servers")
-        ntp_servers = list(split_string_list(ntp_servers))
-    else:
-        ntp_servers = get_ntp_server_addresses_for_rack(rack_controller)
-
-    default_domain = Domain.objects.get_default_domain()
-    search_list = [default_domain.name] + [
-        name
-        for name in sorted(get_dns_search_paths())
-        if name != default_domain.name
-    ]
+    ntp_servers = get_shared(
+        cache, "external_ntp_servers", get_external_ntp_servers)
+    if ntp_servers is None:
+        ntp_servers = get_shared(
+            cache, ("ntp_servers", rack_controller.id),
+            get_ntp_server_addresses_for_rack, rack_controller)
+
+    default_domain, search_list = get_shared(
+        cache, "domain", get_default_domain_and_search_list)
     for vlan, (subnets_v4, subnets_v6) in vlan_subnets.items():
         # IPv4
         if len(subnets_v4) > 0:
             config = get_dhcp_configure_for(
                 4, rack_controller, vlan, subnets_v4, ntp_servers,
                 default_domain, search_list=search_list,
-                dhcp_snippets=dhcp_snippets, use_rack_proxy=use_rack_proxy)
+                dhcp_snippets=dhcp_snippets, use_rack_proxy=use_rack_proxy,
+                cache=cache)
             failover_peer, subnets, hosts, interface = config
             if failover_peer is not None:
                 failover_peers_v4.append(failover_peer)
@@ -698,7 +770,8 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
             config = get_dhcp_configure_for(
                 6, rack_controller, vlan, subnets_v6,
                 ntp_servers, default_domain, search_list=search_list,
-                dhcp_snippets=dhcp_snippets, use_rack_proxy=use_rack_proxy)
+                dhcp_snippets=dhcp_snippets, use_rack_proxy=use_rack_proxy,
+                cache=cache)
             failover_peer, subnets, hosts, interface = config
             if failover_peer is not None:
                 failover_peers_v6.append(failover_peer)
@@ -719,7 +792,7 @@ def get_dhcp_configuration(rack_controller, test_dhcp_snippet=None):
     return DHCPConfigurationForRack(
         failover_peers_v4, shared_networks_v4, hosts_v4, interfaces_v4,
         failover_peers_v6, shared_networks_v6, hosts_v6, interfaces_v6,
-        get_omapi_key(), global_dhcp_snippets)
+        get_shared(cache, "omapi_key", get_omapi_key), global_dhcp_snippets)
 
 
 DHCPConfigurationForRack = namedtuple("DHCPConfigurationForRack", (
@@ -730,9 +803,11 @@ DHCPConfigurationForRack = namedtuple("DHCPConfigurationForRack", (
 
 @asynchronous
 @inlineCallbacks
-def configure_dhcp(rack_controller):
+def configure_dhcp(rack_controller, cache=None):
     """Write the DHCP configuration files and restart the DHCP servers.
 
+    :param cache: A dict shared between the racks configured in one pass;
+        see `get_dhcp_configuration`.
     :raises: :py:class:`~.exceptions.NoConnectionsAvailable` when there
         are no open connections to the specified cluster controller.
     """
@@ -748,7 +823,8 @@ def configure_dhcp(rack_controller):
     client = yield getClientFor(rack_controller.system_id)
 
     # Get configuration for both IPv4 and IPv6.
-    config = yield deferToDatabase(get_dhcp_configuration, rack_controller)
+    config = yield deferToDatabase(
+        get_dhcp_configuration, rack_controller, cache=cache)
 
     # Fix interfaces to go over the wire.
     interfaces_v4 = [
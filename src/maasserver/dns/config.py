@@ -30,10 +30,12 @@ from netaddr import IPAddress
 from provisioningserver.dns.actions import (
     bind_reload,
     bind_reload_with_retries,
+    bind_reload_zones,
     bind_write_configuration,
     bind_write_options,
     bind_write_zones,
 )
+from provisioningserver.dns.config import forget_written_content
 from provisioningserver.logger import get_maas_logger
 
 
@@ -60,9 +62,15 @@ def dns_update_all_zones(reload_retry=False):
     Serving these zone files means updating BIND's configuration to include
     them, then asking it to load the new configuration.
 
+    Only zone files whose records have changed are rewritten. If BIND's
+    configuration is unchanged, only those zones are reloaded; otherwise
+    BIND reloads everything.
+
     :param reload_retry: Should the DNS server reload be retried in case
         of failure? Defaults to `False`.
     :type reload_retry: bool
+    :return: The current serial and the names of the domains that were
+        published with it, or `None` if DNS is not enabled.
     """
     if not is_dns_enabled():
         return
@@ -74,14 +82,14 @@ def dns_update_all_zones(reload_retry=False):
     zones = ZoneGenerator(
         domains, subnets, default_ttl,
         serial, internal_domains=[get_internal_domain()]).as_list()
-    bind_write_zones(zones)
+    written_zones = bind_write_zones(zones)
 
     # We should not be calling bind_write_options() here; call-sites should be
     # making a separate call. It's a historical legacy, where many sites now
     # expect this side-effect from calling dns_update_all_zones_now(), and
     # some that call it for this side-effect alone. At present all it does is
     # set the upstream DNS servers, nothing to do with serving zones at all!
-    bind_write_options(
+    options_changed = bind_write_options(
         upstream_dns=get_upstream_dns(),
         dnssec_validation=get_dnssec_validation())
 
@@ -89,21 +97,32 @@ def dns_update_all_zones(reload_retry=False):
     # recursive queries to the upstream DNS servers. Again, this is legacy,
     # where the "trusted" ACL ended up in the same configuration file as the
     # zone stanzas, and so both need to be rewritten at the same time.
-    bind_write_configuration(zones, trusted_networks=get_trusted_networks())
+    configuration_changed = bind_write_configuration(
+        zones, trusted_networks=get_trusted_networks())
 
     # Reloading with retries may be a legacy from Celery days, or it may be
     # necessary to recover from races during start-up. We're not sure if it is
     # actually needed but it seems safer to maintain this behaviour until we
     # have a better understanding.
     if reload_retry:
-        bind_reload_with_retries()
+        reloaded = bind_reload_with_retries()
+    elif options_changed or configuration_changed:
+        reloaded = bind_reload()
+    elif len(written_zones) != 0:
+        reloaded = bind_reload_zones(written_zones)
     else:
-        bind_reload()
-
-    # Return the current serial and list of domain names.
+        reloaded = True
+    if not reloaded:
+        # BIND may not have loaded what was written, so write and reload
+        # everything next time.
+        forget_written_content()
+
+    # Return the current serial and list of domain names. Zones that were
+    # not rewritten still have an earlier serial.
     return serial, [
         domain.name
         for domain in domains
+        if domain.name in written_zones
     ]
 
 
@@ -8,6 +8,7 @@ __all__ = []
 from argparse import ArgumentParser
 import random
 import time
+from unittest.mock import ANY
 
 from django.conf import settings
 import dns.resolver
@@ -37,7 +38,10 @@ from maasserver.models.dnspublication import DNSPublication
 from maasserver.testing.config import RegionConfigurationFixture
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockNotCalled,
+)
 from netaddr import IPAddress
 from provisioningserver.dns.commands import (
     get_named_conf,
@@ -384,6 +388,44 @@ class TestDNSConfigModifications(TestDNSServer):
             for domain in Domain.objects.filter(authoritative=True)
         ]))
 
+    def test_dns_update_all_zones_reloads_only_changed_zones(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        domain = factory.make_Domain()
+        node, static = self.create_node_with_static_ip(domain=domain)
+        dns_update_all_zones()
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload_zones = self.patch_autospec(
+            dns_config_module, "bind_reload_zones")
+        self.create_node_with_static_ip(domain=domain, subnet=static.subnet)
+        serial, domains = dns_update_all_zones()
+        self.assertThat(bind_reload, MockNotCalled())
+        self.assertThat(bind_reload_zones, MockCalledOnceWith(ANY))
+        [written_zones], _ = bind_reload_zones.call_args
+        self.assertIn(domain.name, written_zones)
+        self.assertEqual([domain.name], domains)
+
+    def test_dns_update_all_zones_does_not_reload_when_unchanged(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        self.create_node_with_static_ip()
+        dns_update_all_zones()
+        bind_reload = self.patch_autospec(dns_config_module, "bind_reload")
+        bind_reload_zones = self.patch_autospec(
+            dns_config_module, "bind_reload_zones")
+        dns_force_reload()
+        serial, domains = dns_update_all_zones()
+        self.assertThat(bind_reload, MockNotCalled())
+        self.assertThat(bind_reload_zones, MockNotCalled())
+        self.assertEqual([], domains)
+
+    def test_dns_update_all_zones_forgets_written_content_on_failure(self):
+        self.patch(settings, 'DNS_CONNECT', True)
+        self.patch_autospec(
+            dns_config_module, "bind_reload").return_value = False
+        forget_written_content = self.patch_autospec(
+            dns_config_module, "forget_written_content")
+        dns_update_all_zones()
+        self.assertThat(forget_written_content, MockCalledOnceWith())
+
 
 class TestDNSDynamicIPAddresses(TestDNSServer):
     """Allocated nodes with IP addresses in the dynamic range get a DNS
@@ -8,12 +8,16 @@ __all__ = [
     "PostgresListenerService",
     ]
 
-from collections import defaultdict
+from collections import (
+    defaultdict,
+    OrderedDict,
+)
 from contextlib import closing
 from errno import ENOENT
 
 from django.db import connections
 from django.db.utils import load_backend
+from maasserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.utils.enum import map_enum
 from provisioningserver.utils.twisted import (
     callOut,
@@ -85,13 +89,30 @@ class PostgresListenerService(Service, object):
     # notifications.
     HANDLE_NOTIFY_DELAY = 0.5
 
-    def __init__(self, alias="default"):
+    # Maximum number of notification handlers that are allowed to run at the
+    # same time.
+    HANDLE_NOTIFY_CONCURRENCY = 8
+
+    # When this many notifications are waiting to be handled the listener
+    # stops reading from the database connection; postgres holds any new
+    # notifications in its own queue. Reading resumes once the queue has
+    # drained to `NOTIFY_QUEUE_LOW_WATER`.
+    NOTIFY_QUEUE_HIGH_WATER = 10000
+    NOTIFY_QUEUE_LOW_WATER = 1000
+
+    def __init__(self, alias="default", prometheus_metrics=PROMETHEUS_METRICS):
         self.alias = alias
         self.listeners = defaultdict(list)
         self.autoReconnect = False
         self.connection = None
         self.connectionFileno = None
-        self.notifications = set()
+        self.readingPaused = False
+        # Maps (channel, payload) to the time the notification was first
+        # received. Duplicate notifications received before it is handled
+        # are coalesced into the first.
+        self.notifications = OrderedDict()
+        self.coalesceWindows = {}
+        self.prometheus_metrics = prometheus_metrics
         self.notifier = task.LoopingCall(self.handleNotifies)
         self.notifierDone = None
         self.connecting = None
@@ -178,11 +199,15 @@ class PostgresListenerService(Service, object):
                     else:
                         # Place non-system messages into the queue to be
                         # processed.
-                        self.notifications.add(
-                            (notify.channel, notify.payload))
+                        self.notifications.setdefault(
+                            (notify.channel, notify.payload),
+                            reactor.seconds())
                 # Delete the contents of the connection's notifies list so
                 # that we don't process them a second time.
                 del notifies[:]
+                self.updateQueueDepth()
+                if len(self.notifications) >= self.NOTIFY_QUEUE_HIGH_WATER:
+                    self.pauseReading()
 
     def fileno(self):
         """Return the fileno of the connection."""
@@ -190,11 +215,30 @@ class PostgresListenerService(Service, object):
 
     def startReading(self):
         """Add this listener to the reactor."""
+        self.readingPaused = False
         self.connectionFileno = self.connection.connection.fileno()
         reactor.addReader(self)
 
+    def pauseReading(self):
+        """Stop reading notifications until `resumeReading` is called."""
+        if not self.readingPaused:
+            self.readingPaused = True
+            reactor.removeReader(self)
+            self.log.warn(
+                "{count} database notifications are waiting to be handled; "
+                "pausing reading of new notifications.",
+                count=len(self.notifications))
+
+    def resumeReading(self):
+        """Resume reading notifications paused by `pauseReading`."""
+        if self.readingPaused:
+            self.readingPaused = False
+            if self.connectionFileno is not None:
+                reactor.addReader(self)
+
     def stopReading(self):
         """Remove this listener from the reactor."""
+        self.readingPaused = False
         try:
             reactor.removeReader(self)
         except IOError as error:
@@ -228,6 +272,18 @@ class PostgresListenerService(Service, object):
             # new channel on the already existing connection.
             self.registerChannel(channel)
 
+    def setCoalesceWindow(self, channel, seconds):
+        """Set the coalescing window for notifications on `channel`.
+
+        A notification is held for `seconds` after it is first received
+        before being handled, and any identical notification received in the
+        meantime is merged into it.
+        """
+        if seconds:
+            self.coalesceWindows[channel] = seconds
+        else:
+            self.coalesceWindows.pop(channel, None)
+
     def unregister(self, channel, handler):
         """Unregister listening for notifications from a channel.
 
@@ -407,17 +463,53 @@ class PostgresListenerService(Service, object):
         else:
             return succeed(None)
 
+    def updateQueueDepth(self):
+        """Record the number of notifications waiting to be handled."""
+        self.prometheus_metrics.update(
+            'db_notify_queue_depth', 'set', value=len(self.notifications))
+
+    def getReadyNotifications(self, clock=reactor):
+        """Return the notifications whose coalescing window has passed."""
+        now = clock.seconds()
+        return [
+            notification
+            for notification, received in self.notifications.items()
+            if now - received >= self.coalesceWindows.get(
+                notification[0].split('_', 1)[0], 0)
+        ]
+
     def handleNotifies(self, clock=reactor):
-        """Process all notify message in the notifications set."""
-        def gen_notifications(notifications):
-            while len(notifications) != 0:
-                yield notifications.pop()
-        return task.coiterate(
-            self.handleNotify(notification, clock=clock)
-            for notification in gen_notifications(self.notifications))
-
-    def handleNotify(self, notification, clock=reactor):
-        """Process a notify message in the notifications set."""
+        """Process all ready notify messages in the notifications queue.
+
+        Handlers are called by a pool of at most `HANDLE_NOTIFY_CONCURRENCY`
+        workers, so a burst of notifications cannot start an unbounded number
+        of handlers at the same time.
+        """
+        def gen_handler_calls(notifications):
+            for notification in notifications:
+                received = self.notifications.pop(notification, None)
+                if received is None:
+                    continue
+                self.updateQueueDepth()
+                if len(self.notifications) <= self.NOTIFY_QUEUE_LOW_WATER:
+                    self.resumeReading()
+                yield from self.handleNotify(
+                    notification, clock=clock, received=received)
+
+        ready = self.getReadyNotifications(clock)
+        if len(ready) == 0:
+            return succeed(None)
+        calls = gen_handler_calls(ready)
+        return defer.DeferredList([
+            task.coiterate(calls)
+            for _ in range(min(len(ready), self.HANDLE_NOTIFY_CONCURRENCY))
+        ])
+
+    def handleNotify(self, notification, clock=reactor, received=None):
+        """Generate the calls to the handlers of a notify message.
+
+        Each item is the `Deferred` of a single handler call.
+        """
         channel, payload = notification
         try:
             channel, action = self.convertChannel(channel)
@@ -427,14 +519,14 @@ class PostgresListenerService(Service, object):
             self.log.failure(
                 "Failed to convert channel {channel!r}.", channel=channel)
         else:
-            defers = []
-            handlers = self.listeners[channel]
-            # XXX: There could be an arbitrary number of listeners. Should we
-            # limit concurrency here? Perhaps even do one at a time.
-            for handler in handlers:
+            if received is not None:
+                self.prometheus_metrics.update(
+                    'db_notify_handler_latency', 'observe',
+                    value=clock.seconds() - received,
+                    labels={'channel': channel})
+            for handler in list(self.listeners[channel]):
                 d = defer.maybeDeferred(handler, action, payload)
                 d.addErrback(lambda failure: self.log.failure(
                     "Failure while handling notification to {channel!r}: "
                     "{payload!r}", failure, channel=channel, payload=payload))
-                defers.append(d)
-            return defer.DeferredList(defers)
+                yield d
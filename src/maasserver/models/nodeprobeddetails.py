@@ -9,6 +9,7 @@ topology information derived from LLDP.
 
 __all__ = [
     "get_probed_details",
+    "get_probed_details_versions",
     "get_single_probed_details",
     "script_output_nsmap",
 ]
@@ -95,3 +96,44 @@ def get_probed_details(nodes):
             stdout_decoded = base64.b64decode(stdout)
             ret[system_id][namespace] = stdout_decoded
     return ret
+
+
+def get_probed_details_versions(nodes):
+    """Return versions of the probed details of the nodes in the given list.
+
+    A node's version changes whenever its probed details change, but it is
+    much cheaper to obtain than the details themselves.
+
+    :return: A ``{system_id: version, ...}`` map, where each version is a
+        tuple of the IDs and update times of the script results that make
+        up the node's details.
+    """
+    node_ids = {node.id: node for node in nodes}
+    ret = {node.system_id: () for node in nodes}
+    if len(node_ids) == 0:
+        return ret
+    with connection.cursor() as cursor:
+        sql_query = """
+            SELECT
+              script_set.node_id, script_result.id, script_result.updated
+            FROM
+              metadataserver_scriptresult AS script_result,
+              metadataserver_scriptset AS script_set,
+              maasserver_node AS node
+            WHERE
+              script_set.node_id IN %s AND
+              script_set.id = script_result.script_set_id AND
+              script_result.status = %s AND
+              script_result.script_name IN %s AND
+              script_set.id = node.current_commissioning_script_set_id
+            ORDER BY
+              script_result.id;
+        """
+        cursor.execute(sql_query, [
+            tuple(node_ids), SCRIPT_STATUS.PASSED,
+            tuple(script_output_nsmap)
+        ])
+        for node_id, script_result_id, updated in cursor.fetchall():
+            system_id = node_ids[node_id].system_id
+            ret[system_id] += ((script_result_id, updated),)
+    return ret
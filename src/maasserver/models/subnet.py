@@ -759,6 +759,24 @@ class Subnet(CleanSave, TimestampedModel):
         free_range = min(free_ranges, key=attrgetter('num_addresses'))
         return str(IPAddress(free_range.first))
 
+    def get_next_ips_for_allocation(
+            self, exclude_addresses: Optional[Iterable]=None):
+        """Generate the "best" free addresses from this subnet, best first.
+
+        This yields the addresses that successive calls to
+        `get_next_ip_for_allocation` would return were each one allocated
+        in turn, but the free ranges are only worked out once. Addresses
+        used by observed neighbours are not included.
+
+        :param exclude_addresses: Optional list of addresses to exclude.
+        """
+        free_ranges = self.get_ipranges_not_in_use(
+            exclude_addresses=exclude_addresses, with_neighbours=True)
+        for free_range in sorted(
+                free_ranges, key=attrgetter('num_addresses')):
+            for value in range(free_range.first, free_range.last + 1):
+                yield str(IPAddress(value, free_range.version))
+
     def render_json_for_related_ips(
             self, with_username=True, with_summary=True):
         """Render a representation of this subnet's related IP addresses,
@@ -312,6 +312,53 @@ class TestStaticIPAddressManager(MAASServerTestCase):
                 orm.retry_context.stack._cm_pending,
                 HasLength(0))
 
+    def test_allocate_many_allocates_distinct_addresses(self):
+        subnet = factory.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None)
+        factory.make_StaticIPAddress(ip="10.0.0.4", cidr="10.0.0.0/29")
+        ipaddresses = StaticIPAddress.objects.allocate_many(subnet, 3)
+        self.assertEqual(
+            ["10.0.0.5", "10.0.0.6", "10.0.0.1"],
+            [ipaddress.ip for ipaddress in ipaddresses])
+
+    def test_allocate_many_avoids_excluded_addresses(self):
+        subnet = factory.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None)
+        ipaddresses = StaticIPAddress.objects.allocate_many(
+            subnet, 2, exclude_addresses=["10.0.0.1"])
+        self.assertEqual(
+            ["10.0.0.2", "10.0.0.3"],
+            [ipaddress.ip for ipaddress in ipaddresses])
+
+    def test_allocate_many_skips_addresses_taken_concurrently(self):
+        subnet = factory.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None)
+        set_ip_address = self.patch(StaticIPAddress, "set_ip_address")
+        set_ip_address.side_effect = [orm.make_unique_violation(), None]
+        ipaddress, = StaticIPAddress.objects.allocate_many(subnet, 1)
+        self.assertThat(
+            [call[0][0] for call in set_ip_address.call_args_list],
+            Equals(["10.0.0.1", "10.0.0.2"]))
+
+    def test_allocate_many_raises_when_addresses_exhausted(self):
+        subnet = factory.make_Subnet(
+            cidr="10.0.0.0/30", gateway_ip=None, dns_servers=None)
+        e = self.assertRaises(
+            StaticIPAddressExhaustion,
+            StaticIPAddress.objects.allocate_many, subnet, 3)
+        self.assertEqual(
+            "No more IPs available in subnet: %s." % subnet.cidr,
+            str(e))
+
+    def test_allocate_many_does_not_reuse_neighbour_address(self):
+        subnet = factory.make_Subnet(
+            cidr="10.0.0.0/30", gateway_ip=None, dns_servers=None)
+        rackif = factory.make_Interface(vlan=subnet.vlan)
+        factory.make_Discovery(ip="10.0.0.1", interface=rackif)
+        self.assertRaises(
+            StaticIPAddressExhaustion,
+            StaticIPAddress.objects.allocate_many, subnet, 3)
+
 
 class TestStaticIPAddressManagerTransactional(MAASTransactionServerTestCase):
     """Transactional tests for `StaticIPAddressManager."""
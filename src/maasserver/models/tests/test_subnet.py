@@ -1212,6 +1212,26 @@ class TestSubnetGetNextIPForAllocation(MAASServerTestCase):
         ip = subnet.get_next_ip_for_allocation()
         self.assertThat(ip, Equals("10.0.0.5"))
 
+    def test__generates_free_addresses_from_smallest_range_first(self):
+        # Note: 10.0.0.0/29 --> 10.0.0.1 through 10.0.0.0.6 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/29", gateway_ip=None, dns_servers=None)
+        factory.make_StaticIPAddress(ip="10.0.0.4", cidr="10.0.0.0/29")
+        self.assertThat(
+            list(subnet.get_next_ips_for_allocation()),
+            Equals(["10.0.0.5", "10.0.0.6", "10.0.0.1", "10.0.0.2",
+                    "10.0.0.3"]))
+
+    def test__generates_free_addresses_except_observed_neighbours(self):
+        # Note: 10.0.0.0/30 --> 10.0.0.1 and 10.0.0.0.2 are usable.
+        subnet = self.make_Subnet(
+            cidr="10.0.0.0/30", gateway_ip=None, dns_servers=None)
+        rackif = factory.make_Interface(vlan=subnet.vlan)
+        factory.make_Discovery(ip="10.0.0.1", interface=rackif)
+        self.assertThat(
+            list(subnet.get_next_ips_for_allocation()),
+            Equals(["10.0.0.2"]))
+
 
 class TestUnmanagedSubnets(MAASServerTestCase):
 
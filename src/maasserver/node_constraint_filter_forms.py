@@ -498,6 +498,18 @@ def nodes_by_storage(storage, node_ids=None):
     return nodes
 
 
+def node_ids_with_interfaces(**filters):
+    """Return a subquery for the IDs of nodes with interfaces matching
+    `filters`.
+
+    Filtering nodes with ``id__in`` this subquery, rather than by joining
+    through their interfaces, does not multiply each node by its matching
+    interfaces and addresses; that would have to be undone with DISTINCT.
+    """
+    interfaces = Interface.objects.filter(node__isnull=False, **filters)
+    return interfaces.values('node_id')
+
+
 def nodes_by_interface(
         interfaces_label_map, include_filter=None, preconfigured=True):
     """Determines the set of nodes that match the specified
@@ -903,6 +915,12 @@ class AcquireNodeForm(RenamableFieldsForm):
     def filter_nodes(self, nodes):
         """Return the subset of nodes that match the form's constraints.
 
+        The constraints are applied to `nodes` as filters and subqueries, so
+        that the database finds the matching nodes in one query. Only the
+        storage and interface constraints are evaluated separately, because
+        they also map each node to the devices that matched. Those only look
+        at the nodes that matched all the other constraints.
+
         :param nodes:  The set of nodes on which the form should apply
             constraints.
         :type nodes: `django.db.models.query.QuerySet`
@@ -946,7 +964,9 @@ class AcquireNodeForm(RenamableFieldsForm):
         interfaces_label_map = self.cleaned_data.get(
             self.get_field_name('interfaces'))
         if interfaces_label_map is not None:
-            result = nodes_by_interface(interfaces_label_map)
+            result = nodes_by_interface(
+                interfaces_label_map,
+                include_filter={'node_id__in': filtered_nodes.values('id')})
             if result.node_ids is not None:
                 filtered_nodes = filtered_nodes.filter(id__in=result.node_ids)
                 compatible_interfaces = result.label_map
@@ -957,7 +977,8 @@ class AcquireNodeForm(RenamableFieldsForm):
         storage = self.cleaned_data.get(
             self.get_field_name('storage'))
         if storage:
-            compatible_nodes = nodes_by_storage(storage)
+            compatible_nodes = nodes_by_storage(
+                storage, node_ids=filtered_nodes.values('id'))
             node_ids = list(compatible_nodes)
             if node_ids is not None:
                 filtered_nodes = filtered_nodes.filter(id__in=node_ids)
@@ -968,12 +989,14 @@ class AcquireNodeForm(RenamableFieldsForm):
             'fabric_classes'))
         if fabric_classes is not None and len(fabric_classes) > 0:
             filtered_nodes = filtered_nodes.filter(
-                interface__vlan__fabric__class_type__in=fabric_classes)
+                id__in=node_ids_with_interfaces(
+                    vlan__fabric__class_type__in=fabric_classes))
         not_fabric_classes = self.cleaned_data.get(self.get_field_name(
             'not_fabric_classes'))
         if not_fabric_classes is not None and len(not_fabric_classes) > 0:
             filtered_nodes = filtered_nodes.exclude(
-                interface__vlan__fabric__class_type__in=not_fabric_classes)
+                id__in=node_ids_with_interfaces(
+                    vlan__fabric__class_type__in=not_fabric_classes))
         return filtered_nodes
 
     def filter_by_fabrics(self, filtered_nodes):
@@ -982,13 +1005,15 @@ class AcquireNodeForm(RenamableFieldsForm):
             # XXX mpontillo 2015-10-30 need to also handle fabrics whose name
             # is null (fabric-<id>).
             filtered_nodes = filtered_nodes.filter(
-                interface__vlan__fabric__name__in=fabrics)
+                id__in=node_ids_with_interfaces(
+                    vlan__fabric__name__in=fabrics))
         not_fabrics = self.cleaned_data.get(self.get_field_name('not_fabrics'))
         if not_fabrics is not None and len(not_fabrics) > 0:
             # XXX mpontillo 2015-10-30 need to also handle fabrics whose name
             # is null (fabric-<id>).
             filtered_nodes = filtered_nodes.exclude(
-                interface__vlan__fabric__name__in=not_fabrics)
+                id__in=node_ids_with_interfaces(
+                    vlan__fabric__name__in=not_fabrics))
         return filtered_nodes
 
     def filter_by_vlans(self, filtered_nodes):
@@ -996,12 +1021,12 @@ class AcquireNodeForm(RenamableFieldsForm):
         if vlans is not None and len(vlans) > 0:
             for vlan in set(vlans):
                 filtered_nodes = filtered_nodes.filter(
-                    interface__vlan=vlan)
+                    id__in=node_ids_with_interfaces(vlan=vlan))
         not_vlans = self.cleaned_data.get(self.get_field_name('not_vlans'))
         if not_vlans is not None and len(not_vlans) > 0:
             for not_vlan in set(not_vlans):
                 filtered_nodes = filtered_nodes.exclude(
-                    interface__vlan=not_vlan)
+                    id__in=node_ids_with_interfaces(vlan=not_vlan))
         return filtered_nodes
 
     def filter_by_subnets(self, filtered_nodes):
@@ -1009,36 +1034,35 @@ class AcquireNodeForm(RenamableFieldsForm):
         if subnets is not None and len(subnets) > 0:
             for subnet in set(subnets):
                 filtered_nodes = filtered_nodes.filter(
-                    interface__ip_addresses__subnet=subnet)
+                    id__in=node_ids_with_interfaces(
+                        ip_addresses__subnet=subnet))
         not_subnets = self.cleaned_data.get(
             self.get_field_name('not_subnets'))
         if not_subnets is not None and len(not_subnets) > 0:
             for not_subnet in set(not_subnets):
                 filtered_nodes = filtered_nodes.exclude(
-                    interface__ip_addresses__subnet=not_subnet)
+                    id__in=node_ids_with_interfaces(
+                        ip_addresses__subnet=not_subnet))
         return filtered_nodes
 
     def filter_by_zone(self, filtered_nodes):
         zone = self.cleaned_data.get(self.get_field_name('zone'))
         if zone:
-            zone_obj = Zone.objects.get(name=zone)
-            filtered_nodes = filtered_nodes.filter(zone=zone_obj)
+            filtered_nodes = filtered_nodes.filter(zone__name=zone)
         not_in_zone = self.cleaned_data.get(self.get_field_name('not_in_zone'))
         if not_in_zone:
-            not_in_zones = Zone.objects.filter(name__in=not_in_zone)
-            filtered_nodes = filtered_nodes.exclude(zone__in=not_in_zones)
+            filtered_nodes = filtered_nodes.exclude(
+                zone__name__in=not_in_zone)
         return filtered_nodes
 
     def filter_by_pool(self, filtered_nodes):
         pool_name = self.cleaned_data.get(self.get_field_name('pool'))
         if pool_name:
-            pool = ResourcePool.objects.get(name=pool_name)
-            filtered_nodes = filtered_nodes.filter(pool=pool)
+            filtered_nodes = filtered_nodes.filter(pool__name=pool_name)
         not_in_pool = self.cleaned_data.get(self.get_field_name('not_in_pool'))
         if not_in_pool:
-            pools_to_exclude = ResourcePool.objects.filter(
-                name__in=not_in_pool)
-            filtered_nodes = filtered_nodes.exclude(pool__in=pools_to_exclude)
+            filtered_nodes = filtered_nodes.exclude(
+                pool__name__in=not_in_pool)
         return filtered_nodes
 
     def filter_by_tags(self, filtered_nodes):
@@ -17,9 +17,11 @@ __all__ = [
     ]
 
 from collections import namedtuple
+from copy import copy
 import json
 import os.path
 from pipes import quote
+from stat import S_ISDIR
 from urllib.parse import (
     urlencode,
     urlparse,
@@ -707,8 +709,8 @@ def compose_filename(elements):
     return '_'.join(elements)
 
 
-def get_preseed_template(filenames):
-    """Get the path and content for the first template found.
+def find_preseed_template(filenames):
+    """Get the path and `os.stat` result for the first template found.
 
     :param filenames: An iterable of relative filenames.
     """
@@ -718,16 +720,28 @@ def get_preseed_template(filenames):
         for filename in filenames:
             filepath = os.path.join(location, filename)
             try:
-                with open(filepath, "r", encoding="utf-8") as stream:
-                    content = stream.read()
-            except IOError:
+                stat = os.stat(filepath)
+            except OSError:
                 pass  # Ignore.
             else:
-                return filepath, content
+                if not S_ISDIR(stat.st_mode):
+                    return filepath, stat
     else:
         return None, None
 
 
+def get_preseed_template(filenames):
+    """Get the path and content for the first template found.
+
+    :param filenames: An iterable of relative filenames.
+    """
+    filepath, _ = find_preseed_template(filenames)
+    if filepath is None:
+        return None, None
+    with open(filepath, "r", encoding="utf-8") as stream:
+        return filepath, stream.read()
+
+
 def get_escape_singleton():
     """Return a singleton containing methods to escape various formats used in
     the preseed templates.
@@ -758,6 +772,33 @@ class TemplateNotFoundError(Exception):
         self.name = name
 
 
+# Parsed templates, keyed by path. Each is stored with the modification
+# time and size of the file it was parsed from, so that an edited template
+# is parsed again.
+_parsed_preseed_templates = {}
+
+
+def get_parsed_preseed_template(filepath, stat):
+    """Return the `PreseedTemplate` parsed from `filepath`.
+
+    The template is shared between callers, so it must be copied before
+    giving it a `get_template` hook. It is parsed again when `stat`, the
+    result of `os.stat` on `filepath`, shows that the file has changed.
+    """
+    version = stat.st_mtime_ns, stat.st_size
+    try:
+        cached_version, template = _parsed_preseed_templates[filepath]
+    except KeyError:
+        pass
+    else:
+        if cached_version == version:
+            return template
+    with open(filepath, "r", encoding="utf-8") as stream:
+        template = PreseedTemplate(stream.read(), name=filepath)
+    _parsed_preseed_templates[filepath] = version, template
+    return template
+
+
 def load_preseed_template(node, prefix, osystem='', release=''):
     """Find and load a `PreseedTemplate` for the given node.
 
@@ -775,13 +816,14 @@ def load_preseed_template(node, prefix, osystem='', release=''):
         """
         filenames = list(get_preseed_filenames(
             node, name, osystem, release, default))
-        filepath, content = get_preseed_template(filenames)
+        filepath, stat = find_preseed_template(filenames)
         if filepath is None:
             raise TemplateNotFoundError(name)
-        # This is where the closure happens: pass `get_template` when
-        # instanciating PreseedTemplate.
-        return PreseedTemplate(
-            content, name=filepath, get_template=get_template)
+        # This is where the closure happens: give the parsed template
+        # `get_template` so that it loads inherited templates for this node.
+        template = copy(get_parsed_preseed_template(filepath, stat))
+        template.get_template = get_template
+        return template
 
     return get_template(prefix, None, default=True)
 
@@ -21,6 +21,16 @@ METRICS_DEFINITIONS = [
     MetricDefinition(
         'Histogram', 'http_request_latency', 'HTTP request latency',
         ['method', 'path', 'status']),
+    MetricDefinition(
+        'Gauge', 'db_notify_queue_depth',
+        'Number of database notifications waiting to be handled', []),
+    MetricDefinition(
+        'Histogram', 'db_notify_handler_latency',
+        'Latency between receiving a database notification and handling it',
+        ['channel']),
+    MetricDefinition(
+        'Counter', 'db_transaction_retries',
+        'Number of times a database transaction was retried', ['reason']),
 ]
 
 
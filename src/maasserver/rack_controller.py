@@ -30,6 +30,11 @@ DHCP:
     for messages on 'sys_dhcp_{id}' channel and set that rack controller as
     needing an update. Any time a message is received on this queue that rack
     controller is marked as needing an update.
+
+    Rack controllers needing an update are configured in passes of up to
+    `RackControllerService.concurrency` at once. Racks configured in the same
+    pass share the parts of their DHCP configuration that they have in common,
+    like the hosts on a VLAN they both serve.
 """
 
 __all__ = [
@@ -55,6 +60,7 @@ from twisted.application.service import Service
 from twisted.internet import reactor
 from twisted.internet.defer import (
     CancelledError,
+    DeferredList,
     maybeDeferred,
 )
 from twisted.internet.task import LoopingCall
@@ -72,6 +78,9 @@ class RackControllerService(Service):
     See module documentation for more details.
     """
 
+    # The most rack controllers to configure DHCP on at once.
+    concurrency = 10
+
     def __init__(self, ipcWorker, postgresListener, clock=reactor):
         """Initialise a new `RackControllerService`.
 
@@ -238,7 +247,11 @@ class RackControllerService(Service):
             self.processingDone = self.processing.start(0.1, now=False)
 
     def process(self):
-        """Process the next rack controller that needs an update."""
+        """Process the next rack controllers that need an update.
+
+        Up to `concurrency` rack controllers are updated at once. The next
+        pass starts once they have all finished.
+        """
         if not self.running:
             # We're shutting down.
             self.processing.stop()
@@ -250,23 +263,32 @@ class RackControllerService(Service):
                 self.needsDHCPUpdate.add(rack_id)
                 return failure
 
-            rack_id = self.needsDHCPUpdate.pop()
-            d = maybeDeferred(self.processDHCP, rack_id)
-            d.addErrback(_retryOnFailure, rack_id)
-            d.addErrback(lambda f: f.trap(NoConnectionsAvailable))
-            d.addErrback(
-                log.err,
-                "Failed configuring DHCP on rack controller 'id:%d'." % (
-                    rack_id))
-            return d
-
-    def processDHCP(self, rack_id):
-        """Process DHCP for the rack controller."""
+            # Configuration shared between the rack controllers in this pass.
+            cache = {}
+            ds = []
+            while len(self.needsDHCPUpdate) > 0 and len(ds) < self.concurrency:
+                rack_id = self.needsDHCPUpdate.pop()
+                d = maybeDeferred(self.processDHCP, rack_id, cache)
+                d.addErrback(_retryOnFailure, rack_id)
+                d.addErrback(lambda f: f.trap(NoConnectionsAvailable))
+                d.addErrback(
+                    log.err,
+                    "Failed configuring DHCP on rack controller 'id:%d'." % (
+                        rack_id))
+                ds.append(d)
+            return DeferredList(ds)
+
+    def processDHCP(self, rack_id, cache=None):
+        """Process DHCP for the rack controller.
+
+        :param cache: A dict shared with the other rack controllers processed
+            in the same pass; see `dhcp.get_dhcp_configuration`.
+        """
         log.debug(
             "[pid:{pid()}] pushing DHCP to rack: {rack_id}",
             pid=os.getpid, rack_id=rack_id)
 
         d = deferToDatabase(
             transactional(RackController.objects.get), id=rack_id)
-        d.addCallback(dhcp.configure_dhcp)
+        d.addCallback(dhcp.configure_dhcp, cache=cache)
         return d
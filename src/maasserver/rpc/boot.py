@@ -4,7 +4,9 @@
 """RPC helpers for getting the configuration for a booting machine."""
 
 __all__ = [
+    "batcher",
     "get_config",
+    "get_configs",
 ]
 
 import re
@@ -38,18 +40,91 @@ from maasserver.preseed import (
 from maasserver.third_party_drivers import get_third_party_driver
 from maasserver.utils.orm import transactional
 from maasserver.utils.osystems import validate_hwe_kernel
+from maasserver.utils.threads import deferToDatabase
 from provisioningserver.events import EVENT_TYPES
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.utils.network import get_source_address
 from provisioningserver.utils.twisted import (
+    asynchronous,
     synchronous,
     undefined,
 )
 from provisioningserver.utils.url import splithost
+from twisted.internet.defer import Deferred
 
 
 DEFAULT_ARCH = 'i386'
 
+# The configuration items needed to compute a boot configuration.
+BOOT_CONFIG_NAMES = [
+    'commissioning_osystem',
+    'commissioning_distro_series',
+    'enable_third_party_drivers',
+    'default_min_hwe_kernel',
+    'default_osystem',
+    'default_distro_series',
+    'kernel_opts',
+    'use_rack_proxy',
+    'maas_internal_domain',
+    'remote_syslog',
+    'maas_syslog_port',
+]
+
+
+class BootConfigLookups:
+    """Lookups shared by the boot configurations computed together.
+
+    When many machines boot at once they mostly do so through the same rack
+    controllers, on the same subnets, and with the same boot resources, so
+    each of these is looked up once and reused. The lookups last only as
+    long as one call to `get_configs`, so they never outlive a change to the
+    objects they refer to by more than that.
+    """
+
+    def __init__(self):
+        self._cache = {}
+
+    def _get(self, key, make, *args, **kwargs):
+        try:
+            return self._cache[key]
+        except KeyError:
+            value = self._cache[key] = make(*args, **kwargs)
+            return value
+
+    @property
+    def configs(self):
+        """All the configuration items in `BOOT_CONFIG_NAMES`."""
+        return self._get(
+            "configs", Config.objects.get_configs, BOOT_CONFIG_NAMES)
+
+    def get_rack_controller(self, system_id):
+        return self._get(
+            ("rack_controller", system_id),
+            RackController.objects.get, system_id=system_id)
+
+    def get_rack_interface(self, rack_controller, local_ip):
+        """Get the interface on `rack_controller` with `local_ip`."""
+        return self._get(
+            ("rack_interface", rack_controller.id, local_ip),
+            rack_controller.interface_set.filter(
+                ip_addresses__ip=local_ip).select_related('vlan').first)
+
+    def get_best_subnet_for_ip(self, ip):
+        return self._get(
+            ("subnet", ip), Subnet.objects.get_best_subnet_for_ip, ip)
+
+    def get_default_commissioning_resource(self, osystem, series):
+        return self._get(
+            ("commissioning_resource", osystem, series),
+            BootResource.objects.get_default_commissioning_resource,
+            osystem, series)
+
+    def get_boot_filenames(self, arch, subarch, osystem, series, **kwargs):
+        """See `get_boot_filenames`."""
+        return self._get(
+            ("boot_filenames", arch, subarch, osystem, series),
+            get_boot_filenames, arch, subarch, osystem, series, **kwargs)
+
 
 def get_node_from_mac_or_hardware_uuid(mac=None, hardware_uuid=None):
     """Get a Node object from a MAC address or hardware UUID string.
@@ -255,9 +330,9 @@ def get_boot_config_for_machine(machine, configs, purpose):
     return osystem, series, subarch
 
 
-def get_base_url_for_local_ip(local_ip, internal_domain):
+def get_base_url_for_local_ip(local_ip, internal_domain, lookups):
     """Get the base URL for the preseed using the `local_ip`."""
-    subnet = Subnet.objects.get_best_subnet_for_ip(local_ip)
+    subnet = lookups.get_best_subnet_for_ip(local_ip)
     if subnet is not None and not subnet.dns_servers and subnet.vlan.dhcp_on:
         # Use the MAAS internal domain to resolve the IP address of
         # the rack controllers on the subnet.
@@ -282,7 +357,45 @@ def get_config(
 
     Raises BootConfigNoResponse when booting machine should fail to next file.
     """
-    rack_controller = RackController.objects.get(system_id=system_id)
+    return get_config_with_lookups(
+        BootConfigLookups(), system_id, local_ip, remote_ip, arch=arch,
+        subarch=subarch, mac=mac, hardware_uuid=hardware_uuid,
+        bios_boot_method=bios_boot_method)
+
+
+@synchronous
+def get_configs(requests):
+    """Get the booting configurations for many machines at once.
+
+    The configurations share a `BootConfigLookups`, but each is computed in
+    its own transaction. Computing a configuration updates the machine, so
+    this way a machine's row is locked only while its own configuration is
+    computed, and a conflicting update to one machine retries only that
+    machine's configuration.
+
+    :param requests: A list of dicts of arguments for `get_config`.
+    :return: A list with, for each request, either the structure returned
+        by `get_config` or the exception it raised.
+    """
+    lookups = BootConfigLookups()
+    get_config_in_transaction = transactional(get_config_with_lookups)
+    results = []
+    for request in requests:
+        try:
+            results.append(get_config_in_transaction(lookups, **request))
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+def get_config_with_lookups(
+        lookups, system_id, local_ip, remote_ip, arch=None, subarch=None,
+        mac=None, hardware_uuid=None, bios_boot_method=None):
+    """Get the booting configuration for a machine, using `lookups`.
+
+    See `get_config`.
+    """
+    rack_controller = lookups.get_rack_controller(system_id)
     region_ip = None
     if remote_ip is not None:
         region_ip = get_source_address(remote_ip)
@@ -299,19 +412,7 @@ def get_config(
         raise BootConfigNoResponse()
 
     # Get all required configuration objects in a single query.
-    configs = Config.objects.get_configs([
-        'commissioning_osystem',
-        'commissioning_distro_series',
-        'enable_third_party_drivers',
-        'default_min_hwe_kernel',
-        'default_osystem',
-        'default_distro_series',
-        'kernel_opts',
-        'use_rack_proxy',
-        'maas_internal_domain',
-        'remote_syslog',
-        'maas_syslog_port',
-    ])
+    configs = lookups.configs
 
     # Compute the syslog server.
     log_host, log_port = local_ip, (
@@ -337,7 +438,7 @@ def get_config(
         except ObjectDoesNotExist:
             # MAC is unknown or wasn't sent. Determine the boot_interface using
             # the boot_cluster_ip.
-            subnet = Subnet.objects.get_best_subnet_for_ip(local_ip)
+            subnet = lookups.get_best_subnet_for_ip(local_ip)
             if subnet:
                 machine.boot_interface = machine.interface_set.filter(
                     vlan=subnet.vlan).first()
@@ -345,8 +446,8 @@ def get_config(
             # Update the VLAN of the boot interface to be the same VLAN for the
             # interface on the rack controller that the machine communicated
             # with, unless the VLAN is being relayed.
-            rack_interface = rack_controller.interface_set.filter(
-                ip_addresses__ip=local_ip).select_related('vlan').first()
+            rack_interface = lookups.get_rack_interface(
+                rack_controller, local_ip)
             if (rack_interface is not None and
                     machine.boot_interface.vlan_id != rack_interface.vlan_id):
                 # Rack controller and machine is not on the same VLAN, with
@@ -372,7 +473,7 @@ def get_config(
         if configs['use_rack_proxy']:
             preseed_url = compose_preseed_url(
                 machine, base_url=get_base_url_for_local_ip(
-                    local_ip, configs['maas_internal_domain']))
+                    local_ip, configs['maas_internal_domain'], lookups))
         else:
             preseed_url = compose_preseed_url(
                 machine, base_url=rack_controller.url,
@@ -445,7 +546,7 @@ def get_config(
         if configs['use_rack_proxy']:
             preseed_url = compose_enlistment_preseed_url(
                 base_url=get_base_url_for_local_ip(
-                    local_ip, configs['maas_internal_domain']))
+                    local_ip, configs['maas_internal_domain'], lookups))
         else:
             preseed_url = compose_enlistment_preseed_url(
                 rack_controller=rack_controller, default_region_ip=region_ip)
@@ -459,9 +560,8 @@ def get_config(
         # the best boot resource for the operating system and series. If
         # none exists fallback to the default architecture. LP #1181334
         if arch is None:
-            resource = (
-                BootResource.objects.get_default_commissioning_resource(
-                    osystem, series))
+            resource = lookups.get_default_commissioning_resource(
+                osystem, series)
             if resource is None:
                 arch = DEFAULT_ARCH
             else:
@@ -499,7 +599,7 @@ def get_config(
     else:
         boot_purpose = purpose
 
-    kernel, initrd, boot_dtb = get_boot_filenames(
+    kernel, initrd, boot_dtb = lookups.get_boot_filenames(
         arch, subarch, osystem, series,
         commissioning_osystem=configs['commissioning_osystem'],
         commissioning_distro_series=configs['commissioning_distro_series'])
@@ -529,3 +629,62 @@ def get_config(
     if machine is not None:
         params["system_id"] = machine.system_id
     return params
+
+
+class BootConfigBatcher:
+    """Compute the boot configurations for concurrent requests in batches.
+
+    Up to `concurrency` batches are computed at once. Requests that arrive
+    while they are all busy are queued, and computed together in the next
+    batch with `get_configs`, so the busier the region is, the more lookups
+    are shared.
+    """
+
+    concurrency = 4
+    batch_size = 50
+
+    def __init__(self):
+        self.queue = []
+        self.running = 0
+
+    @asynchronous
+    def get_config(self, **request):
+        """Get the booting configuration for a machine.
+
+        :param request: The arguments for `get_config`.
+        :return: A `Deferred` that fires with the result of `get_config`.
+        """
+        d = Deferred()
+        self.queue.append((request, d))
+        self._process()
+        return d
+
+    def _process(self):
+        while len(self.queue) != 0 and self.running < self.concurrency:
+            batch = self.queue[:self.batch_size]
+            del self.queue[:self.batch_size]
+            self.running += 1
+            d = deferToDatabase(
+                get_configs, [request for request, _ in batch])
+            d.addCallbacks(
+                self._deliver, self._fail,
+                callbackArgs=(batch,), errbackArgs=(batch,))
+            d.addBoth(self._done)
+
+    def _deliver(self, results, batch):
+        for (_, d), result in zip(batch, results):
+            if isinstance(result, Exception):
+                d.errback(result)
+            else:
+                d.callback(result)
+
+    def _fail(self, failure, batch):
+        for _, d in batch:
+            d.errback(failure)
+
+    def _done(self, _):
+        self.running -= 1
+        self._process()
+
+
+batcher = BootConfigBatcher()
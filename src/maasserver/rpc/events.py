@@ -6,9 +6,13 @@
 __all__ = [
     "register_event_type",
     "send_event",
+    "send_event_ip_address",
     "send_event_mac_address",
+    "send_events",
 ]
 
+from collections import defaultdict
+
 from maasserver.enum import INTERFACE_TYPE
 from maasserver.models import (
     Event,
@@ -17,6 +21,11 @@ from maasserver.models import (
     Node,
 )
 from maasserver.utils.orm import transactional
+from netaddr import (
+    AddrFormatError,
+    EUI,
+    IPAddress,
+)
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.rpc.exceptions import NoSuchEventType
 from provisioningserver.utils.twisted import synchronous
@@ -122,3 +131,97 @@ def send_event_ip_address(ip_address, type_name, description, timestamp):
         Event.objects.create(
             node=node, type=event_type, description=description,
             created=timestamp)
+
+
+def _get_node_key(event):
+    """Return how `event` identifies its node, as a ``(field, value)`` tuple.
+
+    MAC and IP addresses are parsed so that they compare equal to the
+    addresses read from the database. Returns `None` if the address cannot be
+    parsed.
+    """
+    try:
+        if event.get("system_id") is not None:
+            return "system_id", event["system_id"]
+        elif event.get("mac_address") is not None:
+            return "mac_address", EUI(event["mac_address"])
+        elif event.get("ip_address") is not None:
+            return "ip_address", IPAddress(event["ip_address"])
+        else:
+            return None
+    except (AddrFormatError, ValueError):
+        return None
+
+
+def _find_node_ids(keys):
+    """Return a ``{key: node_id}`` dict for the nodes that exist.
+
+    :param keys: ``(field, value)`` tuples from `_get_node_key`.
+    """
+    values = defaultdict(set)
+    for field, value in keys:
+        values[field].add(value)
+    node_ids = {}
+    if len(values["system_id"]) != 0:
+        nodes = Node.objects.filter(system_id__in=values["system_id"])
+        for system_id, node_id in nodes.values_list("system_id", "id"):
+            node_ids["system_id", system_id] = node_id
+    if len(values["mac_address"]) != 0:
+        interfaces = Interface.objects.filter(
+            type=INTERFACE_TYPE.PHYSICAL, mac_address__in=[
+                str(mac_address) for mac_address in values["mac_address"]])
+        for mac_address, node_id in interfaces.values_list(
+                "mac_address", "node_id"):
+            node_ids["mac_address", EUI(str(mac_address))] = node_id
+    if len(values["ip_address"]) != 0:
+        nodes = Node.objects.filter(interface__ip_addresses__ip__in=[
+            str(ip_address) for ip_address in values["ip_address"]])
+        for ip_address, node_id in nodes.values_list(
+                "interface__ip_addresses__ip", "id"):
+            node_ids.setdefault(("ip_address", IPAddress(ip_address)), node_id)
+    return node_ids
+
+
+@synchronous
+@transactional
+def send_events(events):
+    """Send a batch of events.
+
+    The event types and nodes for all the events are found with a handful of
+    queries, and the events are created with one. Events of an unknown type
+    or for a node that does not exist are logged and dropped, as
+    `send_event` does.
+
+    for :py:class:`~provisioningserver.rpc.region.SendEvents`.
+
+    :param events: A list of dicts with ``type_name``, ``description`` and
+        ``timestamp`` keys, and one of ``system_id``, ``mac_address`` or
+        ``ip_address`` to identify the node.
+    """
+    event_types = dict(
+        EventType.objects.filter(
+            name__in={event["type_name"] for event in events}).values_list(
+                "name", "id"))
+    keys = [_get_node_key(event) for event in events]
+    node_ids = _find_node_ids(key for key in keys if key is not None)
+
+    new_events = []
+    for event, key in zip(events, keys):
+        type_name, description = event["type_name"], event["description"]
+        type_id = event_types.get(type_name)
+        node_id = node_ids.get(key)
+        if type_id is None:
+            log.debug(
+                "Event '{type}: {description}' sent with unknown type.",
+                type=type_name, description=description)
+        elif node_id is None:
+            # The node doesn't exist. As in `send_event`, this is most likely
+            # because a new node is trying to enlist.
+            log.debug(
+                "Event '{type}: {description}' sent for non-existent node.",
+                type=type_name, description=description)
+        else:
+            new_events.append(Event(
+                node_id=node_id, type_id=type_id, description=description,
+                created=event["timestamp"], updated=event["timestamp"]))
+    Event.objects.bulk_create(new_events)
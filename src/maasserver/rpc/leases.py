@@ -5,24 +5,36 @@
 
 __all__ = [
     "update_lease",
+    "update_leases",
 ]
 
+from collections import defaultdict
 from datetime import datetime
 
+from django.db import transaction
 from maasserver.enum import (
     IPADDRESS_FAMILY,
     IPADDRESS_TYPE,
+    IPRANGE_TYPE,
 )
 from maasserver.models import (
     DNSResource,
     Interface,
+    IPRange,
     Node,
     StaticIPAddress,
     Subnet,
     UnknownInterface,
 )
-from maasserver.utils.orm import transactional
-from netaddr import IPAddress
+from maasserver.utils.orm import (
+    is_retryable_failure,
+    transactional,
+)
+from netaddr import (
+    AddrFormatError,
+    EUI,
+    IPAddress,
+)
 from provisioningserver.logger import LegacyLogger
 from provisioningserver.utils.network import coerce_to_valid_hostname
 from provisioningserver.utils.twisted import synchronous
@@ -44,6 +56,126 @@ def _is_valid_hostname(hostname):
     )
 
 
+class _LeaseLookup:
+    """Find the objects that a lease update needs, one query at a time."""
+
+    def get_best_subnet_for_ip(self, ip):
+        return Subnet.objects.get_best_subnet_for_ip(ip)
+
+    def get_dynamic_range_for_ip(self, subnet, ip):
+        return subnet.get_dynamic_range_for_ip(ip)
+
+    def get_interfaces(self, mac):
+        return list(Interface.objects.filter(mac_address=mac))
+
+    def add_interface(self, mac, interface):
+        """Record that `interface` has been created for `mac`."""
+
+    def forget_added_interfaces(self):
+        """Forget interfaces added since the last call.
+
+        Call this when the savepoint in which they were created is rolled
+        back.
+        """
+
+    def keep_added_interfaces(self):
+        """Keep interfaces added since the last call.
+
+        Call this when the savepoint in which they were created is released.
+        """
+
+
+class _BulkLeaseLookup(_LeaseLookup):
+    """Find the objects that many lease updates need with bulk queries."""
+
+    # Like `Subnet.objects.find_best_subnet_for_ip_query` but for many IP
+    # addresses at once.
+    find_best_subnets_for_ips_query = """
+        SELECT DISTINCT ON (lease.ip)
+            subnet.*,
+            host(lease.ip) "lease_ip"
+        FROM unnest(%s::inet[]) AS lease(ip)
+        INNER JOIN maasserver_subnet AS subnet
+            ON lease.ip << subnet.cidr
+        INNER JOIN maasserver_vlan AS vlan
+            ON subnet.vlan_id = vlan.id
+        ORDER BY
+            lease.ip,
+            vlan.dhcp_on DESC,
+            masklen(subnet.cidr) DESC
+        """
+
+    def __init__(self, updates):
+        ips = set()
+        for update in updates:
+            ip = self._normalise_ip(update["ip"])
+            if ip is not None:
+                ips.add(ip)
+        self.subnets = {
+            subnet.lease_ip: subnet
+            for subnet in Subnet.objects.raw(
+                self.find_best_subnets_for_ips_query, params=[sorted(ips)])
+        }
+        self.dynamic_ranges = defaultdict(list)
+        for iprange in IPRange.objects.filter(
+                subnet__in=list(self.subnets.values()),
+                type=IPRANGE_TYPE.DYNAMIC):
+            self.dynamic_ranges[iprange.subnet_id].append(iprange)
+        self.interfaces = defaultdict(list)
+        macs = {
+            str(mac) for mac in map(self._normalise_mac, (
+                update["mac"] for update in updates))
+            if mac is not None
+        }
+        for interface in Interface.objects.filter(mac_address__in=macs):
+            self.interfaces[EUI(str(interface.mac_address))].append(interface)
+        self.added_interfaces = []
+
+    @staticmethod
+    def _normalise_mac(mac):
+        try:
+            return EUI(mac)
+        except (AddrFormatError, TypeError):
+            return None
+
+    @staticmethod
+    def _normalise_ip(ip):
+        try:
+            ip = IPAddress(ip)
+        except (AddrFormatError, ValueError):
+            return None
+        if ip.is_ipv4_mapped():
+            ip = ip.ipv4()
+        return str(ip)
+
+    def get_best_subnet_for_ip(self, ip):
+        return self.subnets.get(self._normalise_ip(ip))
+
+    def get_dynamic_range_for_ip(self, subnet, ip):
+        for iprange in self.dynamic_ranges[subnet.id]:
+            if ip in iprange.netaddr_iprange:
+                return iprange
+        return None
+
+    def get_interfaces(self, mac):
+        eui = self._normalise_mac(mac)
+        if eui is None:
+            raise LeaseUpdateError("Invalid MAC address: %s" % mac)
+        return list(self.interfaces[eui])
+
+    def add_interface(self, mac, interface):
+        self.interfaces[EUI(mac)].append(interface)
+        self.added_interfaces.append((EUI(mac), interface))
+
+    def forget_added_interfaces(self):
+        for eui, interface in self.added_interfaces:
+            self.interfaces[eui].remove(interface)
+        self.added_interfaces.clear()
+
+    def keep_added_interfaces(self):
+        self.added_interfaces.clear()
+
+
 @synchronous
 @transactional
 def update_lease(
@@ -79,13 +211,61 @@ def update_lease(
     :raises NoSuchCluster: If the cluster identified by `cluster_uuid` does not
         exist.
     """
+    return _update_lease(
+        _LeaseLookup(), action, mac, ip_family, ip, timestamp,
+        lease_time, hostname)
+
+
+@synchronous
+@transactional
+def update_leases(updates):
+    """Update many DHCP leases from a cluster in a single transaction.
+
+    :param updates: A list of dicts, each with the arguments that
+        `update_lease` accepts, as found in
+        :py:class`~provisioningserver.rpc.region.UpdateLeases`.
+
+    The updates are applied in order. The subnets, dynamic ranges and
+    interfaces they need are fetched up-front with a few bulk queries rather
+    than a few queries per update. Each update is applied in its own
+    savepoint: one that fails is logged and skipped, and does not affect the
+    others, unless the failure is retryable, in which case the whole batch is
+    retried.
+    """
+    lookup = _BulkLeaseLookup(updates)
+    for update in updates:
+        try:
+            with transaction.atomic():
+                _update_lease(
+                    lookup, update["action"], update["mac"],
+                    update["ip_family"], update["ip"], update["timestamp"],
+                    update.get("lease_time"), update.get("hostname"))
+        except LeaseUpdateError as error:
+            lookup.forget_added_interfaces()
+            log.msg("Lease update ignored: %s" % error)
+        except Exception as error:
+            if is_retryable_failure(error):
+                raise  # Retry the whole batch.
+            lookup.forget_added_interfaces()
+            log.err(None, "Lease update failed: %s" % error)
+        else:
+            lookup.keep_added_interfaces()
+    return {}
+
+
+def _update_lease(
+        lookup, action, mac, ip_family, ip, timestamp, lease_time, hostname):
+    """Update one DHCP lease, using `lookup` to find related objects.
+
+    See `update_lease`.
+    """
     # Check for a valid action.
     if action not in ["commit", "expiry", "release"]:
         raise LeaseUpdateError("Unknown lease action: %s" % action)
 
     # Get the subnet for this IP address. If no subnet exists then something
     # is wrong as we should not be recieving message about unknown subnets.
-    subnet = Subnet.objects.get_best_subnet_for_ip(ip)
+    subnet = lookup.get_best_subnet_for_ip(ip)
     if subnet is None:
         raise LeaseUpdateError("No subnet exists for: %s" % ip)
 
@@ -107,18 +287,19 @@ def update_lease(
 
     # We will recieve actions on all addresses in the subnet. We only want
     # to update the addresses in the dynamic range.
-    dynamic_range = subnet.get_dynamic_range_for_ip(IPAddress(ip))
+    dynamic_range = lookup.get_dynamic_range_for_ip(subnet, IPAddress(ip))
     if dynamic_range is None:
         # Do nothing.
         return {}
 
-    interfaces = list(Interface.objects.filter(mac_address=mac))
+    interfaces = lookup.get_interfaces(mac)
     if len(interfaces) == 0 and action == "commit":
         # A MAC address that is unknown to MAAS was given an IP address. Create
         # an unknown interface for this lease.
         unknown_interface = UnknownInterface(
             name="eth0", mac_address=mac, vlan_id=subnet.vlan_id)
         unknown_interface.save()
+        lookup.add_interface(mac, unknown_interface)
         interfaces = [unknown_interface]
     elif len(interfaces) == 0:
         # No interfaces and not commit action so nothing needs to be done.
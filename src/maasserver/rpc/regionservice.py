@@ -33,6 +33,7 @@ from maasserver.rpc import (
     packagerepository,
     rackcontrollers,
 )
+from maasserver.rpc.events import send_events
 from maasserver.rpc.nodes import (
     commission_node,
     create_node,
@@ -160,6 +161,30 @@ class Region(RPCProtocol):
         # region recieves the message.
         return d
 
+    @region.UpdateLeases.responder
+    def update_leases(self, cluster_uuid, updates):
+        """update_leases(cluster_uuid, updates)
+
+        Implementation of
+        :py:class`~provisioningserver.rpc.region.UpdateLeases`.
+        """
+        dbtasks = eventloop.services.getServiceNamed("database-tasks")
+        d = dbtasks.deferTask(leases.update_leases, updates)
+
+        # Catch all errors except the NoSuchCluster failure. We want that to
+        # be sent back to the cluster.
+        def err_NoSuchCluster_passThrough(failure):
+            if failure.check(NoSuchCluster):
+                return failure
+            else:
+                log.err(failure, "Unhandled failure in updating leases.")
+                return {}
+        d.addErrback(err_NoSuchCluster_passThrough)
+
+        # Wait for the records to be handled, so that batches from the same
+        # cluster are processed in order.
+        return d
+
     @amp.StartTLS.responder
     def get_tls_parameters(self):
         """get_tls_parameters()
@@ -185,8 +210,8 @@ class Region(RPCProtocol):
         Implementation of
         :py:class:`~provisioningserver.rpc.region.GetBootConfig`.
         """
-        return deferToDatabase(
-            boot.get_config, system_id, local_ip, remote_ip,
+        return boot.batcher.get_config(
+            system_id=system_id, local_ip=local_ip, remote_ip=remote_ip,
             arch=arch, subarch=subarch, mac=mac, hardware_uuid=hardware_uuid,
             bios_boot_method=bios_boot_method)
 
@@ -339,6 +364,25 @@ class Region(RPCProtocol):
         # Don't wait for the record to be written.
         return succeed({})
 
+    @region.SendEvents.responder
+    def send_events(self, events):
+        """send_events()
+
+        Implementation of
+        :py:class:`~provisioningserver.rpc.region.SendEvents`.
+        """
+        for event in events:
+            # Store the time as the region's naive local time, like the
+            # time-stamps of events sent one at a time.
+            event["timestamp"] = event["timestamp"].astimezone().replace(
+                tzinfo=None)
+        dbtasks = eventloop.services.getServiceNamed("database-tasks")
+        # Wait for the events to be written so that the rack controller can
+        # send them again if they are not.
+        d = dbtasks.deferTask(send_events, events)
+        d.addCallback(lambda _: {})
+        return d
+
     @region.ReportForeignDHCPServer.responder
     def report_foreign_dhcp_server(
             self, system_id, interface_name, dhcp_ip=None):
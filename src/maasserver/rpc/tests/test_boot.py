@@ -7,7 +7,10 @@ __all__ = []
 
 from datetime import timedelta
 import random
-from unittest.mock import ANY
+from unittest.mock import (
+    ANY,
+    sentinel,
+)
 
 from maasserver import server_address
 from maasserver.dns.config import get_resource_name_for_subnet
@@ -29,19 +32,29 @@ from maasserver.node_status import (
 from maasserver.preseed import compose_enlistment_preseed_url
 from maasserver.rpc import boot as boot_module
 from maasserver.rpc.boot import (
+    BootConfigBatcher,
+    BootConfigLookups,
     event_log_pxe_request,
     get_boot_filenames,
     get_config as orig_get_config,
+    get_configs,
     merge_kparams_with_extra,
 )
 from maasserver.testing.architecture import make_usable_architecture
 from maasserver.testing.config import RegionConfigurationFixture
 from maasserver.testing.factory import factory
-from maasserver.testing.testcase import MAASServerTestCase
-from maasserver.utils.orm import reload_object
+from maasserver.testing.testcase import (
+    MAASServerTestCase,
+    MAASTransactionServerTestCase,
+)
+from maasserver.utils.orm import (
+    make_serialization_failure,
+    reload_object,
+)
 from maasserver.utils.osystems import get_release_from_distro_info
 from maastesting.djangotestcase import count_queries
 from maastesting.matchers import MockCalledOnceWith
+from maastesting.twisted import extract_result
 from netaddr import IPNetwork
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.utils.network import get_source_address
@@ -49,6 +62,7 @@ from testtools.matchers import (
     ContainsAll,
     StartsWith,
 )
+from twisted.internet.defer import Deferred
 
 
 def get_config(*args, **kwargs):
@@ -1116,3 +1130,168 @@ class TestGetBootFilenames(MAASServerTestCase):
                 filetype=BOOT_RESOURCE_FILE_TYPE.BOOT_INITRD).filename,
             initrd)
         self.assertIsNone(boot_dbt)
+
+
+class TestBootConfigLookups(MAASServerTestCase):
+    """Tests for `BootConfigLookups`."""
+
+    def test_looks_up_once(self):
+        rack_controller = factory.make_RackController()
+        lookups = BootConfigLookups()
+        count, first = count_queries(
+            lookups.get_rack_controller, rack_controller.system_id)
+        self.assertEqual(1, count)
+        count, second = count_queries(
+            lookups.get_rack_controller, rack_controller.system_id)
+        self.assertEqual(0, count)
+        self.assertIs(first, second)
+
+    def test_looks_up_configs_once(self):
+        lookups = BootConfigLookups()
+        count, configs = count_queries(lambda: lookups.configs)
+        self.assertEqual(1, count)
+        count, _ = count_queries(lambda: lookups.configs)
+        self.assertEqual(0, count)
+        self.assertEqual(
+            Config.objects.get_config('default_osystem'),
+            configs['default_osystem'])
+
+    def test_shares_boot_filenames_by_image(self):
+        get_boot_filenames = self.patch(boot_module, 'get_boot_filenames')
+        get_boot_filenames.return_value = sentinel.filenames
+        lookups = BootConfigLookups()
+        for _ in range(2):
+            self.assertIs(
+                sentinel.filenames,
+                lookups.get_boot_filenames(
+                    'amd64', 'generic', 'ubuntu', 'bionic',
+                    commissioning_osystem='ubuntu'))
+        self.assertThat(get_boot_filenames, MockCalledOnceWith(
+            'amd64', 'generic', 'ubuntu', 'bionic',
+            commissioning_osystem='ubuntu'))
+
+
+class TestGetConfigs(MAASServerTestCase):
+    """Tests for `get_configs`."""
+
+    def setUp(self):
+        super(TestGetConfigs, self).setUp()
+        self.useFixture(RegionConfigurationFixture())
+
+    def make_request(self, rack_controller, **kwargs):
+        return dict(
+            kwargs, system_id=rack_controller.system_id,
+            local_ip=factory.make_ip_address(),
+            remote_ip=factory.make_ip_address())
+
+    def test_returns_config_for_each_request(self):
+        rack_controller = factory.make_RackController()
+        make_usable_architecture(self)
+        requests = [self.make_request(rack_controller) for _ in range(3)]
+        results = get_configs(requests)
+        self.assertEqual(
+            [request["local_ip"] for request in requests],
+            [result["fs_host"] for result in results])
+
+    def test_returns_exceptions_in_place(self):
+        rack_controller = factory.make_RackController()
+        make_usable_architecture(self)
+        requests = [
+            self.make_request(rack_controller),
+            self.make_request(
+                rack_controller, mac=factory.make_mac_address()),
+        ]
+        good, bad = get_configs(requests)
+        self.assertEqual("maas-enlist", good["hostname"])
+        self.assertIsInstance(bad, BootConfigNoResponse)
+
+    def test_shares_lookups_between_requests(self):
+        rack_controller = factory.make_RackController()
+        make_usable_architecture(self)
+        count_one, _ = count_queries(
+            get_configs, [self.make_request(rack_controller)])
+        count_many, _ = count_queries(
+            get_configs,
+            [self.make_request(rack_controller) for _ in range(5)])
+        self.assertLess(count_many, count_one * 5)
+
+
+class TestGetConfigsTransactional(MAASTransactionServerTestCase):
+    """Tests for `get_configs` outside of a transaction."""
+
+    def test_retries_only_the_conflicting_request(self):
+        get_config_with_lookups = self.patch(
+            boot_module, "get_config_with_lookups")
+        get_config_with_lookups.side_effect = [
+            sentinel.config1, make_serialization_failure(),
+            sentinel.config2, sentinel.config3,
+        ]
+        requests = [{"system_id": str(number)} for number in range(3)]
+        self.assertEqual(
+            [sentinel.config1, sentinel.config2, sentinel.config3],
+            get_configs(requests))
+        self.assertEqual(
+            ["0", "1", "1", "2"],
+            [kwargs["system_id"] for _, kwargs in (
+                get_config_with_lookups.call_args_list)])
+
+
+class TestBootConfigBatcher(MAASServerTestCase):
+    """Tests for `BootConfigBatcher`."""
+
+    def setUp(self):
+        super(TestBootConfigBatcher, self).setUp()
+        self.batches = []
+
+        def deferToDatabase(func, requests):
+            d = Deferred()
+            self.batches.append((requests, d))
+            return d
+
+        self.patch(boot_module, "deferToDatabase", deferToDatabase)
+
+    def test_computes_request_immediately_when_idle(self):
+        batcher = BootConfigBatcher()
+        d = batcher.get_config(system_id="foo")
+        [(requests, batch)] = self.batches
+        self.assertEqual([{"system_id": "foo"}], requests)
+        batch.callback([sentinel.config])
+        self.assertIs(sentinel.config, extract_result(d))
+
+    def test_batches_requests_while_busy(self):
+        batcher = BootConfigBatcher()
+        batcher.concurrency = 1
+        first = batcher.get_config(system_id="first")
+        second = batcher.get_config(system_id="second")
+        third = batcher.get_config(system_id="third")
+        self.assertEqual(1, len(self.batches))
+        self.batches[0][1].callback([sentinel.first])
+        self.assertIs(sentinel.first, extract_result(first))
+        requests, batch = self.batches[1]
+        self.assertEqual(
+            [{"system_id": "second"}, {"system_id": "third"}], requests)
+        batch.callback([sentinel.second, BootConfigNoResponse()])
+        self.assertIs(sentinel.second, extract_result(second))
+        self.assertRaises(BootConfigNoResponse, extract_result, third)
+        self.assertEqual(0, batcher.running)
+
+    def test_fails_whole_batch_when_computing_it_fails(self):
+        batcher = BootConfigBatcher()
+        batcher.concurrency = 1
+        batcher.get_config(system_id="first")
+        second = batcher.get_config(system_id="second")
+        third = batcher.get_config(system_id="third")
+        self.batches[0][1].callback([sentinel.first])
+        self.batches[1][1].errback(ZeroDivisionError())
+        self.assertRaises(ZeroDivisionError, extract_result, second)
+        self.assertRaises(ZeroDivisionError, extract_result, third)
+
+    def test_limits_batch_size(self):
+        batcher = BootConfigBatcher()
+        batcher.concurrency = 1
+        batcher.batch_size = 2
+        for index in range(4):
+            batcher.get_config(system_id=str(index))
+        self.batches[0][1].callback([sentinel.config])
+        self.assertEqual(2, len(self.batches[1][0]))
+        self.assertEqual(1, len(batcher.queue))
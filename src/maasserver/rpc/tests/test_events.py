@@ -15,6 +15,7 @@ from maasserver.models.eventtype import EventType
 from maasserver.rpc import events
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
+from maastesting.djangotestcase import count_queries
 from provisioningserver.rpc.exceptions import NoSuchEventType
 
 
@@ -147,3 +148,67 @@ class TestSendEventIPAddress(MAASServerTestCase):
         Event.objects.get(
             node=node, type=event_type, description=description,
             created=timestamp)
+
+
+class TestSendEvents(MAASServerTestCase):
+
+    def make_event(self, event_type, **node):
+        return dict(
+            node, type_name=event_type.name,
+            description=factory.make_name('description'),
+            timestamp=datetime.datetime.utcnow())
+
+    def get_events(self, node):
+        return list(
+            Event.objects.filter(node=node).order_by('id').values_list(
+                'type__name', 'description', 'created'))
+
+    def test__creates_events_for_nodes(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node(interface=True)
+        interface = node.interface_set.first()
+        ip = factory.make_StaticIPAddress(interface=interface)
+        batch = [
+            self.make_event(event_type, system_id=node.system_id),
+            self.make_event(
+                event_type, mac_address=str(interface.mac_address).upper()),
+            self.make_event(event_type, ip_address=ip.ip),
+        ]
+        events.send_events(batch)
+        self.assertEqual([
+            (event_type.name, event['description'], event['timestamp'])
+            for event in batch
+        ], self.get_events(node))
+
+    def test__drops_events_for_unknown_nodes_and_types(self):
+        event_type = factory.make_EventType()
+        node = factory.make_Node()
+        batch = [
+            self.make_event(
+                event_type, system_id=factory.make_name('system_id')),
+            self.make_event(
+                event_type, mac_address=factory.make_mac_address()),
+            self.make_event(event_type, ip_address=factory.make_ip_address()),
+            self.make_event(event_type, ip_address='not-an-ip-address'),
+            dict(
+                self.make_event(event_type, system_id=node.system_id),
+                type_name=factory.make_name('type_name')),
+        ]
+        # Exception should not be raised.
+        events.send_events(batch)
+        self.assertEqual([], self.get_events(node))
+        self.assertFalse(Event.objects.filter(type=event_type).exists())
+
+    def test__queries_do_not_scale_with_events(self):
+        event_type = factory.make_EventType()
+        nodes = [factory.make_Node() for _ in range(2)]
+        events.send_events([
+            self.make_event(event_type, system_id=nodes[0].system_id)])
+
+        batch = [
+            self.make_event(event_type, system_id=node.system_id)
+            for node in nodes for _ in range(5)
+        ]
+        count, _ = count_queries(events.send_events, batch)
+        self.assertEqual(3, count)
+        self.assertEqual(11, Event.objects.filter(type=event_type).count())
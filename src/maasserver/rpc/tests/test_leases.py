@@ -17,14 +17,17 @@ from maasserver.enum import (
 from maasserver.models import DNSResource
 from maasserver.models.interface import UnknownInterface
 from maasserver.models.staticipaddress import StaticIPAddress
+from maasserver.rpc import leases as leases_module
 from maasserver.rpc.leases import (
     LeaseUpdateError,
     update_lease,
+    update_leases,
 )
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.orm import (
     get_one,
+    make_serialization_failure,
     reload_object,
 )
 from netaddr import IPAddress
@@ -381,3 +384,103 @@ class TestUpdateLease(MAASServerTestCase):
         self.assertItemsEqual(
             [boot_interface.id],
             sip.interface_set.values_list("id", flat=True))
+
+
+class TestUpdateLeases(MAASServerTestCase):
+
+    make_kwargs = TestUpdateLease.make_kwargs
+
+    def make_ips_in_dynamic_range(self, count):
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(
+            with_static_range=False, dhcp_on=True)
+        dynamic_range = subnet.get_dynamic_ranges()[0]
+        ips = set()
+        while len(ips) < count:
+            ips.add(factory.pick_ip_in_IPRange(dynamic_range))
+        return subnet, sorted(ips)
+
+    def test_applies_all_updates(self):
+        subnet, ips = self.make_ips_in_dynamic_range(3)
+        updates = [self.make_kwargs(action="commit", ip=ip) for ip in ips]
+        update_leases(updates)
+        for update in updates:
+            unknown_interface = UnknownInterface.objects.get(
+                mac_address=update["mac"])
+            self.assertEquals(subnet.vlan, unknown_interface.vlan)
+            sip = unknown_interface.ip_addresses.first()
+            self.assertThat(sip, MatchesStructure.byEquality(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED,
+                ip=update["ip"],
+                subnet=subnet,
+                lease_time=update["lease_time"],
+            ))
+
+    def test_applies_updates_in_order(self):
+        subnet, ips = self.make_ips_in_dynamic_range(2)
+        mac = factory.make_mac_address()
+        updates = [
+            self.make_kwargs(action="commit", mac=mac, ip=ip) for ip in ips
+        ]
+        update_leases(updates)
+        # Only one unknown interface is created; the second update finds the
+        # interface created by the first.
+        unknown_interface = UnknownInterface.objects.get(mac_address=mac)
+        self.assertEquals(
+            [ips[1]],
+            [sip.ip for sip in unknown_interface.ip_addresses.all()])
+
+    def test_uses_existing_interface(self):
+        subnet, [ip] = self.make_ips_in_dynamic_range(1)
+        interface = factory.make_Interface(subnet=subnet)
+        update_leases([self.make_kwargs(
+            action="commit", mac=str(interface.mac_address).upper(), ip=ip)])
+        self.assertEquals(
+            [ip],
+            [sip.ip for sip in interface.ip_addresses.filter(
+                alloc_type=IPADDRESS_TYPE.DISCOVERED)])
+        self.assertFalse(UnknownInterface.objects.exists())
+
+    def test_skips_rejected_updates(self):
+        subnet, [ip] = self.make_ips_in_dynamic_range(1)
+        rejected = self.make_kwargs(action=factory.make_name("action"))
+        accepted = self.make_kwargs(action="commit", ip=ip)
+        update_leases([rejected, accepted])
+        self.assertTrue(
+            UnknownInterface.objects.filter(
+                mac_address=accepted["mac"]).exists())
+        self.assertFalse(
+            UnknownInterface.objects.filter(
+                mac_address=rejected["mac"]).exists())
+
+    def test_rolls_back_and_skips_failed_updates(self):
+        subnet, ips = self.make_ips_in_dynamic_range(2)
+        mac = factory.make_mac_address()
+        failed, applied = [
+            self.make_kwargs(action="commit", mac=mac, ip=ip) for ip in ips
+        ]
+        update_or_create = StaticIPAddress.objects.update_or_create
+
+        def fail_for_first_update(*args, **kwargs):
+            if kwargs["ip"] == failed["ip"]:
+                raise ValueError("Broken.")
+            return update_or_create(*args, **kwargs)
+
+        self.patch(
+            StaticIPAddress.objects, "update_or_create").side_effect = (
+                fail_for_first_update)
+        update_leases([failed, applied])
+        # The interface created by the failed update was rolled back, so the
+        # applied update creates it anew.
+        unknown_interface = UnknownInterface.objects.get(mac_address=mac)
+        self.assertEquals(
+            [applied["ip"]],
+            [sip.ip for sip in unknown_interface.ip_addresses.all()])
+
+    def test_reraises_retryable_failures(self):
+        subnet, [ip] = self.make_ips_in_dynamic_range(1)
+        error = make_serialization_failure()
+        self.patch(leases_module, "_update_lease").side_effect = error
+        raised = self.assertRaises(
+            type(error), update_leases,
+            [self.make_kwargs(action="commit", ip=ip)])
+        self.assertIs(error, raised)
@@ -8,6 +8,7 @@ __all__ = []
 from datetime import (
     datetime,
     timedelta,
+    timezone,
 )
 from hashlib import sha256
 from hmac import HMAC
@@ -97,8 +98,10 @@ from provisioningserver.rpc.region import (
     RequestRackRefresh,
     SendEvent,
     SendEventMACAddress,
+    SendEvents,
     UpdateInterfaces,
     UpdateLease,
+    UpdateLeases,
     UpdateNodePowerState,
     UpdateServices,
 )
@@ -302,6 +305,62 @@ class TestRegionProtocol_UpdateLease(MAASTransactionServerTestCase):
         # works as expected.
 
 
+class TestRegionProtocol_UpdateLeases(MAASTransactionServerTestCase):
+
+    def setUp(self):
+        super(TestRegionProtocol_UpdateLeases, self).setUp()
+        self.useFixture(RegionEventLoopFixture("database-tasks"))
+
+    def test_update_leases_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(UpdateLeases.commandName)
+        self.assertIsNotNone(responder)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__calls_update_leases(self):
+        update_leases = self.patch(leases_module, "update_leases")
+        update_leases.return_value = {}
+        updates = [{
+            "action": "expiry",
+            "mac": factory.make_mac_address(),
+            "ip_family": "ipv4",
+            "ip": factory.make_ipv4_address(),
+            "timestamp": int(time.time()),
+        }]
+
+        yield eventloop.start()
+        try:
+            yield call_responder(
+                Region(), UpdateLeases, {
+                    "cluster_uuid": factory.make_name("uuid"),
+                    "updates": updates,
+                    })
+        finally:
+            yield eventloop.reset()
+
+        self.assertThat(update_leases, MockCalledOnceWith(updates))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__doesnt_raises_other_errors(self):
+        self.patch(leases_module, "update_leases").side_effect = (
+            factory.make_exception())
+
+        yield eventloop.start()
+        try:
+            yield call_responder(
+                Region(), UpdateLeases, {
+                    "cluster_uuid": factory.make_name("uuid"),
+                    "updates": [],
+                    })
+        finally:
+            yield eventloop.reset()
+
+        # Test is that no exceptions are raised. If this test passes then all
+        # works as expected.
+
+
 class TestRegionProtocol_GetBootConfig(MAASTransactionServerTestCase):
 
     def test_get_boot_config_is_registered(self):
@@ -1005,6 +1064,68 @@ class TestRegionProtocol_SendEventMACAddress(MAASTransactionServerTestCase):
                 type=name, description=event_description, mac=mac_address))
 
 
+class TestRegionProtocol_SendEvents(MAASTransactionServerTestCase):
+
+    def setUp(self):
+        super(TestRegionProtocol_SendEvents, self).setUp()
+        self.useFixture(RegionEventLoopFixture("database-tasks"))
+
+    def test_send_events_is_registered(self):
+        protocol = Region()
+        responder = protocol.locateResponder(SendEvents.commandName)
+        self.assertIsNotNone(responder)
+
+    @transactional
+    def create_event_type(self):
+        return factory.make_EventType().name
+
+    @transactional
+    def create_node(self):
+        return factory.make_Node().system_id
+
+    @transactional
+    def get_events(self, system_id):
+        return list(
+            Event.objects.filter(node__system_id=system_id).order_by(
+                'id').values_list('type__name', 'description', 'created'))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_send_events_stores_events_before_responding(self):
+        type_name = yield deferToDatabase(self.create_event_type)
+        system_id = yield deferToDatabase(self.create_node)
+        timestamp = datetime.now(timezone.utc) - timedelta(
+            seconds=randint(99, 99999))
+        descriptions = [factory.make_name('description') for _ in range(3)]
+
+        yield eventloop.start()
+        try:
+            response = yield call_responder(
+                Region(), SendEvents, {
+                    'events': [
+                        {
+                            'system_id': system_id,
+                            'type_name': type_name,
+                            'description': description,
+                            'timestamp': timestamp,
+                        }
+                        for description in descriptions
+                    ],
+                })
+            # The events are stored by the time the region responds.
+            events = yield deferToDatabase(self.get_events, system_id)
+        finally:
+            yield eventloop.reset()
+
+        self.assertEqual({}, response)
+        # The time-stamp is stored in the region's local time.
+        local_timestamp = timestamp.astimezone().replace(tzinfo=None)
+        self.assertEqual([
+            (type_name, description, local_timestamp)
+            for description in descriptions
+        ], events)
+
+
 class TestRegionProtocol_UpdateServices(MAASTransactionServerTestCase):
 
     def setUp(self):
@@ -79,6 +79,10 @@ angular.module('MAAS').factory(
             // in this object. If the field exists in the object the list
             // of functions will be called with the action and obj_id.
             this.notifiers = {};
+
+            // Last data received in a NOTIFY message for each name and pk.
+            // The region sends updates as a patch against this data.
+            this.notified = {};
         }
 
         // Return a new request id.
@@ -214,6 +218,8 @@ angular.module('MAAS').factory(
             this.websocket.onopen = (evt) => {
                 this.state = REGION_STATE.UP;
                 this.pingsInFlight.clear();
+                // The region tracks notified data per connection.
+                this.notified = {};
                 this.scheduleEnsureConnection();
                 angular.forEach(this.handlers.open, (func) => {
                     func(evt);
@@ -302,7 +308,9 @@ angular.module('MAAS').factory(
             }
             url += path + "ws";
 
-            // Include the csrftoken in the URL if it's defined.
+            // Include the csrftoken in the URL if it's defined, along with
+            // the flag telling the region that notifications can be sent as
+            // patches. The region refuses connections without the csrftoken.
             let csrftoken;
             if(angular.isFunction(this.$cookies.get)) {
                 csrftoken = this.$cookies.get('csrftoken');
@@ -310,7 +318,8 @@ angular.module('MAAS').factory(
                 csrftoken = this.$cookies.csrftoken;
             }
             if(angular.isDefined(csrftoken)) {
-                url += '?csrftoken=' + encodeURIComponent(csrftoken);
+                url += '?csrftoken=' + encodeURIComponent(csrftoken) +
+                    '&patches=1';
             }
 
             return url;
@@ -400,14 +409,57 @@ angular.module('MAAS').factory(
 
         // Called when a notify response is recieved.
         onNotify(msg) {
+            let data = this.getNotifyData(msg);
+            if(angular.isUndefined(data)) {
+                return;
+            }
             let handlers = this.notifiers[msg.name];
             if(angular.isArray(handlers)) {
                 angular.forEach(handlers, function(handler) {
-                    handler(msg.action, msg.data);
+                    handler(msg.action, data);
                 });
             }
         }
 
+        // Return the data for a notify message, applying its patch to the
+        // previously notified data when the message contains a patch.
+        getNotifyData(msg) {
+            if(msg.action === "delete") {
+                if(angular.isDefined(this.notified[msg.name])) {
+                    delete this.notified[msg.name][msg.data];
+                }
+                return msg.data;
+            } else if(angular.isUndefined(msg.pk)) {
+                return msg.data;
+            }
+            if(angular.isUndefined(this.notified[msg.name])) {
+                this.notified[msg.name] = {};
+            }
+            let notified = this.notified[msg.name];
+            if(angular.isDefined(msg.patch)) {
+                let previous = notified[msg.pk];
+                if(angular.isUndefined(previous)) {
+                    this.log.warn(
+                        "Dropped " + msg.name + " notification for " +
+                        msg.pk + ": no data to patch.");
+                    return undefined;
+                }
+                angular.forEach(msg.patch, function(operation) {
+                    let key = operation.path.substring(1)
+                        .replace(/~1/g, "/").replace(/~0/g, "~");
+                    if(operation.op === "remove") {
+                        delete previous[key];
+                    } else {
+                        previous[key] = operation.value;
+                    }
+                });
+                return angular.copy(previous);
+            } else {
+                notified[msg.pk] = angular.copy(msg.data);
+                return msg.data;
+            }
+        }
+
         onPingReply(msg) {
             // Note: The msg.result at this point contains the last sequence
             // number received, but it isn't really relevant for us. It could
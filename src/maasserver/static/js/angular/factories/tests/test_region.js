@@ -453,7 +453,7 @@ describe("RegionConnection", function() {
             }
         });
 
-        it("includes csrftoken if cookie defined", function() {
+        it("includes csrftoken and patches if cookie defined", function() {
             var csrftoken = makeName('csrftoken');
             // No need to organize a cleanup: cookies are reset before each
             // test.
@@ -465,7 +465,7 @@ describe("RegionConnection", function() {
             expect(RegionConnection._buildUrl()).toBe(
                 "ws://" + $window.location.hostname + ":" +
                 $window.location.port + $window.location.pathname + "/ws" +
-                '?csrftoken=' + csrftoken);
+                '?csrftoken=' + csrftoken + '&patches=1');
         });
 
     });
@@ -629,6 +629,68 @@ describe("RegionConnection", function() {
             expect(handler1).toHaveBeenCalled();
             expect(handler2).toHaveBeenCalled();
         });
+
+        it("applies patch to previously notified data", function() {
+            var name = "test";
+            var handler = jasmine.createSpy();
+            RegionConnection.registerNotifier(name, handler);
+
+            RegionConnection.onNotify({
+                type: 2,
+                name: name,
+                action: "update",
+                pk: "abc",
+                data: {id: "abc", status: "Ready", "a/b": 1, extra: 2}
+            });
+            RegionConnection.onNotify({
+                type: 2,
+                name: name,
+                action: "update",
+                pk: "abc",
+                patch: [
+                    {op: "replace", path: "/status", value: "Deploying"},
+                    {op: "add", path: "/owner", value: "admin"},
+                    {op: "replace", path: "/a~1b", value: 3},
+                    {op: "remove", path: "/extra"}
+                ]
+            });
+            expect(handler).toHaveBeenCalledWith("update", {
+                id: "abc", status: "Deploying", owner: "admin", "a/b": 3
+            });
+        });
+
+        it("ignores patch without previously notified data", function() {
+            var name = "test";
+            var handler = jasmine.createSpy();
+            RegionConnection.registerNotifier(name, handler);
+
+            RegionConnection.onNotify({
+                type: 2,
+                name: name,
+                action: "update",
+                pk: "abc",
+                patch: []
+            });
+            expect(handler).not.toHaveBeenCalled();
+        });
+
+        it("forgets notified data on delete", function() {
+            var name = "test";
+            RegionConnection.onNotify({
+                type: 2,
+                name: name,
+                action: "create",
+                pk: "abc",
+                data: {id: "abc"}
+            });
+            RegionConnection.onNotify({
+                type: 2,
+                name: name,
+                action: "delete",
+                data: "abc"
+            });
+            expect(RegionConnection.notified[name]).toEqual({});
+        });
     });
 
     describe("callMethod", function() {
@@ -32,7 +32,10 @@ from django.db import (
     connections,
     transaction,
 )
-from django.http import StreamingHttpResponse
+from django.http import (
+    Http404,
+    StreamingHttpResponse,
+)
 from fixtures import (
     FakeLogger,
     Fixture,
@@ -42,6 +45,9 @@ from maasserver import (
     bootresources,
 )
 from maasserver.bootresources import (
+    BootResourceFileCache,
+    BootResourceFileResource,
+    BootResourceFilesResource,
     BootResourceRepoWriter,
     BootResourceStore,
     download_all_boot_resources,
@@ -61,6 +67,7 @@ from maasserver.enum import (
     BOOT_RESOURCE_TYPE,
     COMPONENT,
 )
+from maasserver.fields import LargeObjectFile
 from maasserver.listener import PostgresListenerService
 from maasserver.models import (
     BootResource,
@@ -131,9 +138,13 @@ from twisted.internet.defer import (
     Deferred,
     fail,
     inlineCallbacks,
+    maybeDeferred,
     succeed,
 )
 from twisted.protocols.amp import UnhandledCommand
+from twisted.web.resource import NoResource
+from twisted.web.server import NOT_DONE_YET
+from twisted.web.test.requesthelper import DummyRequest
 
 
 wait_for_reactor = wait_for(30)  # 30 seconds.
@@ -507,6 +518,179 @@ class TestSimpleStreamsHandler(MAASServerTestCase):
         self.assertIsInstance(response, StreamingHttpResponse)
 
 
+class TestBootResourceFileCache(MAASServerTestCase):
+
+    def make_cache(self):
+        return BootResourceFileCache(self.make_dir())
+
+    def test_fill_writes_content_to_cache(self):
+        cache = self.make_cache()
+        content = factory.make_bytes(size=1024)
+        largefile = factory.make_LargeFile(content=content, size=1024)
+        path = cache.fill(largefile.sha256)
+        self.assertEqual(cache.get_path(largefile.sha256), path)
+        with open(path, "rb") as stream:
+            self.assertEqual(content, stream.read())
+        self.assertTrue(cache.has_file(largefile.sha256, 1024))
+
+    def test_fill_prunes_content_of_deleted_files(self):
+        cache = self.make_cache()
+        kept = factory.make_LargeFile()
+        factory.make_file(cache.path, kept.sha256)
+        factory.make_file(cache.path, factory.make_name("sha256"))
+        largefile = factory.make_LargeFile()
+        cache.fill(largefile.sha256)
+        self.assertItemsEqual(
+            [kept.sha256, largefile.sha256], os.listdir(cache.path))
+
+    def test_fill_raises_Http404_for_incomplete_file(self):
+        cache = self.make_cache()
+        largefile = factory.make_LargeFile(
+            content=factory.make_bytes(size=512), size=1024)
+        self.assertRaises(Http404, cache.fill, largefile.sha256)
+        self.assertEqual([], os.listdir(cache.path))
+
+    def test_fill_raises_Http404_for_unknown_file(self):
+        cache = self.make_cache()
+        self.assertRaises(Http404, cache.fill, factory.make_name("sha256"))
+
+    def test_has_file_checks_size(self):
+        cache = self.make_cache()
+        sha256 = factory.make_name("sha256")
+        self.assertFalse(cache.has_file(sha256, 3))
+        factory.make_file(cache.path, sha256, contents=b"ab")
+        self.assertFalse(cache.has_file(sha256, 3))
+        self.assertTrue(cache.has_file(sha256, 2))
+
+    def test_ensure_file_returns_cached_path_without_fill(self):
+        cache = self.make_cache()
+        sha256 = factory.make_name("sha256")
+        factory.make_file(cache.path, sha256, contents=b"abc")
+        mock_fill = self.patch(cache, "fill")
+        self.assertEqual(
+            cache.get_path(sha256), extract_result(
+                cache.ensure_file(sha256, 3)))
+        self.assertThat(mock_fill, MockNotCalled())
+
+    def test_prune_removes_unknown_content(self):
+        cache = self.make_cache()
+        keep = factory.make_name("keep")
+        remove = factory.make_name("remove")
+        factory.make_file(cache.path, keep)
+        factory.make_file(cache.path, remove)
+        cache.prune([keep])
+        self.assertEqual([keep], os.listdir(cache.path))
+
+
+class TestBootResourceFileResource(MAASTestCase):
+
+    def setUp(self):
+        super(TestBootResourceFileResource, self).setUp()
+        self.patch(bootresources, "deferToDatabase", maybeDeferred)
+
+    def make_resource(self, content):
+        cache = BootResourceFileCache(self.make_dir())
+        sha256 = factory.make_name("sha256")
+        factory.make_file(cache.path, sha256, contents=content)
+        resource = BootResourceFileResource(cache)
+        self.patch(resource, "get_largefile_info").return_value = (
+            sha256, len(content))
+        return resource
+
+    def make_request(self, path=None, method=b"GET"):
+        if path is None:
+            path = [
+                factory.make_name(name).encode("utf-8")
+                for name in (
+                    "os", "arch", "subarch", "series", "version", "filename")
+            ]
+        request = DummyRequest(path[1:])
+        request.prepath = path[:1]
+        request.method = method
+        return request
+
+    def test_serves_cached_file(self):
+        content = factory.make_bytes()
+        resource = self.make_resource(content)
+        request = self.make_request()
+        self.assertIs(NOT_DONE_YET, resource.render(request))
+        self.assertEqual(content, b"".join(request.written))
+        self.assertEqual(1, request.finished)
+        self.assertThat(
+            resource.get_largefile_info, MockCalledOnceWith([
+                element.decode("utf-8")
+                for element in request.prepath + request.postpath
+            ]))
+
+    def test_serves_byte_ranges(self):
+        content = factory.make_bytes(size=10)
+        resource = self.make_resource(content)
+        request = self.make_request()
+        request.requestHeaders.setRawHeaders(b"range", [b"bytes=2-4"])
+        self.assertIs(NOT_DONE_YET, resource.render(request))
+        self.assertEqual(206, request.responseCode)
+        self.assertEqual(content[2:5], b"".join(request.written))
+        self.assertEqual(1, request.finished)
+
+    def test_HEAD_sends_headers_only(self):
+        content = factory.make_bytes(size=10)
+        resource = self.make_resource(content)
+        request = self.make_request(method=b"HEAD")
+        self.assertIs(NOT_DONE_YET, resource.render(request))
+        self.assertEqual(b"", b"".join(request.written))
+        self.assertEqual(
+            [b"10"], request.responseHeaders.getRawHeaders(b"content-length"))
+        self.assertEqual(1, request.finished)
+
+    def test_renders_not_found_for_incomplete_path(self):
+        resource = self.make_resource(b"")
+        request = self.make_request(path=[b"ubuntu", b"amd64"])
+        self.assertIsInstance(resource.render(request), bytes)
+        self.assertEqual(404, request.responseCode)
+        self.assertThat(resource.get_largefile_info, MockNotCalled())
+
+    def test_renders_not_found_for_Http404(self):
+        resource = self.make_resource(b"")
+        resource.get_largefile_info.side_effect = Http404()
+        request = self.make_request()
+        self.assertIs(NOT_DONE_YET, resource.render(request))
+        self.assertEqual(404, request.responseCode)
+        self.assertEqual(1, request.finished)
+
+    def test_renders_server_error_for_other_failures(self):
+        resource = self.make_resource(b"")
+        resource.get_largefile_info.side_effect = ZeroDivisionError()
+        request = self.make_request()
+        with TwistedLoggerFixture() as logger:
+            self.assertIs(NOT_DONE_YET, resource.render(request))
+        self.assertEqual(500, request.responseCode)
+        self.assertEqual(1, request.finished)
+        self.assertIn("Failed to serve boot resource file.", logger.output)
+
+    def test_renders_server_error_for_failures_while_serving(self):
+        resource = self.make_resource(b"")
+        self.patch(bootresources, "File").side_effect = ZeroDivisionError()
+        request = self.make_request()
+        with TwistedLoggerFixture():
+            self.assertIs(NOT_DONE_YET, resource.render(request))
+        self.assertEqual(500, request.responseCode)
+        self.assertEqual(1, request.finished)
+
+
+class TestBootResourceFilesResource(MAASTestCase):
+
+    def test_getChild_returns_file_resource(self):
+        resource = BootResourceFilesResource(sentinel.cache)
+        child = resource.getChild(b"ubuntu", DummyRequest([]))
+        self.assertIs(resource.fileResource, child)
+        self.assertIs(sentinel.cache, child.cache)
+
+    def test_getChild_leaves_streams_to_django(self):
+        resource = BootResourceFilesResource(sentinel.cache)
+        self.assertIsInstance(
+            resource.getChild(b"streams", DummyRequest([])), NoResource)
+
+
 class TestConnectionWrapper(MAASTransactionServerTestCase):
     """Tests the use of StreamingHttpResponse(ConnectionWrapper(stream)).
 
@@ -968,6 +1152,30 @@ class TestBootResourceStore(MAASServerTestCase):
         self.assertEqual(rfile.largefile.size, len(written_data))
         self.assertEqual(rfile.largefile.size, rfile.largefile.total_size)
 
+    def test_write_content_thread_commits_in_batches(self):
+        store = BootResourceStore()
+        store.read_size = 1024
+        store.commit_size = 2 * store.read_size
+        size = int(5.5 * store.read_size)
+        rfile, reader, content = make_boot_resource_file_with_stream(size=size)
+        modes = []
+        original_open = LargeObjectFile.open
+
+        def open_and_record(lobject, mode="rwb", *args, **kwargs):
+            modes.append(mode)
+            return original_open(lobject, mode, *args, **kwargs)
+
+        self.patch(LargeObjectFile, "open", open_and_record)
+        store.write_content_thread(rfile.id, reader)
+        # Two full batches, then the final partial batch.
+        self.assertEqual(['wb', 'wb', 'wb'], modes)
+        self.patch(LargeObjectFile, "open", original_open)
+        with rfile.largefile.content.open('rb') as stream:
+            written_data = stream.read()
+        self.assertEqual(content, written_data)
+        rfile.largefile = reload_object(rfile.largefile)
+        self.assertEqual(rfile.largefile.size, len(written_data))
+
     def test_write_content_doesnt_write_if_cancel(self):
         store = BootResourceStore()
         size = int(2.5 * store.read_size)
@@ -1423,6 +1631,28 @@ class TestBootResourceTransactional(MAASTransactionServerTestCase):
                     written_data = stream.read()
                 self.assertEqual(content, written_data)
 
+    def test_perform_write_continues_after_failure(self):
+        store = BootResourceStore()
+        store.write_threads = 1
+        store._content_to_finalize = {
+            1: sentinel.reader_one,
+            2: sentinel.reader_two,
+            3: sentinel.reader_three,
+        }
+        written = []
+
+        def write_content_thread(rid, reader):
+            written.append(rid)
+            if rid == 2:
+                raise factory.make_exception()
+
+        self.patch(store, "write_content_thread", write_content_thread)
+        with TwistedLoggerFixture() as logger:
+            store.perform_write()
+        self.assertItemsEqual([1, 2, 3], written)
+        self.assertEqual({}, store._content_to_finalize)
+        self.assertIn("Failed to finalize boot image.", logger.output)
+
     @asynchronous(timeout=1)
     def test_finalize_calls_notify_errback(self):
 
@@ -7,7 +7,10 @@ __all__ = []
 
 from operator import itemgetter
 import random
-from unittest.mock import ANY
+from unittest.mock import (
+    ANY,
+    Mock,
+)
 
 from crochet import wait_for
 from django.core.exceptions import ValidationError
@@ -43,6 +46,7 @@ from maasserver.utils.orm import transactional
 from maasserver.utils.threads import deferToDatabase
 from maastesting.djangotestcase import count_queries
 from maastesting.matchers import (
+    MockCalledOnce,
     MockCalledOnceWith,
     MockNotCalled,
 )
@@ -1757,6 +1761,79 @@ class TestGetDHCPConfiguration(MAASServerTestCase):
         self.assertHasConfigurationForNTP(
             config.shared_networks_v6, addr6.subnet, [addr6.ip])
 
+    def make_RackControllers_sharing_VLAN(self):
+        primary_rack = factory.make_RackController(interface=False)
+        secondary_rack = factory.make_RackController(interface=False)
+        vlan = factory.make_VLAN(
+            dhcp_on=True, primary_rack=primary_rack,
+            secondary_rack=secondary_rack)
+        subnet = factory.make_ipv4_Subnet_with_IPRanges(vlan=vlan)
+        for rack in (primary_rack, secondary_rack):
+            interface = factory.make_Interface(
+                INTERFACE_TYPE.PHYSICAL, node=rack, vlan=vlan)
+            factory.make_StaticIPAddress(
+                alloc_type=IPADDRESS_TYPE.AUTO, subnet=subnet,
+                interface=interface)
+        for _ in range(3):
+            node = factory.make_Node(interface=True)
+            factory.make_StaticIPAddress(
+                alloc_type=IPADDRESS_TYPE.STICKY, subnet=subnet,
+                interface=node.get_boot_interface())
+        return primary_rack, secondary_rack
+
+    def test__returns_same_configuration_when_sharing_cache(self):
+        primary_rack, secondary_rack = (
+            self.make_RackControllers_sharing_VLAN())
+        cache = {}
+        self.assertEqual(
+            dhcp.get_dhcp_configuration(primary_rack),
+            dhcp.get_dhcp_configuration(primary_rack, cache=cache))
+        self.assertEqual(
+            dhcp.get_dhcp_configuration(secondary_rack),
+            dhcp.get_dhcp_configuration(secondary_rack, cache=cache))
+
+    def test__shares_configuration_between_racks_through_cache(self):
+        primary_rack, secondary_rack = (
+            self.make_RackControllers_sharing_VLAN())
+        make_hosts_for_subnets = self.patch(
+            dhcp, "make_hosts_for_subnets")
+        make_hosts_for_subnets.return_value = []
+        cache = {}
+        dhcp.get_dhcp_configuration(primary_rack, cache=cache)
+        count, _ = count_queries(
+            dhcp.get_dhcp_configuration, secondary_rack, cache=cache)
+        self.assertThat(make_hosts_for_subnets, MockCalledOnce())
+        count_uncached, _ = count_queries(
+            dhcp.get_dhcp_configuration, secondary_rack)
+        self.assertLess(count, count_uncached)
+
+    def test__ignores_cache_when_testing_dhcp_snippet(self):
+        rack, _ = self.make_RackController_ready_for_DHCP()
+        cache = {}
+        dhcp.get_dhcp_configuration(rack, cache=cache)
+        dhcp_snippet = factory.make_DHCPSnippet(enabled=True)
+        config = dhcp.get_dhcp_configuration(
+            rack, test_dhcp_snippet=dhcp_snippet, cache=cache)
+        self.assertIn(
+            dhcp.make_dhcp_snippet(dhcp_snippet), config.global_dhcp_snippets)
+
+
+class TestGetShared(MAASServerTestCase):
+    """Tests for `get_shared`."""
+
+    def test__calls_make_every_time_without_cache(self):
+        make = Mock(side_effect=lambda arg: [arg])
+        self.assertEqual([1], dhcp.get_shared(None, "key", make, 1))
+        self.assertEqual([2], dhcp.get_shared(None, "key", make, 2))
+
+    def test__calls_make_once_per_key_with_cache(self):
+        make = Mock(side_effect=lambda arg: [arg])
+        cache = {}
+        value = dhcp.get_shared(cache, "key", make, 1)
+        self.assertIs(value, dhcp.get_shared(cache, "key", make, 2))
+        self.assertEqual([2], dhcp.get_shared(cache, "other", make, 2))
+        self.assertEqual(2, make.call_count)
+
 
 class TestConfigureDHCP(MAASTransactionServerTestCase):
     """Tests for `configure_dhcp`."""
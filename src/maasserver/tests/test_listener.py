@@ -5,7 +5,10 @@
 
 __all__ = []
 
-from collections import namedtuple
+from collections import (
+    namedtuple,
+    OrderedDict,
+)
 import errno
 from unittest.mock import (
     ANY,
@@ -56,6 +59,10 @@ from twisted.internet.defer import (
     DeferredQueue,
     inlineCallbacks,
 )
+from twisted.internet.task import (
+    Clock,
+    deferLater,
+)
 from twisted.logger import LogLevel
 from twisted.python.failure import Failure
 
@@ -95,10 +102,9 @@ class TestPostgresListenerService(MAASServerTestCase):
     @inlineCallbacks
     def test__calls_system_handler_on_notification(self):
         listener = PostgresListenerService()
-        # Change notifications to a frozenset. This makes sure that
-        # the system message does not go into the queue. Instead if should
+        # The system message must not go into the queue. Instead it should
         # call the handler directly in `doRead`.
-        listener.notifications = frozenset()
+        listener.notifications = OrderedDict()
         dv = DeferredValue()
         listener.register("sys_test", lambda *args: dv.set(args))
         yield listener.startService()
@@ -106,6 +112,7 @@ class TestPostgresListenerService(MAASServerTestCase):
             yield deferToDatabase(self.send_notification, "sys_test", 1)
             yield dv.get(timeout=2)
             self.assertEqual(('sys_test', '1'), dv.value)
+            self.assertEqual({}, listener.notifications)
         finally:
             yield listener.stopService()
 
@@ -133,10 +140,9 @@ class TestPostgresListenerService(MAASServerTestCase):
                             notices.put(notice)
 
         listener = PostgresListenerServiceSpy()
-        # Change notifications to a frozenset. This makes sure that
-        # the system message does not go into the queue. Instead if should
+        # The system message must not go into the queue. Instead it should
         # call the handler directly in `doRead`.
-        listener.notifications = frozenset()
+        listener.notifications = OrderedDict()
         yield listener.startService()
 
         # Use a randomised channel name even though LISTEN/NOTIFY is
@@ -156,6 +162,7 @@ class TestPostgresListenerService(MAASServerTestCase):
                     self.assertThat(notice.payload, Equals(payload))
                     # Our channel has been deleted from the listeners map.
                     self.assertFalse(channel in listener.listeners)
+                    self.assertEqual({}, listener.notifications)
                     break
         finally:
             yield listener.stopService()
@@ -164,15 +171,15 @@ class TestPostgresListenerService(MAASServerTestCase):
     @inlineCallbacks
     def test__handles_missing_notify_system_listener_on_notification(self):
         listener = PostgresListenerService()
-        # Change notifications to a frozenset. This makes sure that
-        # the system message does not go into the queue. Instead if should
+        # The system message must not go into the queue. Instead it should
         # call the handler directly in `doRead`.
-        listener.notifications = frozenset()
+        listener.notifications = OrderedDict()
         yield listener.startService()
         yield deferToDatabase(listener.registerChannel, "sys_test")
         try:
             yield deferToDatabase(self.send_notification, "sys_test", 1)
             self.assertFalse("sys_test" in listener.listeners)
+            self.assertEqual({}, listener.notifications)
         finally:
             yield listener.stopService()
 
@@ -477,6 +484,92 @@ class TestPostgresListenerService(MAASServerTestCase):
         self.assertItemsEqual(
             listener.notifications, set(notifications))
 
+    def test__doRead_keeps_first_received_time_for_duplicates(self):
+        listener = PostgresListenerService()
+        notification = FakeNotify(
+            channel=factory.make_name("channel_action"),
+            payload=factory.make_name("payload"))
+        connection = self.patch(listener, "connection")
+        connection.connection.poll.return_value = None
+        self.patch(listener_module.reactor, "seconds").side_effect = [10, 20]
+        connection.connection.notifies = [notification]
+        listener.doRead()
+        connection.connection.notifies = [notification]
+        listener.doRead()
+        self.assertEqual({notification: 10}, dict(listener.notifications))
+
+    def test__doRead_pauses_reading_when_queue_is_full(self):
+        listener = PostgresListenerService()
+        listener.NOTIFY_QUEUE_HIGH_WATER = 2
+        connection = self.patch(listener, "connection")
+        connection.connection.poll.return_value = None
+        connection.connection.notifies = [
+            FakeNotify(
+                channel=factory.make_name("channel_action"),
+                payload=factory.make_name("payload"))
+            for _ in range(2)
+            ]
+        self.patch(reactor, "removeReader")
+        listener.doRead()
+        self.assertTrue(listener.readingPaused)
+        self.assertThat(reactor.removeReader, MockCalledOnceWith(listener))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__handleNotifies_resumes_reading_when_queue_drains(self):
+        listener = PostgresListenerService()
+        listener.NOTIFY_QUEUE_LOW_WATER = 1
+        listener.listeners["machine"] = []
+        for payload in range(3):
+            listener.notifications["machine_update", str(payload)] = 0
+        listener.readingPaused = True
+        listener.connectionFileno = sentinel.fileno
+        self.patch(reactor, "addReader")
+        yield listener.handleNotifies(Clock())
+        self.assertFalse(listener.readingPaused)
+        self.assertThat(reactor.addReader, MockCalledOnceWith(listener))
+        self.assertThat(listener.notifications, HasLength(0))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__handleNotifies_holds_notifications_in_coalesce_window(self):
+        listener = PostgresListenerService()
+        handler = MagicMock()
+        listener.listeners["machine"] = [handler]
+        listener.setCoalesceWindow("machine", 2)
+        clock = Clock()
+        listener.notifications["machine_update", "1"] = clock.seconds()
+        yield listener.handleNotifies(clock)
+        self.assertThat(handler, MockNotCalled())
+        clock.advance(2)
+        yield listener.handleNotifies(clock)
+        self.assertThat(handler, MockCalledOnceWith("update", "1"))
+        self.assertThat(listener.notifications, HasLength(0))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test__handleNotifies_limits_handler_concurrency(self):
+        listener = PostgresListenerService()
+        listener.HANDLE_NOTIFY_CONCURRENCY = 2
+        running = []
+        concurrency = []
+
+        def done(_):
+            running.pop()
+
+        def handler(action, payload):
+            running.append(payload)
+            concurrency.append(len(running))
+            return deferLater(reactor, 0, lambda: None).addCallback(done)
+
+        listener.listeners["machine"] = [handler]
+        for payload in range(5):
+            listener.notifications["machine_update", str(payload)] = 0
+        yield listener.handleNotifies(Clock())
+        self.assertThat(concurrency, HasLength(5))
+        self.assertEqual(2, max(concurrency))
+        self.assertThat(listener.notifications, HasLength(0))
+
     @wait_for_reactor
     @inlineCallbacks
     def test__listener_ignores_ENOENT_when_removing_itself_from_reactor(self):
@@ -536,6 +536,16 @@ class TestAcquireNodeForm(MAASServerTestCase):
                 'ip:%s' % factory.pick_ip_in_network(
                     subnets[pick].get_ipnetwork())]})
 
+    def test_subnets_returns_node_once_with_many_addresses_on_subnet(self):
+        subnet = factory.make_Subnet()
+        node = factory.make_Node_with_Interface_on_Subnet(subnet=subnet)
+        for _ in range(2):
+            factory.make_StaticIPAddress(
+                subnet=subnet, interface=node.get_boot_interface())
+        filtered_nodes, _, _ = self.assertConstrainedNodes(
+            [node], {'subnets': ['id:%d' % subnet.id]})
+        self.assertEqual([node], list(filtered_nodes))
+
     def test_subnets_filters_by_vlan_tag(self):
         vlan_tags = list(range(1, 6))
         subnets = [
@@ -949,6 +959,15 @@ class TestAcquireNodeForm(MAASServerTestCase):
         factory.make_PhysicalBlockDevice(node=node2)
         self.assertConstrainedNodes([node1], {'storage': '0'})
 
+    def test_storage_only_matches_devices_of_otherwise_matching_nodes(self):
+        node1 = factory.make_Node(with_boot_disk=False)
+        factory.make_PhysicalBlockDevice(node=node1, formatted_root=True)
+        node2 = factory.make_Node(with_boot_disk=False)
+        factory.make_PhysicalBlockDevice(node=node2, formatted_root=True)
+        _, storage, _ = self.assertConstrainedNodes(
+            [node1], {'storage': 'root:0', 'name': node1.hostname})
+        self.assertItemsEqual([node1.id], storage)
+
     def test_storage_matches_disk_with_root_mount_on_partition(self):
         node1 = factory.make_Node(with_boot_disk=False)
         factory.make_PhysicalBlockDevice(
@@ -1404,6 +1423,20 @@ class TestAcquireNodeForm(MAASServerTestCase):
                 'eth0:subnet=%s' % subnet.cidr)})
         self.assertTrue(form.is_valid(), dict(form.errors))
 
+    def test_interfaces_only_matches_otherwise_matching_nodes(self):
+        subnet = factory.make_Subnet()
+        node1 = factory.make_Node_with_Interface_on_Subnet(subnet=subnet)
+        factory.make_Node_with_Interface_on_Subnet(subnet=subnet)
+        form = AcquireNodeForm({
+            'name': node1.hostname,
+            'interfaces': LabeledConstraintMap(
+                'eth0:subnet=%s' % subnet.cidr)})
+        self.assertTrue(form.is_valid(), dict(form.errors))
+        filtered_nodes, _, interfaces = form.filter_nodes(
+            Machine.objects.all())
+        self.assertItemsEqual([node1], filtered_nodes)
+        self.assertItemsEqual([node1.id], interfaces['eth0'])
+
     def test_interfaces_constraint_works_for_ip_address(self):
         subnet = factory.make_Subnet()
         node = factory.make_Node_with_Interface_on_Subnet(subnet=subnet)
@@ -8,12 +8,11 @@ __all__ = []
 from unittest.mock import (
     ANY,
     call,
-    create_autospec,
+    Mock,
 )
 
-from apiclient.creds import convert_tuple_to_string
 from django.db import transaction
-from fixtures import FakeLogger
+from lxml import etree
 from maasserver import (
     populate_tags as populate_tags_module,
     rpc as rpc_module,
@@ -23,22 +22,12 @@ from maasserver.models import (
     Tag,
     tag as tag_module,
 )
-from maasserver.models.user import (
-    create_auth_token,
-    get_auth_tokens,
-    get_creds_tuple,
-)
 from maasserver.populate_tags import (
-    _do_populate_tags,
+    get_details_documents,
     populate_tag_for_multiple_nodes,
     populate_tags,
     populate_tags_for_single_node,
 )
-from maasserver.rpc.testing.fixtures import MockLiveRegionToClusterRPCFixture
-from maasserver.testing.eventloop import (
-    RegionEventLoopFixture,
-    RunningEventLoopFixture,
-)
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import (
     MAASServerTestCase,
@@ -47,14 +36,9 @@ from maasserver.testing.testcase import (
 from maasserver.utils.orm import post_commit_hooks
 from maasserver.utils.threads import deferToDatabase
 from maastesting.matchers import (
-    MockCalledOnceWith,
+    MockCalledOnce,
     MockCallsMatch,
 )
-from maastesting.twisted import (
-    always_fail_with,
-    always_succeed_with,
-    extract_result,
-)
 from metadataserver.enum import (
     RESULT_TYPE,
     SCRIPT_STATUS,
@@ -63,9 +47,10 @@ from provisioningserver.refresh.node_info_scripts import (
     LLDP_OUTPUT_NAME,
     LSHW_OUTPUT_NAME,
 )
-from provisioningserver.rpc.cluster import EvaluateTag
-from provisioningserver.rpc.common import Client
-from provisioningserver.utils.twisted import asynchronous
+from provisioningserver.tags import (
+    DetailsDocumentCache,
+    merge_details,
+)
 from testtools.matchers import (
     HasLength,
     IsInstance,
@@ -102,145 +87,12 @@ def make_lldp_result(node, stdout=None, exit_status=0):
     return make_script_result(node, LLDP_OUTPUT_NAME, stdout, exit_status)
 
 
-class TestDoPopulateTags(MAASServerTestCase):
-
-    def patch_clients(self, rack_controllers):
-        clients = [
-            create_autospec(Client, instance=True)
-            for _ in rack_controllers
-        ]
-        for rack, client in zip(rack_controllers, clients):
-            client.side_effect = always_succeed_with(None)
-            client.ident = rack.system_id
-
-        _get_clients = self.patch_autospec(
-            populate_tags_module, "getAllClients")
-        _get_clients.return_value = clients
-
-        return clients
-
-    def test__makes_calls_to_each_client_given(self):
-        rack_controllers = [factory.make_RackController() for _ in range(3)]
-        clients = self.patch_clients(rack_controllers)
-
-        tag_name = factory.make_name("tag")
-        tag_definition = factory.make_name("definition")
-        tag_nsmap_prefix = factory.make_name("prefix")
-        tag_nsmap_uri = factory.make_name("uri")
-        tag_nsmap = [{"prefix": tag_nsmap_prefix, "uri": tag_nsmap_uri}]
-
-        work = []
-        rack_creds = []
-        rack_nodes = []
-        for rack, client in zip(rack_controllers, clients):
-            creds = factory.make_name("creds")
-            rack_creds.append(creds)
-            nodes = [
-                {"system_id": factory.make_Node().system_id}
-                for _ in range(3)
-            ]
-            rack_nodes.append(nodes)
-            work.append({
-                "system_id": rack.system_id,
-                "hostname": rack.hostname,
-                "client": client,
-                "tag_name": tag_name,
-                "tag_definition": tag_definition,
-                "tag_nsmap": tag_nsmap,
-                "credentials": creds,
-                "nodes": nodes,
-            })
-
-        [d] = _do_populate_tags(work)
-
-        self.assertIsNone(extract_result(d))
-
-        for rack, client, creds, nodes in zip(
-                rack_controllers, clients, rack_creds, rack_nodes):
-            self.expectThat(client, MockCallsMatch(call(
-                EvaluateTag, tag_name=tag_name, tag_definition=tag_definition,
-                system_id=rack.system_id,
-                tag_nsmap=tag_nsmap, credentials=creds, nodes=nodes)))
-
-    def test__logs_successes(self):
-        rack_controllers = [factory.make_RackController()]
-        clients = self.patch_clients(rack_controllers)
-
-        tag_name = factory.make_name("tag")
-        tag_definition = factory.make_name("definition")
-        tag_nsmap = {}
-
-        work = []
-        for rack, client in zip(rack_controllers, clients):
-            work.append({
-                "system_id": rack.system_id,
-                "hostname": rack.hostname,
-                "client": client,
-                "tag_name": tag_name,
-                "tag_definition": tag_definition,
-                "tag_nsmap": tag_nsmap,
-                "credentials": factory.make_name("creds"),
-                "nodes": [
-                    {"system_id": factory.make_Node().system_id}
-                    for _ in range(3)
-                ],
-            })
-
-        with FakeLogger("maas") as log:
-            [d] = _do_populate_tags(work)
-            self.assertIsNone(extract_result(d))
-
-        self.assertDocTestMatches(
-            "Tag tag-... (definition-...) evaluated on rack "
-            "controller ... (...)",
-            log.output)
-
-    def test__logs_failures(self):
-        rack_controllers = [factory.make_RackController()]
-        clients = self.patch_clients(rack_controllers)
-        clients[0].side_effect = always_fail_with(
-            ZeroDivisionError("splendid day for a spot of cricket"))
-
-        tag_name = factory.make_name("tag")
-        tag_definition = factory.make_name("definition")
-        tag_nsmap = {}
-
-        work = []
-        for rack, client in zip(rack_controllers, clients):
-            work.append({
-                "system_id": rack.system_id,
-                "hostname": rack.hostname,
-                "client": client,
-                "tag_name": tag_name,
-                "tag_definition": tag_definition,
-                "tag_nsmap": tag_nsmap,
-                "credentials": factory.make_name("creds"),
-                "nodes": [
-                    {"system_id": factory.make_Node().system_id}
-                    for _ in range(3)
-                ],
-            })
-
-        with FakeLogger("maas") as log:
-            [d] = _do_populate_tags(work)
-            self.assertIsNone(extract_result(d))
-
-        self.assertDocTestMatches(
-            "Tag tag-... (definition-...) could not be evaluated ... (...): "
-            "splendid day for a spot of cricket", log.output)
-
-
-class TestPopulateTagsEndToNearlyEnd(MAASTransactionServerTestCase):
-    """Tests for populating tags on racks.
-
-    This happens when there are connected rack controllers able to carry out
-    the task.
-    """
-
-    def prepare_live_rpc(self):
-        self.useFixture(RegionEventLoopFixture("rpc"))
-        self.useFixture(RunningEventLoopFixture())
-        return self.useFixture(MockLiveRegionToClusterRPCFixture())
+class TestPopulateTags(MAASTransactionServerTestCase):
+
+    def setUp(self):
+        super(TestPopulateTags, self).setUp()
+        self.patch(
+            populate_tags_module, "details_documents", DetailsDocumentCache())
 
     def test__populate_tags_fails_called_in_transaction(self):
         with transaction.atomic():
@@ -248,46 +100,85 @@ class TestPopulateTagsEndToNearlyEnd(MAASTransactionServerTestCase):
             self.assertRaises(
                 transaction.TransactionManagementError, populate_tags, tag)
 
-    def test__calls_are_made_to_all_clusters(self):
-        rpc_fixture = self.prepare_live_rpc()
-        rack_controllers = [factory.make_RackController() for _ in range(3)]
-        protocols = []
-        rack_creds = []
-        for rack in rack_controllers:
-            tokens = list(get_auth_tokens(rack.owner))
-            if len(tokens) > 0:
-                # Use the latest token.
-                token = tokens[-1]
-            else:
-                token = create_auth_token(rack.owner)
-            creds = convert_tuple_to_string(get_creds_tuple(token))
-            rack_creds.append(creds)
-
-            protocol = rpc_fixture.makeCluster(rack, EvaluateTag)
-            protocol.EvaluateTag.side_effect = always_succeed_with({})
-            protocols.append(protocol)
-        tag = factory.make_Tag(populate=False)
-
-        [d] = populate_tags(tag)
-
-        # `d` is a testing-only convenience. We must wait for it to fire, and
-        # we must do that from the reactor thread.
-        wait_for_populate = asynchronous(lambda: d)
-        wait_for_populate().wait(10)
-
-        for rack, protocol, creds in zip(
-                rack_controllers, protocols, rack_creds):
-            self.expectThat(protocol.EvaluateTag, MockCalledOnceWith(
-                protocol, tag_name=tag.name, tag_definition=tag.definition,
-                system_id=rack.system_id,
-                tag_nsmap=ANY, credentials=creds, nodes=ANY))
+    def test__populates_tag_for_all_nodes(self):
+        self.patch(populate_tags_module, "DEFAULT_BATCH_SIZE", 2)
+        with transaction.atomic():
+            nodes = [factory.make_Node() for _ in range(5)]
+            for node in nodes[:3]:
+                make_lldp_result(node, b"<bar/>")
+            tag = factory.make_Tag("bar", "//lldp:bar", populate=False)
+        populate_tags(tag)
+        with transaction.atomic():
+            self.assertItemsEqual(
+                [node.hostname for node in nodes[:3]],
+                [node.hostname for node in tag.node_set.all()])
+
+    def test__evaluates_nodes_with_cached_documents_first(self):
+        self.patch(populate_tags_module, "DEFAULT_BATCH_SIZE", 2)
+        cache = DetailsDocumentCache(max_size=2)
+        self.patch(populate_tags_module, "details_documents", cache)
+        with transaction.atomic():
+            for _ in range(5):
+                make_lldp_result(factory.make_Node(), b"<bar/>")
+            tag = factory.make_Tag("bar", "//lldp:bar", populate=False)
+        populate_tags(tag)
+        populate_tags(tag)
+        self.assertEqual(2, cache.max_size)
+        self.assertEqual((2, 8), (cache.hits, cache.misses))
+
+    def test__stops_when_tag_definition_changes(self):
+        with transaction.atomic():
+            node = factory.make_Node()
+            make_lldp_result(node, b"<bar/>")
+            tag = factory.make_Tag("bar", "//lldp:bar", populate=False)
+            Tag.objects.filter(id=tag.id).update(definition="//lldp:baz")
+        populate_tags(tag)
+        with transaction.atomic():
+            self.assertItemsEqual([], tag.node_set.all())
 
 
-class TestPopulateTagsInRegion(MAASTransactionServerTestCase):
-    """Tests for populating tags in the region.
+class TestGetDetailsDocuments(MAASServerTestCase):
 
-    This happens when there are no rack controllers to carry out the task.
-    """
+    def setUp(self):
+        super(TestGetDetailsDocuments, self).setUp()
+        self.patch(
+            populate_tags_module, "details_documents", DetailsDocumentCache())
+        self.merge_details = self.patch(
+            populate_tags_module, "merge_details",
+            Mock(side_effect=merge_details))
+
+    def test__returns_merged_documents(self):
+        node = factory.make_Node()
+        make_lshw_result(node, b"<foo/>")
+        make_lldp_result(node, b"<bar/>")
+        documents = get_details_documents([node])
+        self.assertEqual([node], list(documents))
+        expected = merge_details({"lshw": b"<foo/>", "lldp": b"<bar/>"})
+        self.assertEqual(
+            etree.tostring(expected), etree.tostring(documents[node]))
+
+    def test__reuses_cached_documents(self):
+        node = factory.make_Node()
+        make_lshw_result(node, b"<foo/>")
+        first = get_details_documents([node])[node]
+        second = get_details_documents([node])[node]
+        self.assertIs(first, second)
+        self.assertThat(self.merge_details, MockCalledOnce())
+
+    def test__merges_again_when_details_change(self):
+        node = factory.make_Node()
+        script_result = make_lshw_result(node, b"<foo/>")
+        get_details_documents([node])
+        script_result.stdout = b"<bar/>"
+        script_result.save()
+        document = get_details_documents([node])[node]
+        self.assertThat(
+            self.merge_details, MockCallsMatch(call(ANY), call(ANY)))
+        self.assertEqual(1, len(document.xpath("/bar")))
+
+
+class TestPopulateTagsInRegion(MAASTransactionServerTestCase):
+    """Tests for populating tags in the region."""
 
     def test__saving_tag_schedules_node_population(self):
         clock = self.patch(tag_module, "reactor", Clock())
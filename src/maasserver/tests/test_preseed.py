@@ -337,6 +337,18 @@ class TestGetPreseedTemplate(MAASServerTestCase):
             (template_path, template_content),
             get_preseed_template([template_filename]))
 
+    def test_get_preseed_template_ignores_directories(self):
+        template_content = factory.make_string()
+        template_path = self.make_file(contents=template_content)
+        location = os.path.dirname(template_path)
+        directory = factory.make_name("directory")
+        os.mkdir(os.path.join(location, directory))
+        self.patch(settings, "PRESEED_TEMPLATE_LOCATIONS", [location])
+        self.assertEqual(
+            (template_path, template_content),
+            get_preseed_template(
+                [directory, os.path.basename(template_path)]))
+
 
 class TestLoadPreseedTemplate(MAASServerTestCase):
     """Tests for `load_preseed_template`."""
@@ -443,6 +455,38 @@ class TestLoadPreseedTemplate(MAASServerTestCase):
         self.assertRaises(
             TemplateNotFoundError, template.substitute)
 
+    def test_load_preseed_template_reuses_parsed_template(self):
+        prefix = factory.make_string()
+        self.create_template(self.location, prefix)
+        node = factory.make_Node()
+        template = load_preseed_template(node, prefix)
+        other_node = factory.make_Node()
+        other_template = load_preseed_template(other_node, prefix)
+        self.assertIsNot(template, other_template)
+        self.assertIs(template._parsed, other_template._parsed)
+        self.assertIsNot(template.get_template, other_template.get_template)
+
+    def test_load_preseed_template_reparses_changed_template(self):
+        prefix = factory.make_string()
+        self.create_template(self.location, prefix)
+        node = factory.make_Node()
+        load_preseed_template(node, prefix)
+        content = self.create_template(self.location, prefix)
+        template = load_preseed_template(node, prefix)
+        self.assertEqual(content, template.substitute())
+
+    def test_load_preseed_template_reparses_touched_template(self):
+        prefix = factory.make_string()
+        self.create_template(self.location, prefix, "foo")
+        node = factory.make_Node()
+        template = load_preseed_template(node, prefix)
+        path = os.path.join(self.location, prefix)
+        stat = os.stat(path)
+        self.create_template(self.location, prefix, "bar")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        template = load_preseed_template(node, prefix)
+        self.assertEqual("bar", template.substitute())
+
 
 class TestPreseedContext(MAASServerTestCase):
     """Tests for `get_preseed_context`."""
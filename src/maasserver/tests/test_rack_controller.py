@@ -337,7 +337,7 @@ class TestRackControllerService(MAASTransactionServerTestCase):
         mock_processDHCP = self.patch(service, "processDHCP")
         service.startProcessing()
         yield service.processingDone
-        self.assertThat(mock_processDHCP, MockCalledOnceWith(rack_id))
+        self.assertThat(mock_processDHCP, MockCalledOnceWith(rack_id, {}))
 
     @wait_for_reactor
     @inlineCallbacks
@@ -356,7 +356,7 @@ class TestRackControllerService(MAASTransactionServerTestCase):
         for _ in range(len(rack_ids)):
             yield service.processingDone
         for rack_id in rack_ids:
-            self.assertThat(mock_processDHCP, MockAnyCall(rack_id))
+            self.assertThat(mock_processDHCP, MockAnyCall(rack_id, {}))
 
     @wait_for_reactor
     @inlineCallbacks
@@ -376,7 +376,40 @@ class TestRackControllerService(MAASTransactionServerTestCase):
         for _ in range(2):
             yield service.processingDone
         self.assertThat(
-            mock_processDHCP, MockCallsMatch(call(rack_id), call(rack_id)))
+            mock_processDHCP,
+            MockCallsMatch(call(rack_id, {}), call(rack_id, {})))
+
+    def test_process_calls_processDHCP_concurrently(self):
+        rack_ids = random.sample(range(100), 3)
+        service = RackControllerService(
+            sentinel.ipcWorker, sentinel.listener)
+        service.watching = set(rack_ids)
+        service.needsDHCPUpdate = set(rack_ids)
+        service.running = True
+        service.concurrency = 2
+        pending = [Deferred(), Deferred()]
+        mock_processDHCP = self.patch(service, "processDHCP")
+        mock_processDHCP.side_effect = pending
+        done = service.process()
+        self.assertEqual(2, mock_processDHCP.call_count)
+        self.assertEqual(1, len(service.needsDHCPUpdate))
+        self.assertFalse(done.called)
+        for d in pending:
+            d.callback(None)
+        self.assertTrue(done.called)
+
+    def test_process_shares_cache_between_racks_in_one_pass(self):
+        rack_ids = random.sample(range(100), 3)
+        service = RackControllerService(
+            sentinel.ipcWorker, sentinel.listener)
+        service.watching = set(rack_ids)
+        service.needsDHCPUpdate = set(rack_ids)
+        service.running = True
+        mock_processDHCP = self.patch(service, "processDHCP")
+        mock_processDHCP.return_value = succeed(None)
+        service.process()
+        caches = {id(args[1]) for args, _ in mock_processDHCP.call_args_list}
+        self.assertEqual(1, len(caches))
 
     @wait_for_reactor
     @inlineCallbacks
@@ -388,6 +421,7 @@ class TestRackControllerService(MAASTransactionServerTestCase):
         mock_configure_dhcp = self.patch(
             rack_controller.dhcp, "configure_dhcp")
         mock_configure_dhcp.return_value = succeed(None)
-        yield service.processDHCP(rack.id)
+        yield service.processDHCP(rack.id, sentinel.cache)
         self.assertThat(
-            mock_configure_dhcp, MockCalledOnceWith(rack))
+            mock_configure_dhcp,
+            MockCalledOnceWith(rack, cache=sentinel.cache))
@@ -8,6 +8,7 @@ __all__ = []
 from contextlib import closing
 
 from django.db import connection
+from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.triggers import (
     register_procedure,
@@ -311,3 +312,29 @@ class TestTriggersUsed(MAASServerTestCase):
     def test_register_websocket_triggers_does_not_introduce_more(self):
         register_websocket_triggers()
         self.check_triggers_in_database()
+
+
+class TestNodeRelatedNotifyOnce(MAASServerTestCase):
+    """Tests for the `node_related_notify_once` procedure."""
+
+    def get_notified(self):
+        with closing(connection.cursor()) as cursor:
+            cursor.execute(
+                "SELECT current_setting('maas.node_related_notified', true)")
+            [notified] = cursor.fetchone()
+        return [int(node_id) for node_id in notified.strip(",").split(",")]
+
+    def test_records_each_node_once_per_transaction(self):
+        register_websocket_triggers()
+        node = factory.make_Node()
+        for _ in range(3):
+            factory.make_Interface(node=node)
+        self.assertEqual(1, self.get_notified().count(node.id))
+
+    def test_records_each_node_notified(self):
+        register_websocket_triggers()
+        nodes = [factory.make_Node() for _ in range(3)]
+        for node in nodes:
+            factory.make_Interface(node=node)
+        self.assertLessEqual(
+            {node.id for node in nodes}, set(self.get_notified()))
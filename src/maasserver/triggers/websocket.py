@@ -38,6 +38,54 @@ from maasserver.utils.orm import transactional
 # test_listener where all the Twisted infrastructure is already in place.
 
 
+# Procedure that sends machine_update, controller_update or device_update for
+# the node with the given id, depending on its node type. Rows related to a
+# node are often changed many at a time, e.g. the interfaces, block devices
+# and script results written while commissioning, so the ids of the nodes
+# already notified are kept in a transaction-local setting and each node is
+# notified at most once per transaction. The listener fetches the node after
+# the commit, so the later notifications would carry nothing new.
+NODE_RELATED_NOTIFY_ONCE = dedent("""\
+    CREATE OR REPLACE FUNCTION node_related_notify_once(node_id integer)
+    RETURNS void AS $$
+    DECLARE
+      notified text;
+      node RECORD;
+      pnode RECORD;
+    BEGIN
+      IF node_id IS NOT NULL THEN
+        notified := coalesce(
+          current_setting('maas.node_related_notified', true), '');
+        IF position(',' || node_id || ',' IN notified) > 0 THEN
+          RETURN;
+        END IF;
+        PERFORM set_config(
+          'maas.node_related_notified',
+          coalesce(nullif(notified, ''), ',') || node_id || ',', true);
+      END IF;
+
+      SELECT system_id, node_type, parent_id INTO node
+      FROM maasserver_node
+      WHERE id = node_id;
+
+      IF node.node_type = %d THEN
+        PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
+      ELSIF node.node_type IN (%d, %d, %d) THEN
+        PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
+      ELSIF node.parent_id IS NOT NULL THEN
+        SELECT system_id INTO pnode
+        FROM maasserver_node
+        WHERE id = node.parent_id;
+        PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
+      ELSE
+        PERFORM pg_notify('device_update',CAST(node.system_id AS text));
+      END IF;
+    END;
+    $$ LANGUAGE plpgsql;
+    """ % (NODE_TYPE.MACHINE, NODE_TYPE.RACK_CONTROLLER,
+           NODE_TYPE.REGION_CONTROLLER, NODE_TYPE.REGION_AND_RACK_CONTROLLER))
+
+
 # Procedure that is called when a tag is added or removed from a node/device.
 # Sends a notify message for machine_update or device_update depending on if
 # the node type is node.
@@ -282,30 +330,17 @@ INTERFACE_IP_ADDRESS_DOMAIN_NOTIFY = dedent("""\
 
 # Procedure that is called when a static ip address is linked or unlinked to
 # an Interface. Sends a notify message for machine_update or device_update
-# depending on if the node type is node.
+# depending on if the node type is node, once per transaction.
 INTERFACE_IP_ADDRESS_NODE_NOTIFY = dedent("""\
     CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
     DECLARE
-      node RECORD;
-      pnode RECORD;
+      iface RECORD;
     BEGIN
-      SELECT system_id, node_type, parent_id INTO node
-      FROM maasserver_node, maasserver_interface
-      WHERE maasserver_node.id = maasserver_interface.node_id
-      AND maasserver_interface.id = %s;
+      SELECT node_id INTO iface
+      FROM maasserver_interface
+      WHERE id = %s;
 
-      IF node.node_type = %d THEN
-        PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
-      ELSIF node.node_type IN (%d, %d, %d) THEN
-        PERFORM pg_notify('controller_update',CAST(node.system_id AS text));
-      ELSIF node.parent_id IS NOT NULL THEN
-        SELECT system_id INTO pnode
-        FROM maasserver_node
-        WHERE id = node.parent_id;
-        PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
-      ELSE
-        PERFORM pg_notify('device_update',CAST(node.system_id AS text));
-      END IF;
+      PERFORM node_related_notify_once(iface.node_id);
       RETURN NEW;
     END;
     $$ LANGUAGE plpgsql;
@@ -1072,32 +1107,12 @@ def render_node_related_notification_procedure(proc_name, node_id_relation):
     return dedent("""\
         CREATE OR REPLACE FUNCTION %s() RETURNS trigger AS $$
         DECLARE
-          node RECORD;
-          pnode RECORD;
         BEGIN
-          SELECT system_id, node_type, parent_id INTO node
-          FROM maasserver_node
-          WHERE id = %s;
-
-          IF node.node_type = %d THEN
-            PERFORM pg_notify('machine_update',CAST(node.system_id AS text));
-          ELSIF node.node_type IN (%d, %d, %d) THEN
-            PERFORM pg_notify('controller_update',CAST(
-              node.system_id AS text));
-          ELSIF node.parent_id IS NOT NULL THEN
-            SELECT system_id INTO pnode
-            FROM maasserver_node
-            WHERE id = node.parent_id;
-            PERFORM pg_notify('machine_update',CAST(pnode.system_id AS text));
-          ELSE
-            PERFORM pg_notify('device_update',CAST(node.system_id AS text));
-          END IF;
+          PERFORM node_related_notify_once(%s);
           RETURN NEW;
         END;
         $$ LANGUAGE plpgsql;
-        """ % (proc_name, node_id_relation, NODE_TYPE.MACHINE,
-               NODE_TYPE.RACK_CONTROLLER, NODE_TYPE.REGION_CONTROLLER,
-               NODE_TYPE.REGION_AND_RACK_CONTROLLER))
+        """ % (proc_name, node_id_relation))
 
 
 def render_switch_notification_procedure(proc_name, event_name,
@@ -1268,6 +1283,9 @@ node_fields = (
 @transactional
 def register_websocket_triggers():
     """Register all websocket triggers into the database."""
+    # Shared by the procedures for tables related to nodes.
+    register_procedure(NODE_RELATED_NOTIFY_ONCE)
+
     for (proc_name_prefix, event_name_prefix, node_type) in (
         ('machine', 'machine', NODE_TYPE.MACHINE),
         ('rack_controller', 'controller', NODE_TYPE.RACK_CONTROLLER),
@@ -1740,14 +1758,10 @@ def register_websocket_triggers():
     # MAC static ip address table, update to linked node.
     register_procedure(
         INTERFACE_IP_ADDRESS_NODE_NOTIFY % (
-            'nd_sipaddress_link_notify', 'NEW.interface_id',
-            NODE_TYPE.MACHINE, NODE_TYPE.RACK_CONTROLLER,
-            NODE_TYPE.REGION_CONTROLLER, NODE_TYPE.REGION_AND_RACK_CONTROLLER))
+            'nd_sipaddress_link_notify', 'NEW.interface_id'))
     register_procedure(
         INTERFACE_IP_ADDRESS_NODE_NOTIFY % (
-            'nd_sipaddress_unlink_notify', 'OLD.interface_id',
-            NODE_TYPE.MACHINE, NODE_TYPE.RACK_CONTROLLER,
-            NODE_TYPE.REGION_CONTROLLER, NODE_TYPE.REGION_AND_RACK_CONTROLLER))
+            'nd_sipaddress_unlink_notify', 'OLD.interface_id'))
     register_trigger(
         "maasserver_interface_ip_addresses",
         "nd_sipaddress_link_notify", "insert")
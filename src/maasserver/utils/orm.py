@@ -11,6 +11,7 @@ __all__ = [
     'gen_retry_intervals',
     'get_exception_class',
     'get_first',
+    'get_first_skip_locked',
     'get_one',
     'in_transaction',
     'is_deadlock_failure',
@@ -144,6 +145,27 @@ def get_first(items):
         return first_item[0]
 
 
+def get_first_skip_locked(queryset):
+    """Get the first of `queryset` not locked by another transaction, or None.
+
+    The object returned is locked, as with ``SELECT ... FOR UPDATE SKIP
+    LOCKED``, until this transaction ends. Concurrent transactions calling
+    this with the same `queryset` therefore each get a different object,
+    without waiting for one another.
+
+    Candidates are locked one at a time in the order of `queryset`, so that
+    this also works for querysets that cannot be locked directly, like those
+    using DISTINCT.
+    """
+    model = queryset.model
+    for candidate in queryset.iterator():
+        locked = model.objects.filter(id=candidate.id).select_for_update(
+            skip_locked=True).values_list('id', flat=True)
+        if len(locked) != 0:
+            return candidate
+    return None
+
+
 def psql_array(items, sql_type=None):
     """Return PostgreSQL array string and parameters."""
     sql = (
@@ -534,6 +556,34 @@ def noop():
     """Do nothing."""
 
 
+def get_retryable_failure_reason(exception):
+    """Return a short description of why `exception` is retryable.
+
+    :return: One of "serialization_failure", "deadlock", "unique_violation",
+        "foreign_key_violation", or `None` if `exception` is not a retryable
+        failure.
+    """
+    if is_serialization_failure(exception):
+        return "serialization_failure"
+    elif is_deadlock_failure(exception):
+        return "deadlock"
+    elif is_unique_violation(exception):
+        return "unique_violation"
+    elif is_foreign_key_violation(exception):
+        return "foreign_key_violation"
+    else:
+        return None
+
+
+def count_retry(reason):
+    """Count a transaction retry for `reason` in the Prometheus metrics."""
+    # Imported here because the metrics depend on the models, which depend on
+    # this module.
+    from maasserver.prometheus.metrics import PROMETHEUS_METRICS
+    PROMETHEUS_METRICS.update(
+        'db_transaction_retries', 'inc', labels={'reason': reason})
+
+
 def retry_on_retryable_failure(func, reset=noop):
     """Retry the wrapped function when it raises a retryable failure.
 
@@ -552,6 +602,8 @@ def retry_on_retryable_failure(func, reset=noop):
         with a retryable failure it will *not* be called. If an attempt
         fails with a non-retryable failure, it will *not* be called.
 
+    Each retry is counted in the ``db_transaction_retries`` metric, labelled
+    with the reason; see `get_retryable_failure_reason`.
     """
     @wraps(func)
     def retrier(*args, **kwargs):
@@ -562,14 +614,17 @@ def retry_on_retryable_failure(func, reset=noop):
                 try:
                     return func(*args, **kwargs)
                 except RetryTransaction:
+                    count_retry("requested")
                     reset()  # Which may do nothing.
                     sleep(next(intervals))
                 except DatabaseError as error:
-                    if is_retryable_failure(error):
+                    reason = get_retryable_failure_reason(error)
+                    if reason is None:
+                        raise
+                    else:
+                        count_retry(reason)
                         reset()  # Which may do nothing.
                         sleep(next(intervals))
-                    else:
-                        raise
             else:
                 retry_context.prepare()
                 try:
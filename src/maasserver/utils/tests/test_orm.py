@@ -11,6 +11,7 @@ from itertools import (
     repeat,
 )
 from random import randint
+import threading
 import unittest
 from unittest.mock import (
     ANY,
@@ -31,7 +32,11 @@ from django.db.utils import (
     IntegrityError,
     OperationalError,
 )
-from maasserver.models import Node
+from maasserver.models import (
+    Node,
+    Zone,
+)
+from maasserver.prometheus import metrics as metrics_module
 from maasserver.testing.testcase import (
     MAASServerTestCase,
     MAASTransactionServerTestCase,
@@ -47,6 +52,7 @@ from maasserver.utils.orm import (
     ExclusivelyConnected,
     FullyConnected,
     get_first,
+    get_first_skip_locked,
     get_model_object_name,
     get_one,
     get_psycopg2_deadlock_exception,
@@ -221,6 +227,47 @@ class TestGetFirst(MAASTestCase):
         self.assertEqual("Item 1", get_first(multiple_items()))
 
 
+class TestGetFirstSkipLocked(MAASTransactionServerTestCase):
+
+    def make_zones(self, count):
+        zones = [
+            Zone.objects.create(name=factory.make_name("zone"))
+            for _ in range(count)
+        ]
+        queryset = Zone.objects.filter(
+            id__in=[zone.id for zone in zones]).order_by('id')
+        return zones, queryset
+
+    def test_returns_None_when_nothing_matches(self):
+        _, queryset = self.make_zones(0)
+        with transaction.atomic():
+            self.assertIsNone(get_first_skip_locked(queryset))
+
+    def test_returns_first_object(self):
+        zones, queryset = self.make_zones(3)
+        with transaction.atomic():
+            self.assertEqual(zones[0], get_first_skip_locked(queryset))
+
+    def test_skips_objects_locked_by_other_transactions(self):
+        zones, queryset = self.make_zones(3)
+        found_elsewhere = []
+
+        def get_first_in_other_transaction():
+            try:
+                with transaction.atomic():
+                    found_elsewhere.append(get_first_skip_locked(queryset))
+            finally:
+                connection.close()
+
+        with transaction.atomic():
+            self.assertEqual(zones[0], get_first_skip_locked(queryset))
+            thread = threading.Thread(target=get_first_in_other_transaction)
+            thread.start()
+            thread.join()
+
+        self.assertEqual([zones[1]], found_elsewhere)
+
+
 class TestSerializationFailure(SerializationFailureTestCase):
     """Detecting SERIALIZABLE isolation failures."""
 
@@ -562,6 +609,20 @@ class TestRetryOnRetryableFailure(SerializationFailureTestCase, NoSleepMixin):
         self.assertEqual(sentinel.result, function_wrapped())
         self.assertThat(function, MockCallsMatch(call(), call()))
 
+    def test_counts_retries_by_reason(self):
+        count_retry = self.patch(orm, "count_retry")
+        function = self.make_mock_function()
+        function.side_effect = [orm.make_deadlock_failure(), sentinel.result]
+        function_wrapped = retry_on_retryable_failure(function)
+        self.assertEqual(sentinel.result, function_wrapped())
+        self.assertThat(count_retry, MockCalledOnceWith("deadlock"))
+
+    def test_count_retry_updates_metric(self):
+        metrics = self.patch(metrics_module, "PROMETHEUS_METRICS")
+        orm.count_retry("deadlock")
+        self.assertThat(metrics.update, MockCalledOnceWith(
+            'db_transaction_retries', 'inc', labels={'reason': 'deadlock'}))
+
     def test_retries_on_deadlock_failure(self):
         function = self.make_mock_function()
         function.side_effect = orm.make_deadlock_failure()
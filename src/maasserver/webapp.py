@@ -14,6 +14,10 @@ import socket
 
 from django.conf import settings
 from maasserver import concurrency
+from maasserver.bootresources import (
+    BootResourceFileCache,
+    BootResourceFilesResource,
+)
 from maasserver.utils.threads import deferToDatabase
 from maasserver.utils.views import WebApplicationHandler
 from maasserver.websockets.protocol import WebSocketFactory
@@ -204,6 +208,9 @@ class WebApplicationService(StreamServerEndpointService):
         maas = Resource()
         maas.putChild(b'metadata', metadata)
         maas.putChild(b'static', File(settings.STATIC_ROOT))
+        maas.putChild(
+            b'images-stream',
+            BootResourceFilesResource(BootResourceFileCache()))
         maas.putChild(
             b'ws',
             WebSocketsResource(lookupProtocolForFactory(self.websocket)))
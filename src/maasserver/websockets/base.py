@@ -170,10 +170,24 @@ class Handler(metaclass=HandlerMetaclass):
         # correct notifications based on what items the client has.
         if "loaded_pks" not in self.cache:
             self.cache["loaded_pks"] = set()
+        # Shared between all handlers processing the same notification. Set
+        # by the protocol factory so that an object is only dehydrated once
+        # for every connection that needs it.
+        self.notify_cache = None
 
     def full_dehydrate(self, obj, for_list=False):
         """Convert the given object into a dictionary.
 
+        :param for_list: True when the object is being converted to belong
+            in a list.
+        """
+        data = self._full_dehydrate_for_all_users(obj, for_list=for_list)
+        return self.dehydrate_for_user(obj, data, for_list=for_list)
+
+    def _full_dehydrate_for_all_users(self, obj, for_list=False):
+        """Convert the given object into a dictionary, leaving out the
+        parts that depend on the user.
+
         :param for_list: True when the object is being converted to belong
             in a list.
         """
@@ -211,9 +225,6 @@ class Handler(metaclass=HandlerMetaclass):
                 else:
                     data[field_name] = field.value_to_string(obj)
 
-        # Add permissions that can be performed on this object.
-        data = self._add_permissions(obj, data)
-
         # Return the data after the final dehydrate.
         return self.dehydrate(obj, data, for_list=for_list)
 
@@ -227,6 +238,21 @@ class Handler(metaclass=HandlerMetaclass):
         """
         return data
 
+    def dehydrate_for_user(self, obj, data, for_list=False):
+        """Add the info to `data` that depends on the user.
+
+        The rest of the data may be shared between the handlers of different
+        users, so `dehydrate` must not depend on the user; the permissions and
+        actions of the user go here instead.
+
+        :param obj: object being dehydrated.
+        :param data: dictionary to place extra info.
+        :param for_list: True when the object is being converted to belong
+            in a list.
+        """
+        # Add permissions that can be performed on this object.
+        return self._add_permissions(obj, data)
+
     def _is_foreign_key_for(self, field_name, obj, value):
         """Given the specified field name for the specified object, returns
         True if the specified value is a foreign key; otherwise returns False.
@@ -547,10 +573,7 @@ class Handler(metaclass=HandlerMetaclass):
                 return None
 
         self.user.refresh_from_db()
-        try:
-            obj = self.listen(channel, action, pk)
-        except HandlerDoesNotExistError:
-            obj = None
+        obj = self._listen_shared(channel, action, pk)
         if action == "create" and obj is not None:
             if pk in self.cache['loaded_pks']:
                 # The user already knows about this node, so its not a create
@@ -591,7 +614,7 @@ class Handler(metaclass=HandlerMetaclass):
             return (
                 self._meta.handler_name,
                 action,
-                self.full_dehydrate(obj, for_list=False),
+                self._dehydrate_shared(pk, obj, for_list=False),
                 )
         else:
             # Not active so only send the data like it was comming from
@@ -599,9 +622,49 @@ class Handler(metaclass=HandlerMetaclass):
             return (
                 self._meta.handler_name,
                 action,
-                self.full_dehydrate(obj, for_list=True),
+                self._dehydrate_shared(pk, obj, for_list=True),
                 )
 
+    def _listen_shared(self, channel, action, pk):
+        """Return the result of `listen` for `pk`, or `None` if it does not
+        exist.
+
+        When `notify_cache` is set the result is shared with all the other
+        handlers of the same class processing the same notification for the
+        same user; the object is fetched through a queryset filtered on the
+        user's permissions.
+        """
+        if self.notify_cache is None:
+            key = None
+        else:
+            key = ("listen", type(self), self.user.id, pk)
+            if key in self.notify_cache:
+                return self.notify_cache[key]
+        try:
+            obj = self.listen(channel, action, pk)
+        except HandlerDoesNotExistError:
+            obj = None
+        if key is not None:
+            self.notify_cache[key] = obj
+        return obj
+
+    def _dehydrate_shared(self, pk, obj, for_list=False):
+        """Return `full_dehydrate` for `obj`.
+
+        When `notify_cache` is set the data that does not depend on the user
+        is shared with all the other handlers of the same class processing
+        the same notification, and only `dehydrate_for_user` is called for
+        each.
+        """
+        if self.notify_cache is None:
+            return self.full_dehydrate(obj, for_list=for_list)
+        key = ("dehydrate", type(self), pk, for_list)
+        if key not in self.notify_cache:
+            self.notify_cache[key] = self._full_dehydrate_for_all_users(
+                obj, for_list=for_list)
+        data = dict(self.notify_cache[key])
+        return self.dehydrate_for_user(obj, data, for_list=for_list)
+
     def listen(self, channel, action, pk):
         """Called when the handler listens for events on channels with
         `Meta.listen_channels`.
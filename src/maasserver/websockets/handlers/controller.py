@@ -33,6 +33,7 @@ class ControllerHandler(MachineHandler):
         )
         allowed_methods = [
             'list',
+            'query',
             'get',
             'create',
             'update',
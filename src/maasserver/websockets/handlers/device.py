@@ -72,6 +72,7 @@ class DeviceHandler(NodeHandler):
         )
         allowed_methods = [
             'list',
+            'query',
             'get',
             'set_active',
             'create',
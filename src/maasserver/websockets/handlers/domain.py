@@ -57,7 +57,9 @@ class DomainHandler(TimestampedModelHandler, AdminOnlyMixin):
             "domain",
         ]
 
-    def dehydrate(self, domain, data, for_list=False):
+    def dehydrate_for_user(self, domain, data, for_list=False):
+        # The resource records are filtered on the user's permissions.
+        data = super().dehydrate_for_user(domain, data, for_list=for_list)
         rrsets = domain.render_json_for_related_rrdata(
             for_list=for_list, user=self.user)
         if not for_list:
@@ -115,6 +115,7 @@ class MachineHandler(NodeHandler):
         )
         allowed_methods = [
             'list',
+            'query',
             'get',
             'create',
             'update',
@@ -31,15 +31,18 @@ from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.tag import Tag
 from maasserver.models.virtualblockdevice import VirtualBlockDevice
 from maasserver.node_action import compile_node_actions
+from maasserver.node_constraint_filter_forms import AcquireNodeForm
 from maasserver.third_party_drivers import get_third_party_driver
 from maasserver.utils.converters import (
     human_readable_bytes,
     XMLToYAML,
 )
+from maasserver.utils.forms import get_QueryDict
 from maasserver.utils.osystems import make_hwe_kernel_ui_text
 from maasserver.websockets.base import (
     dehydrate_datetime,
     HandlerError,
+    HandlerValidationError,
 )
 from maasserver.websockets.handlers.event import dehydrate_event_type_level
 from maasserver.websockets.handlers.timestampedmodel import (
@@ -59,6 +62,23 @@ from provisioningserver.refresh.node_info_scripts import (
 from provisioningserver.tags import merge_details_cleanly
 
 
+# Keys that a query window can be sorted on, mapped to the ordering used on
+# the queryset.
+WINDOW_SORT_KEYS = {
+    "architecture": "architecture",
+    "cpu_count": "cpu_count",
+    "domain": "domain__name",
+    "hostname": "hostname",
+    "memory": "memory",
+    "owner": "owner__username",
+    "pool": "pool__name",
+    "power_state": "power_state",
+    "status": "status",
+    "system_id": "system_id",
+    "zone": "zone__name",
+}
+
+
 NODE_TYPE_TO_LINK_TYPE = {
     NODE_TYPE.DEVICE: 'device',
     NODE_TYPE.MACHINE: 'machine',
@@ -183,7 +203,6 @@ class NodeHandler(TimestampedModelHandler):
     def dehydrate(self, obj, data, for_list=False):
         """Add extra fields to `data`."""
         data["fqdn"] = obj.fqdn
-        data["actions"] = list(compile_node_actions(obj, self.user).keys())
         data["node_type_display"] = obj.get_node_type_display()
         data["link_type"] = NODE_TYPE_TO_LINK_TYPE[obj.node_type]
 
@@ -347,6 +366,12 @@ class NodeHandler(TimestampedModelHandler):
 
         return data
 
+    def dehydrate_for_user(self, obj, data, for_list=False):
+        """Add the permissions and actions of the user to `data`."""
+        data = super().dehydrate_for_user(obj, data, for_list=for_list)
+        data["actions"] = list(compile_node_actions(obj, self.user).keys())
+        return data
+
     def _cache_script_results(self, nodes):
         """Refresh the ScriptResult cache from the given node."""
         script_results = ScriptResult.objects.filter(
@@ -405,6 +430,99 @@ class NodeHandler(TimestampedModelHandler):
         self._cache_script_results([obj])
         return super().on_listen_for_active_pk(action, pk, obj)
 
+    def get_window_queryset(self, params):
+        """Return the filtered and sorted `QuerySet` for a query window.
+
+        :param filter: Constraints as accepted by `AcquireNodeForm`.
+        :param sort: List of keys from `WINDOW_SORT_KEYS` to sort on, each
+            optionally prefixed with "-" for descending order.
+        """
+        queryset = self.get_queryset(for_list=True)
+        constraints = params.get("filter")
+        if constraints:
+            form = AcquireNodeForm(data=get_QueryDict(constraints))
+            if not form.is_valid():
+                raise HandlerValidationError(form.errors)
+            queryset, _, _ = form.filter_nodes(queryset)
+        ordering = []
+        for key in params.get("sort", []):
+            descending = key.startswith("-")
+            field = WINDOW_SORT_KEYS.get(key.lstrip("-"))
+            if field is None:
+                raise HandlerValidationError({
+                    "sort": ["Unknown sort key: %s" % key]})
+            ordering.append("-" + field if descending else field)
+        # Always finish with the primary key so the ordering is stable
+        # between windows.
+        ordering.append(self._meta.pk)
+        return queryset.order_by(*ordering)
+
+    def query(self, params):
+        """Return a window of the filtered and sorted objects.
+
+        Only objects inside the window (and the active object) are sent to
+        the client in notifications until the next call to `query`.
+
+        :param filter: Constraints as accepted by `AcquireNodeForm`.
+        :param sort: List of keys to sort on.
+        :param offset: Offset of the window into the sorted objects.
+        :param limit: Maximum number of objects in the window.
+        :return: A dict with the `count` of all matching objects and the
+            `items` in the window.
+        """
+        queryset = self.get_window_queryset(params)
+        offset = int(params.get("offset", 0))
+        limit = params.get("limit")
+        if limit is None:
+            objs = list(queryset[offset:])
+        else:
+            objs = list(queryset[offset:offset + int(limit)])
+        self._cache_pks(objs)
+        self.cache["window"] = {
+            # Notifications are checked against the filtered objects, so the
+            # filter is only validated here, once per window.
+            "matching": queryset if params.get("filter") else None,
+            "pks": {getattr(obj, self._meta.pk) for obj in objs},
+        }
+        return {
+            "count": queryset.count(),
+            "items": [
+                self.full_dehydrate(obj, for_list=True)
+                for obj in objs
+            ],
+        }
+
+    def in_window(self, pk):
+        """Return whether notifications for `pk` should go to the client.
+
+        True when no query window is set, when `pk` is the active object, or
+        when `pk` is in the window and still matches the window's filter.
+        """
+        window = self.cache.get("window")
+        if window is None or pk == self.cache.get("active_pk"):
+            return True
+        if pk not in window["pks"]:
+            return False
+        if window["matching"] is not None:
+            return window["matching"].filter(**{
+                self._meta.pk: pk}).exists()
+        return True
+
+    def on_listen(self, channel, action, pk):
+        """Only send notifications for objects inside the query window."""
+        if action != "delete":
+            pk = self._meta.pk_type(pk)
+            window = self.cache.get("window")
+            if not self.in_window(pk):
+                if pk in self.cache["loaded_pks"] and pk in window["pks"]:
+                    # The object no longer matches the window's filter; to
+                    # the client this is a delete.
+                    window["pks"].discard(pk)
+                    self.cache["loaded_pks"].discard(pk)
+                    return (self._meta.handler_name, "delete", pk)
+                return None
+        return super().on_listen(channel, action, pk)
+
     def dehydrate_blockdevice(self, blockdevice, obj):
         """Return `BlockDevice` formatted for JSON encoding."""
         # model and serial are currently only avalible on physical block
@@ -104,8 +104,6 @@ class PodHandler(TimestampedModelHandler):
 
     def dehydrate(self, obj, data, for_list=False):
         """Add extra fields to `data`."""
-        if self.user.is_superuser:
-            data.update(obj.power_parameters)
         data["type"] = obj.power_type
         data["total"] = self.dehydrate_total(obj)
         data["used"] = self.dehydrate_used(obj)
@@ -139,10 +137,16 @@ class PodHandler(TimestampedModelHandler):
                     pools_data.append(self.dehydrate_storage_pool(pool))
                 data["storage_pools"] = pools_data
                 data["default_storage_pool"] = obj.default_storage_pool.pool_id
+        return data
 
+    def dehydrate_for_user(self, obj, data, for_list=False):
+        """Add the power parameters and permissions of the user to `data`."""
+        data = super().dehydrate_for_user(obj, data, for_list=for_list)
+        if self.user.is_superuser:
+            # The other fields take precedence over the power parameters.
+            data = dict(obj.power_parameters, **data)
         if self.user.has_perm(PodPermission.compose, obj):
             data['permissions'].append('compose')
-
         return data
 
     def dehydrate_total(self, obj):
@@ -97,7 +97,10 @@ from maasserver.websockets.base import (
     HandlerPermissionError,
     HandlerValidationError,
 )
-from maasserver.websockets.handlers import machine as machine_module
+from maasserver.websockets.handlers import (
+    machine as machine_module,
+    node as node_module,
+)
 from maasserver.websockets.handlers.event import dehydrate_event_type_level
 from maasserver.websockets.handlers.machine import (
     MachineHandler,
@@ -1835,6 +1838,87 @@ class TestMachineHandler(MAASServerTestCase):
             self.dehydrate_node(ownered_node, handler, for_list=True),
         ], handler.list({}))
 
+    def test_query_filters_with_constraints(self):
+        user = factory.make_User()
+        tag = factory.make_Tag()
+        node = factory.make_Node(owner=user)
+        node.tags.add(tag)
+        factory.make_Node(owner=user)
+        handler = MachineHandler(user, {}, None)
+        result = handler.query({"filter": {"tags": [tag.name]}})
+        self.assertEqual(1, result["count"])
+        self.assertEqual(
+            [node.system_id],
+            [item["system_id"] for item in result["items"]])
+
+    def test_query_raises_validation_error_on_invalid_filter(self):
+        user = factory.make_User()
+        handler = MachineHandler(user, {}, None)
+        self.assertRaises(
+            HandlerValidationError, handler.query,
+            {"filter": {"zone": factory.make_name("zone")}})
+
+    def test_query_sorts_and_returns_window(self):
+        user = factory.make_User()
+        nodes = [
+            factory.make_Node(owner=user, hostname="node-%d" % i)
+            for i in range(4)
+        ]
+        handler = MachineHandler(user, {}, None)
+        result = handler.query({
+            "sort": ["-hostname"], "offset": 1, "limit": 2})
+        self.assertEqual(4, result["count"])
+        self.assertEqual(
+            [nodes[2].system_id, nodes[1].system_id],
+            [item["system_id"] for item in result["items"]])
+        self.assertEqual(
+            {nodes[2].system_id, nodes[1].system_id},
+            handler.cache["window"]["pks"])
+
+    def test_query_raises_validation_error_on_unknown_sort_key(self):
+        user = factory.make_User()
+        handler = MachineHandler(user, {}, None)
+        self.assertRaises(
+            HandlerValidationError, handler.query,
+            {"sort": [factory.make_name("key")]})
+
+    def test_on_listen_ignores_objects_outside_query_window(self):
+        user = factory.make_User()
+        node = factory.make_Node(owner=user, hostname="a")
+        other_node = factory.make_Node(owner=user, hostname="b")
+        handler = MachineHandler(user, {}, None)
+        handler.query({"sort": ["hostname"], "limit": 1})
+        self.assertIsNone(
+            handler.on_listen("machine", "update", other_node.system_id))
+        self.assertEqual(
+            "update",
+            handler.on_listen("machine", "update", node.system_id)[1])
+
+    def test_on_listen_deletes_objects_no_longer_matching_filter(self):
+        user = factory.make_User()
+        tag = factory.make_Tag()
+        node = factory.make_Node(owner=user)
+        node.tags.add(tag)
+        handler = MachineHandler(user, {}, None)
+        handler.query({"filter": {"tags": [tag.name]}})
+        node.tags.remove(tag)
+        self.assertEqual(
+            ("machine", "delete", node.system_id),
+            handler.on_listen("machine", "update", node.system_id))
+        self.assertNotIn(node.system_id, handler.cache["loaded_pks"])
+
+    def test_in_window_checks_filter_with_one_query(self):
+        user = factory.make_User()
+        tag = factory.make_Tag()
+        node = factory.make_Node(owner=user)
+        node.tags.add(tag)
+        handler = MachineHandler(user, {}, None)
+        handler.query({"filter": {"tags": [tag.name]}})
+        form = self.patch(node_module, "AcquireNodeForm")
+        queries, result = count_queries(handler.in_window, node.system_id)
+        self.assertEqual((1, True), (queries, result))
+        self.assertThat(form, MockNotCalled())
+
     def test_list_includes_pod_details_when_available(self):
         user = factory.make_User()
         pod = factory.make_Pod()
@@ -76,6 +76,10 @@ class UserHandler(Handler):
 
     def dehydrate(self, obj, data, for_list=False):
         data["sshkeys_count"] = obj.sshkey_set.count()
+        return data
+
+    def dehydrate_for_user(self, obj, data, for_list=False):
+        data = super().dehydrate_for_user(obj, data, for_list=for_list)
         if obj.id == self.user.id:
             # User is reading information about itself, so provide the global
             # permissions.
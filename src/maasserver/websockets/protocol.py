@@ -7,7 +7,10 @@ __all__ = [
     "WebSocketProtocol",
 ]
 
-from collections import deque
+from collections import (
+    deque,
+    OrderedDict,
+)
 from functools import partial
 from http.cookies import SimpleCookie
 import json
@@ -27,7 +30,11 @@ from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.http import HttpRequest
 from maasserver.eventloop import services
-from maasserver.utils.orm import transactional
+from maasserver.utils.orm import (
+    is_retryable_failure,
+    savepoint,
+    transactional,
+)
 from maasserver.utils.threads import deferToDatabase
 from maasserver.websockets import handlers
 from maasserver.websockets.websockets import STATUSES
@@ -89,18 +96,57 @@ def get_cookie(cookies: Optional[str], cookie_name: str) -> Optional[str]:
         return None
 
 
+def _escape_patch_key(key):
+    """Escape `key` for use in a JSON pointer (RFC 6901)."""
+    return "/" + str(key).replace("~", "~0").replace("/", "~1")
+
+
+def make_notify_patch(old, new):
+    """Return a JSON-patch style list of operations that turns the dict `old`
+    into the dict `new`.
+
+    Only top-level keys are compared. `None` is returned when the patch would
+    replace at least half of the keys, as the complete `new` data is then
+    about as small.
+    """
+    patch = []
+    for key, value in new.items():
+        if key not in old:
+            patch.append(
+                {"op": "add", "path": _escape_patch_key(key), "value": value})
+        elif old[key] != value:
+            patch.append({
+                "op": "replace", "path": _escape_patch_key(key),
+                "value": value})
+    for key in old.keys() - new.keys():
+        patch.append({"op": "remove", "path": _escape_patch_key(key)})
+    if len(patch) * 2 >= max(len(new), 1):
+        return None
+    return patch
+
+
 class WebSocketProtocol(Protocol):
     """The web-socket protocol that supports the web UI.
 
     :ivar factory: Set by the factory that spawned this protocol.
     """
 
+    # The number of objects for which the last notified data is remembered.
+    # Updates for objects that have been forgotten are sent in full.
+    notifiedSize = 2000
+
     def __init__(self):
         self.messages = deque()
         self.user = None
         self.request = None
         self.cache = {}
         self.sequence_number = 0
+        # Whether the client can apply patches to notified data.
+        self.patches = False
+        # Last data sent to the client in a notification for each (name, pk),
+        # least recently notified first. Updates are sent as a patch against
+        # it when the client can apply patches.
+        self.notified = OrderedDict()
 
     def connectionMade(self):
         """Connection has been made to client."""
@@ -110,6 +156,11 @@ class WebSocketProtocol(Protocol):
         # from an authenticated user.
 
         cookies = self.transport.cookies.decode("ascii")
+        # Clients that can apply patches to notified data say so in the query
+        # string. Others, like older copies of the web UI, are always sent the
+        # complete data.
+        self.patches = b"patches" in parse_qs(
+            urlparse(self.transport.uri).query)
         d = self.authenticate(
             get_cookie(cookies, 'sessionid'),
             get_cookie(cookies, 'csrftoken'),
@@ -384,16 +435,54 @@ class WebSocketProtocol(Protocol):
         return None
 
     def sendNotify(self, name, action, data):
-        """Send the notify message with data."""
+        """Send the notify message with data.
+
+        When the client can apply patches and was recently sent data for the
+        same object an update is sent as a `patch` against that data, unless
+        the patch would not be smaller than `data` itself. Any other message
+        carries the complete `data`, which the client uses to resync.
+        """
         notify_msg = {
             "type": MSG_TYPE.NOTIFY,
             "name": name,
             "action": action,
-            "data": data,
             }
+        pk = self.getNotifyPk(name, data) if self.patches else None
+        if pk is None:
+            notify_msg["data"] = data
+        elif action == "delete":
+            self.notified.pop((name, pk), None)
+            notify_msg["data"] = data
+        else:
+            notify_msg["pk"] = pk
+            previous = self.notified.get((name, pk))
+            patch = None
+            if action == "update" and previous is not None:
+                patch = make_notify_patch(previous, data)
+            if patch is None:
+                notify_msg["data"] = data
+            else:
+                notify_msg["patch"] = patch
+            self.notified[name, pk] = data
+            self.notified.move_to_end((name, pk))
+            if len(self.notified) > self.notifiedSize:
+                self.notified.popitem(last=False)
         self.transport.write(
             json.dumps(notify_msg, default=self._json_encode).encode("ascii"))
 
+    def getNotifyPk(self, name, data):
+        """Return the primary key of the object in a notification for `name`,
+        or `None` if it cannot be determined."""
+        handler_class = self.factory.getHandler(name)
+        if handler_class is None:
+            return None
+        if isinstance(data, dict):
+            return data.get(handler_class._meta.pk)
+        elif isinstance(data, (int, str)):
+            return data
+        else:
+            return None
+
     def buildHandler(self, handler_class):
         """Return an initialised instance of `handler_class`."""
         handler_name = handler_class._meta.handler_name
@@ -407,6 +496,16 @@ class WebSocketFactory(Factory):
 
     protocol = WebSocketProtocol
 
+    # Seconds that notifications on busy channels are held for before they
+    # are sent to clients. Updating a node's interfaces or block devices
+    # notifies the node's channel for each row changed, so while a node is
+    # commissioning a burst of identical notifications is merged into one.
+    coalesceWindows = {
+        "controller": 1,
+        "device": 1,
+        "machine": 1,
+    }
+
     def __init__(self, listener):
         self.handlers = {}
         self.clients = []
@@ -459,20 +558,53 @@ class WebSocketFactory(Factory):
             for channel in handler._meta.listen_channels:
                 self.listener.register(
                     channel, partial(self.onNotify, handler, channel))
+        for channel, seconds in self.coalesceWindows.items():
+            self.listener.setCoalesceWindow(channel, seconds)
 
     @inlineCallbacks
     def onNotify(self, handler_class, channel, action, obj_id):
-        for client in self.clients:
-            handler = client.buildHandler(handler_class)
-            data = yield deferToDatabase(
-                self.processNotify, handler, channel, action, obj_id)
-            if data is not None:
+        clients = list(self.clients)
+        if len(clients) == 0:
+            return
+        handlers = [
+            client.buildHandler(handler_class)
+            for client in clients
+        ]
+        # Process the notification for all the clients in a single
+        # transaction, so the object is only dehydrated once instead of once
+        # for each connection.
+        results = yield deferToDatabase(
+            self.processNotifies, handlers, channel, action, obj_id)
+        for client, data in zip(clients, results):
+            if data is not None and client in self.clients:
                 (name, client_action, data) = data
                 client.sendNotify(name, client_action, data)
 
     @transactional
-    def processNotify(self, handler, channel, action, obj_id):
-        return handler.on_listen(channel, action, obj_id)
+    def processNotifies(self, handlers, channel, action, obj_id):
+        """Call `on_listen` for each of `handlers`, sharing a notify cache.
+
+        Each handler is called in its own savepoint. When one fails the
+        failure is logged and `None` is returned for it, so that the other
+        clients are still notified, unless the failure is retryable, in which
+        case all of them are processed again.
+        """
+        notify_cache = {}
+        results = []
+        for handler in handlers:
+            handler.notify_cache = notify_cache
+            try:
+                with savepoint():
+                    result = handler.on_listen(channel, action, obj_id)
+            except Exception as error:
+                if is_retryable_failure(error):
+                    raise  # Retry all the handlers.
+                log.err(
+                    None, "Failed to process '%s' notification for %s." % (
+                        action, handler._meta.handler_name))
+                result = None
+            results.append(result)
+        return results
 
     def registerRPCEvents(self):
         """Register for connected and disconnected events from the RPC
@@ -221,6 +221,20 @@ class TestHandler(MAASServerTestCase, FakeNodesHandlerMixin):
             MockCalledOnceWith(
                 node, {"hostname": node.hostname}, for_list=False))
 
+    def test_full_dehydrate_calls_dehydrate_for_user_last(self):
+        handler = self.make_nodes_handler(fields=["hostname"])
+        mock_dehydrate = self.patch_autospec(handler, "dehydrate")
+        mock_dehydrate.return_value = sentinel.final_dehydrate
+        mock_dehydrate_for_user = self.patch_autospec(
+            handler, "dehydrate_for_user")
+        mock_dehydrate_for_user.return_value = sentinel.user_dehydrate
+        node = factory.make_Node()
+        self.expectThat(
+            sentinel.user_dehydrate, Equals(handler.full_dehydrate(node)))
+        self.expectThat(
+            mock_dehydrate_for_user,
+            MockCalledOnceWith(node, sentinel.final_dehydrate, for_list=False))
+
     def test_dehydrate_does_nothing(self):
         handler = self.make_nodes_handler()
         self.assertEqual(
@@ -815,6 +829,46 @@ class TestHandler(MAASServerTestCase, FakeNodesHandlerMixin):
             mock_dehydrate,
             MockCalledOnceWith(node, for_list=False))
 
+    def test_on_listen_shares_data_with_same_user_in_notify_cache(self):
+        handler = self.make_nodes_handler(fields=['hostname'])
+        other_handler = object.__new__(type(handler))
+        other_handler.__init__(handler.user, {}, handler.request)
+        node = factory.make_Node(owner=handler.user)
+        handler.notify_cache = other_handler.notify_cache = {}
+        handler.cache["loaded_pks"].add(node.system_id)
+        other_handler.cache["loaded_pks"].add(node.system_id)
+        result = handler.on_listen(sentinel.channel, "update", node.system_id)
+        mock_listen = self.patch(other_handler, "listen")
+        mock_dehydrate = self.patch(other_handler, "full_dehydrate")
+        self.expectThat(
+            other_handler.on_listen(
+                sentinel.channel, "update", node.system_id),
+            Equals(result))
+        self.expectThat(mock_listen, MockNotCalled())
+        self.expectThat(mock_dehydrate, MockNotCalled())
+
+    def test_on_listen_shares_data_between_users_but_not_permissions(self):
+        handler = self.make_nodes_handler(
+            fields=['hostname'], edit_permission=NodePermission.admin)
+        other_handler = object.__new__(type(handler))
+        other_handler.__init__(factory.make_admin(), {}, handler.request)
+        node = factory.make_Node()
+        handler.notify_cache = other_handler.notify_cache = {}
+        handler.cache["loaded_pks"].add(node.system_id)
+        other_handler.cache["loaded_pks"].add(node.system_id)
+        self.assertEqual(
+            (handler._meta.handler_name, "update", {
+                "hostname": node.hostname, "permissions": []}),
+            handler.on_listen(sentinel.channel, "update", node.system_id))
+        mock_dehydrate = self.patch(
+            other_handler, "_full_dehydrate_for_all_users")
+        self.assertEqual(
+            (other_handler._meta.handler_name, "update", {
+                "hostname": node.hostname, "permissions": ["edit"]}),
+            other_handler.on_listen(
+                sentinel.channel, "update", node.system_id))
+        self.assertThat(mock_dehydrate, MockNotCalled())
+
     def test_listen_calls_get_object_with_pk_on_other_actions(self):
         handler = self.make_nodes_handler()
         mock_get_object = self.patch(handler, "get_object")
@@ -40,6 +40,7 @@ from maastesting.matchers import (
     IsFiredDeferred,
     MockCalledOnceWith,
     MockCalledWith,
+    MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
 from maastesting.twisted import TwistedLoggerFixture
@@ -189,6 +190,22 @@ class TestWebSocketProtocol(MAASTransactionServerTestCase):
         self.assertThat(
             mock_authenticate, MockCalledOnceWith(sessionid, csrftoken))
 
+    def test_connectionMade_enables_patches_when_client_supports_them(self):
+        protocol, factory = self.make_protocol(
+            transport_uri=b"/MAAS/ws?csrftoken=abc&patches=1")
+        self.patch(protocol, "authenticate")
+        protocol.connectionMade()
+        self.addCleanup(lambda: protocol.connectionLost(""))
+        self.assertTrue(protocol.patches)
+
+    def test_connectionMade_disables_patches_by_default(self):
+        protocol, factory = self.make_protocol(
+            transport_uri=b"/MAAS/ws?csrftoken=abc")
+        self.patch(protocol, "authenticate")
+        protocol.connectionMade()
+        self.addCleanup(lambda: protocol.connectionLost(""))
+        self.assertFalse(protocol.patches)
+
     def test_connectionLost_removes_self_from_factory(self):
         protocol, factory = self.make_protocol()
         mock_authenticate = self.patch(protocol, "authenticate")
@@ -732,6 +749,104 @@ class TestWebSocketProtocol(MAASTransactionServerTestCase):
         self.assertEquals(
             message, self.get_written_transport_message(protocol))
 
+    def test_sendNotify_sends_pk_and_data_on_first_update(self):
+        protocol, factory = self.make_protocol()
+        protocol.patches = True
+        data = {"system_id": "xyz", "hostname": "foo", "status": "Ready"}
+        protocol.sendNotify("machine", "update", data)
+        self.assertEquals({
+            "type": MSG_TYPE.NOTIFY,
+            "name": "machine",
+            "action": "update",
+            "pk": "xyz",
+            "data": data,
+            }, self.get_written_transport_message(protocol))
+
+    def test_sendNotify_sends_patch_on_following_update(self):
+        protocol, factory = self.make_protocol()
+        protocol.patches = True
+        data = {
+            "system_id": "xyz", "hostname": "foo", "status": "Ready",
+            "cpu_count": 4, "memory": 8}
+        protocol.sendNotify("machine", "update", data)
+        protocol.sendNotify(
+            "machine", "update", dict(data, status="Deploying"))
+        self.assertEquals({
+            "type": MSG_TYPE.NOTIFY,
+            "name": "machine",
+            "action": "update",
+            "pk": "xyz",
+            "patch": [
+                {"op": "replace", "path": "/status", "value": "Deploying"},
+            ],
+            }, self.get_written_transport_message(protocol))
+
+    def test_sendNotify_sends_data_when_patch_not_smaller(self):
+        protocol, factory = self.make_protocol()
+        protocol.patches = True
+        protocol.sendNotify(
+            "machine", "update", {"system_id": "xyz", "status": "Ready"})
+        data = {"system_id": "xyz", "status": "Deploying"}
+        protocol.sendNotify("machine", "update", data)
+        self.assertEquals(
+            data, self.get_written_transport_message(protocol)["data"])
+
+    def test_sendNotify_sends_data_when_client_cannot_patch(self):
+        protocol, factory = self.make_protocol()
+        data = {
+            "system_id": "xyz", "hostname": "foo", "status": "Ready",
+            "cpu_count": 4, "memory": 8}
+        protocol.sendNotify("machine", "update", data)
+        protocol.sendNotify(
+            "machine", "update", dict(data, status="Deploying"))
+        self.assertEquals({
+            "type": MSG_TYPE.NOTIFY,
+            "name": "machine",
+            "action": "update",
+            "data": dict(data, status="Deploying"),
+            }, self.get_written_transport_message(protocol))
+        self.assertEquals({}, protocol.notified)
+
+    def test_sendNotify_forgets_least_recently_notified_data(self):
+        protocol, factory = self.make_protocol()
+        protocol.patches = True
+        protocol.notifiedSize = 2
+        for system_id in ["a", "b", "a", "c"]:
+            protocol.sendNotify(
+                "machine", "update", {"system_id": system_id})
+        self.assertEquals(
+            [("machine", "a"), ("machine", "c")], list(protocol.notified))
+
+    def test_sendNotify_delete_forgets_previous_data(self):
+        protocol, factory = self.make_protocol()
+        protocol.patches = True
+        protocol.sendNotify(
+            "machine", "update", {"system_id": "xyz", "status": "Ready"})
+        protocol.sendNotify("machine", "delete", "xyz")
+        self.assertEquals({}, protocol.notified)
+
+
+class TestMakeNotifyPatch(MAASTestCase):
+
+    def test_returns_add_replace_and_remove_operations(self):
+        old = {"a": 1, "b": 2, "c": 3, "d": 4, "e": 5, "f": 6, "g/h": 7}
+        new = {"a": 1, "b": 2, "c": 3, "d": 4, "e": 50, "g/h": 7, "i~": 8}
+        self.assertItemsEqual([
+            {"op": "replace", "path": "/e", "value": 50},
+            {"op": "add", "path": "/i~0", "value": 8},
+            {"op": "remove", "path": "/f"},
+            ], protocol_module.make_notify_patch(old, new))
+
+    def test_returns_empty_patch_when_unchanged(self):
+        data = {"a": 1, "b": [1, 2]}
+        self.assertEqual(
+            [], protocol_module.make_notify_patch(data, dict(data)))
+
+    def test_returns_None_when_most_keys_change(self):
+        self.assertIsNone(
+            protocol_module.make_notify_patch(
+                {"a": 1, "b": 2}, {"a": 2, "b": 3}))
+
 
 class MakeProtocolFactoryMixin:
 
@@ -750,6 +865,7 @@ class MakeProtocolFactoryMixin:
         protocol = factory.buildProtocol(None)
         protocol.transport = MagicMock()
         protocol.transport.cookies = b""
+        protocol.transport.uri = b""
         if user is None:
             user = maas_factory.make_User()
         mock_authenticate = self.patch(protocol, "authenticate")
@@ -890,6 +1006,11 @@ class TestWebSocketFactory(MAASTestCase, MakeProtocolFactoryMixin):
         self.assertItemsEqual(
             ALL_NOTIFIERS, factory.listener.listeners.keys())
 
+    def test_registerNotifiers_sets_coalesce_windows(self):
+        factory = self.make_factory()
+        self.assertEqual(
+            factory.coalesceWindows, factory.listener.coalesceWindows)
+
 
 class TestWebSocketFactoryTransactional(
         MAASTransactionServerTestCase, MakeProtocolFactoryMixin):
@@ -959,6 +1080,61 @@ class TestWebSocketFactoryTransactional(
         self.assertThat(
             mock_sendNotify, MockCalledWith(name, action, data))
 
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_shares_notify_cache_between_clients(self):
+        user = yield deferToDatabase(self.make_user)
+        protocol, factory = self.make_protocol_with_factory(user=user)
+        other_protocol = factory.buildProtocol(None)
+        other_protocol.user = user
+        other_protocol.request = protocol.request
+        factory.clients.append(other_protocol)
+        handlers = []
+
+        def make_handler(*args):
+            handler = MagicMock()
+            handler.on_listen.return_value = None
+            handlers.append(handler)
+            return handler
+
+        handler_class = MagicMock(side_effect=make_handler)
+        handler_class._meta.handler_name = maas_factory.make_name("handler")
+        yield factory.onNotify(
+            handler_class, sentinel.channel, sentinel.action, sentinel.obj_id)
+        self.assertEqual(2, len(handlers))
+        self.assertEqual({}, handlers[0].notify_cache)
+        self.assertIs(handlers[0].notify_cache, handlers[1].notify_cache)
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_onNotify_notifies_other_clients_when_one_fails(self):
+        user = yield deferToDatabase(self.make_user)
+        protocol, factory = self.make_protocol_with_factory(user=user)
+        other_protocol = factory.buildProtocol(None)
+        other_protocol.user = user
+        other_protocol.request = protocol.request
+        factory.clients.append(other_protocol)
+        name = maas_factory.make_name("handler")
+        failing_handler = MagicMock()
+        failing_handler._meta.handler_name = name
+        failing_handler.on_listen.side_effect = maas_factory.make_exception()
+        other_handler = MagicMock()
+        other_handler.on_listen.return_value = (name, "update", sentinel.data)
+        handler_class = MagicMock(
+            side_effect=[failing_handler, other_handler])
+        mock_sendNotify = self.patch(protocol, "sendNotify")
+        mock_other_sendNotify = self.patch(other_protocol, "sendNotify")
+        with TwistedLoggerFixture() as logger:
+            yield factory.onNotify(
+                handler_class, sentinel.channel, "update", sentinel.obj_id)
+        self.assertThat(mock_sendNotify, MockNotCalled())
+        self.assertThat(
+            mock_other_sendNotify,
+            MockCalledOnceWith(name, "update", sentinel.data))
+        self.assertIn(
+            "Failed to process 'update' notification for %s." % name,
+            logger.output)
+
     @wait_for_reactor
     @inlineCallbacks
     def test_updateRackController_calls_onNotify_for_controller_update(self):
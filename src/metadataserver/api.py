@@ -16,7 +16,7 @@ __all__ = [
 
 import base64
 from datetime import datetime
-from functools import partial
+import hashlib
 import http.client
 from io import BytesIO
 from itertools import chain
@@ -63,6 +63,7 @@ from maasserver.models import (
     SSLKey,
 )
 from maasserver.models.event import Event
+from maasserver.models.eventtype import EventType
 from maasserver.models.tag import Tag
 from maasserver.models.timestampedmodel import now
 from maasserver.node_status import NODE_TESTING_RESET_READY_TRANSITIONS
@@ -189,9 +190,8 @@ def check_version(version):
         raise UnknownMetadataVersion("Unknown metadata version: %s" % version)
 
 
-def add_event_to_node_event_log(
-        node, origin, action, description, result=None, created=None):
-    """Add an entry to the node's event log."""
+def get_node_event_type_name(node, result=None):
+    """Return the name of the event type for a node's status message."""
     if node.status == NODE_STATUS.COMMISSIONING:
         if result in ['SUCCESS', None]:
             type_name = EVENT_TYPES.NODE_COMMISSIONING_EVENT
@@ -215,7 +215,13 @@ def add_event_to_node_event_log(
         type_name = EVENT_TYPES.REQUEST_CONTROLLER_REFRESH
     else:
         type_name = EVENT_TYPES.NODE_STATUS_EVENT
+    return type_name
 
+
+def add_event_to_node_event_log(
+        node, origin, action, description, result=None, created=None):
+    """Add an entry to the node's event log."""
+    type_name = get_node_event_type_name(node, result)
     event_details = EVENT_DETAILS[type_name]
     return Event.objects.register_event_and_event_type(
         type_name, type_level=event_details.level,
@@ -225,6 +231,26 @@ def add_event_to_node_event_log(
         system_id=node.system_id, created=created)
 
 
+def make_node_event(
+        node, origin, action, description, result=None, created=None):
+    """Return an unsaved entry for the node's event log.
+
+    This is for saving many entries at once with `bulk_create`, which does
+    not call `save`, so the timestamps are set here.
+    """
+    type_name = get_node_event_type_name(node, result)
+    event_details = EVENT_DETAILS[type_name]
+    event_type = EventType.objects.register(
+        type_name, event_details.description, event_details.level)
+    if created is None:
+        created = now()
+    return Event(
+        type=event_type, node=node, node_system_id=node.system_id,
+        node_hostname=node.hostname, action=action,
+        description="'%s' %s" % (origin, description),
+        created=created, updated=created)
+
+
 def process_file(
         results, script_set, script_name, content, request,
         default_exit_status=None):
@@ -920,6 +946,77 @@ def add_file_to_tar(tar, path, content, mtime, permission=0o755):
     tar.addfile(tarinfo, BytesIO(content))
 
 
+class ScriptsArchive:
+    """The files for a tar archive of scripts.
+
+    The archive is only produced by `getvalue`, so that a client that already
+    has it, judging by `get_etag`, need not wait for it to be built.
+    """
+
+    def __init__(self):
+        self.files = []
+
+    def add(self, path, content, permission=0o755):
+        """Add a file at `path` in the archive."""
+        assert isinstance(content, bytes), "Script content must be binary."
+        self.files.append((path, content, permission))
+
+    def get_etag(self):
+        """Return an entity tag for the archive, derived from its files.
+
+        Modification times are not included, so this is the same for every
+        archive with the same files.
+        """
+        digest = hashlib.sha256()
+        for path, content, permission in self.files:
+            digest.update(
+                ("%s\0%o\0%d\0" % (path, permission, len(content))).encode())
+            digest.update(content)
+        return '"%s"' % digest.hexdigest()
+
+    def getvalue(self, mtime):
+        """Return the tar archive, with every file modified at `mtime`."""
+        binary = BytesIO()
+        with tarfile.open(mode='w', fileobj=binary) as tar:
+            for path, content, permission in self.files:
+                add_file_to_tar(tar, path, content, mtime, permission)
+        return binary.getvalue()
+
+
+def normalise_etag(etag):
+    """Return `etag` without the weak prefix or `GZipMiddleware` suffix."""
+    etag = etag.strip()
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    if etag.endswith(';gzip"'):
+        etag = etag[:-len(';gzip"')] + '"'
+    return etag
+
+
+def make_archive_response(request, etag, get_archive, content_type):
+    """Return a response for an archive identified by `etag`.
+
+    If the client sent a matching If-None-Match header it already has the
+    archive, so this responds with 304 Not Modified without calling
+    `get_archive`.
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match is not None:
+        etags = {normalise_etag(tag) for tag in if_none_match.split(',')}
+        if etag in etags or '*' in etags:
+            response = HttpResponse(status=int(http.client.NOT_MODIFIED))
+            response['ETag'] = etag
+            return response
+    response = HttpResponse(get_archive(), content_type=content_type)
+    response['ETag'] = etag
+    return response
+
+
+# The most recently produced archive of commissioning scripts, keyed by the
+# versions of the scripts in it. See `CommissioningScriptsHandler`.
+_commissioning_archives = {}
+
+
 class CommissioningScriptsHandler(MetadataViewHandler):
     """Return a tar archive containing the commissioning scripts.
 
@@ -931,8 +1028,9 @@ class CommissioningScriptsHandler(MetadataViewHandler):
             yield script['name'], script['content']
 
     def _iter_user_scripts(self):
-        for script in Script.objects.filter(
-                script_type=SCRIPT_TYPE.COMMISSIONING):
+        scripts = Script.objects.filter(
+            script_type=SCRIPT_TYPE.COMMISSIONING)
+        for script in scripts.select_related('script'):
             try:
                 # Check if the script is a base64 encoded binary.
                 content = base64.b64decode(script.script.data)
@@ -947,29 +1045,48 @@ class CommissioningScriptsHandler(MetadataViewHandler):
             self._iter_user_scripts(),
         )
 
+    def _get_scripts_version(self):
+        """Return a key identifying the versions of the user scripts.
+
+        Editing a script's content creates a new `VersionedTextFile`, so this
+        changes whenever a script is added, removed, renamed, or edited.
+        """
+        return tuple(sorted(Script.objects.filter(
+            script_type=SCRIPT_TYPE.COMMISSIONING).values_list(
+                'name', 'script_id')))
+
     def _get_archive(self):
         """Produce a tar archive of all commissionig scripts.
 
-        Each of the scripts will be in the `ARCHIVE_PREFIX` directory.
+        Each of the scripts will be in the `ARCHIVE_PREFIX` directory. The
+        archive is built once per version of the scripts; see
+        `_get_scripts_version`.
+
+        :return: A tuple of the archive's entity tag and the archive.
         """
-        binary = BytesIO()
-        scripts = sorted(self._iter_scripts())
-        with tarfile.open(mode='w', fileobj=binary) as tarball:
-            add_script = partial(
-                add_file_to_tar, tarball, mtime=time.time())
-            for name, content in scripts:
-                add_script(os.path.join("commissioning.d", name), content)
-        return binary.getvalue()
+        key = self._get_scripts_version()
+        try:
+            return _commissioning_archives[key]
+        except KeyError:
+            archive = ScriptsArchive()
+            for name, content in sorted(self._iter_scripts()):
+                archive.add(os.path.join("commissioning.d", name), content)
+            result = archive.get_etag(), archive.getvalue(time.time())
+            # Older versions of the scripts will not be asked for again.
+            _commissioning_archives.clear()
+            _commissioning_archives[key] = result
+            return result
 
     def read(self, request, version, mac=None):
         check_version(version)
-        return HttpResponse(
-            self._get_archive(), content_type='application/tar')
+        etag, archive = self._get_archive()
+        return make_archive_response(
+            request, etag, lambda: archive, 'application/tar')
 
 
 class MAASScriptsHandler(OperationsHandler):
 
-    def _add_script_set_to_tar(self, script_set, tar, prefix, mtime):
+    def _add_script_set_to_archive(self, script_set, archive, prefix):
         if script_set is None:
             return []
         meta_data = []
@@ -987,7 +1104,7 @@ class MAASScriptsHandler(OperationsHandler):
                 # data from the source.
                 if script_result.name in NODE_INFO_SCRIPTS:
                     script = NODE_INFO_SCRIPTS[script_result.name]
-                    add_file_to_tar(tar, path, script['content'], mtime)
+                    archive.add(path, script['content'])
                     md_item = {
                         'name': script_result.name,
                         'path': path,
@@ -1007,7 +1124,7 @@ class MAASScriptsHandler(OperationsHandler):
                     continue
             else:
                 content = script_result.script.script.data.encode()
-                add_file_to_tar(tar, path, content, mtime)
+                archive.add(path, content)
                 md_item = {
                     'name': script_result.name,
                     'path': path,
@@ -1029,13 +1146,10 @@ class MAASScriptsHandler(OperationsHandler):
                 # them back when done.
                 out_path = os.path.join('out', '%s.%s' % (
                     script_result.name, script_result.id))
-                add_file_to_tar(tar, out_path, script_result.output, mtime)
-                add_file_to_tar(
-                    tar, '%s.out' % out_path, script_result.stdout, mtime)
-                add_file_to_tar(
-                    tar, '%s.err' % out_path, script_result.stderr, mtime)
-                add_file_to_tar(
-                    tar, '%s.yaml' % out_path, script_result.result, mtime)
+                archive.add(out_path, script_result.output)
+                archive.add('%s.out' % out_path, script_result.stdout)
+                archive.add('%s.err' % out_path, script_result.stderr)
+                archive.add('%s.yaml' % out_path, script_result.result)
             meta_data.append(md_item)
         return meta_data
 
@@ -1050,62 +1164,60 @@ class MAASScriptsHandler(OperationsHandler):
         will be returned.
         """
         node = get_queried_node(request)
-        binary = BytesIO()
-        mtime = time.time()
+        archive = ScriptsArchive()
         tar_meta_data = {}
+        # Commissioning scripts should only be run during commissioning or
+        # in rescue mode.
+        if (node.status in (
+                NODE_STATUS.COMMISSIONING,
+                NODE_STATUS.ENTERING_RESCUE_MODE,
+                NODE_STATUS.RESCUE_MODE,
+                ) and node.current_commissioning_script_set is not None):
+            # Prefetch all the data we need.
+            qs = node.current_commissioning_script_set.scriptresult_set
+            qs = qs.select_related('script', 'script__script')
+            # After the script runner finishes sending all commissioning
+            # results it redownloads the script tar. It does this in-case
+            # a commissioning script discovers hardware associated with
+            # hardware identified in the for_hardware field of a script.
+            # select_for_hardware_scripts() processes the output of the
+            # builtin commissioning scripts and adds any associated script.
+            # This does not need to happen the first time the script runner
+            # downloads the tar as the region has not yet received new
+            # data.
+            for script_result in qs:
+                if script_result.status != SCRIPT_STATUS.PENDING:
+                    script_set = node.current_commissioning_script_set
+                    script_set.select_for_hardware_scripts()
+                    break
+            meta_data = self._add_script_set_to_archive(
+                node.current_commissioning_script_set, archive,
+                'commissioning')
+            if meta_data != []:
+                tar_meta_data['commissioning_scripts'] = sorted(
+                    meta_data, key=itemgetter('name', 'script_result_id'))
+
+        # Always send testing scripts.
+        if node.current_testing_script_set is not None:
+            # prefetch all the data we need
+            qs = node.current_testing_script_set.scriptresult_set
+            qs = qs.select_related('script', 'script__script')
+            meta_data = self._add_script_set_to_archive(
+                qs, archive, 'testing')
+            if meta_data != []:
+                tar_meta_data['testing_scripts'] = sorted(
+                    meta_data, key=itemgetter('name', 'script_result_id'))
+
+        if not tar_meta_data:
+            return HttpResponse(status=int(http.client.NO_CONTENT))
+
+        archive.add(
+            'index.json', json.dumps({'1.0': tar_meta_data}).encode(), 0o644)
         # Responses are currently gzip compressed using
         # django.middleware.gzip.GZipMiddleware.
-        with tarfile.open(mode='w', fileobj=binary) as tar:
-            # Commissioning scripts should only be run during commissioning or
-            # in rescue mode.
-            if (node.status in (
-                    NODE_STATUS.COMMISSIONING,
-                    NODE_STATUS.ENTERING_RESCUE_MODE,
-                    NODE_STATUS.RESCUE_MODE,
-                    ) and node.current_commissioning_script_set is not None):
-                # Prefetch all the data we need.
-                qs = node.current_commissioning_script_set.scriptresult_set
-                qs = qs.select_related('script', 'script__script')
-                # After the script runner finishes sending all commissioning
-                # results it redownloads the script tar. It does this in-case
-                # a commissioning script discovers hardware associated with
-                # hardware identified in the for_hardware field of a script.
-                # select_for_hardware_scripts() processes the output of the
-                # builtin commissioning scripts and adds any associated script.
-                # This does not need to happen the first time the script runner
-                # downloads the tar as the region has not yet received new
-                # data.
-                for script_result in qs:
-                    if script_result.status != SCRIPT_STATUS.PENDING:
-                        script_set = node.current_commissioning_script_set
-                        script_set.select_for_hardware_scripts()
-                        break
-                meta_data = self._add_script_set_to_tar(
-                    node.current_commissioning_script_set, tar,
-                    'commissioning', mtime)
-                if meta_data != []:
-                    tar_meta_data['commissioning_scripts'] = sorted(
-                        meta_data, key=itemgetter('name', 'script_result_id'))
-
-            # Always send testing scripts.
-            if node.current_testing_script_set is not None:
-                # prefetch all the data we need
-                qs = node.current_testing_script_set.scriptresult_set
-                qs = qs.select_related('script', 'script__script')
-                meta_data = self._add_script_set_to_tar(
-                    qs, tar, 'testing', mtime)
-                if meta_data != []:
-                    tar_meta_data['testing_scripts'] = sorted(
-                        meta_data, key=itemgetter('name', 'script_result_id'))
-
-            if not tar_meta_data:
-                return HttpResponse(status=int(http.client.NO_CONTENT))
-
-            add_file_to_tar(
-                tar, 'index.json', json.dumps({'1.0': tar_meta_data}).encode(),
-                mtime, 0o644)
-        return HttpResponse(
-            binary.getvalue(), content_type='application/x-tar')
+        return make_archive_response(
+            request, archive.get_etag(),
+            lambda: archive.getvalue(time.time()), 'application/x-tar')
 
 
 class EnlistMetaDataHandler(OperationsHandler):
@@ -16,12 +16,14 @@ from maasserver.enum import (
 )
 from maasserver.forms.pods import PodForm
 from maasserver.models import (
+    Event,
     Node,
     NodeMetadata,
 )
 from maasserver.preseed import CURTIN_INSTALL_LOG
 from maasserver.utils.orm import (
     in_transaction,
+    is_retryable_failure,
     transactional,
     TransactionManagementError,
 )
@@ -29,6 +31,7 @@ from maasserver.utils.threads import deferToDatabase
 from metadataserver import logger
 from metadataserver.api import (
     add_event_to_node_event_log,
+    make_node_event,
     process_file,
 )
 from metadataserver.enum import SCRIPT_STATUS
@@ -225,6 +228,14 @@ class StatusWorkerService(TimerService, object):
 
     check_interval = 60  # Every second.
 
+    # Process the queue early once this many messages are waiting, rather
+    # than waiting for the next interval. Deploying many machines at once
+    # produces a flood of messages that would otherwise lag far behind.
+    flush_threshold = 500
+
+    # The most messages to process in a single transaction.
+    batch_size = 500
+
     def __init__(self, dbtasks, clock=reactor):
         # Call self._tryUpdateNodes() every self.check_interval.
         super(StatusWorkerService, self).__init__(
@@ -232,10 +243,12 @@ class StatusWorkerService(TimerService, object):
         self.dbtasks = dbtasks
         self.clock = clock
         self.queue = defaultdict(list)
+        self.queue_size = 0
 
     def _tryUpdateNodes(self):
         if len(self.queue) != 0:
             queue, self.queue = self.queue, defaultdict(list)
+            self.queue_size = 0
             d = deferToDatabase(self._preProcessQueue, queue)
             d.addCallback(self._processMessagesLater)
             d.addErrback(log.err, "Failed to process node status messages.")
@@ -256,15 +269,23 @@ class StatusWorkerService(TimerService, object):
         ]
 
     def _processMessagesLater(self, tasks):
-        # Move all messages on the queue off onto the database tasks queue.
-        # We're not going to wait for them to be processed because we can't /
-        # don't apply back-pressure to those systems that are producing these
-        # messages anyway.
+        # Move all messages on the queue off onto the database tasks queue,
+        # in batches of roughly `batch_size` messages. We're not going to
+        # wait for them to be processed because we can't / don't apply
+        # back-pressure to those systems that are producing these messages
+        # anyway.
+        batch, batch_size = [], 0
         for node, messages in tasks:
-            self.dbtasks.addTask(self._processMessages, node, messages)
-
-    def _processMessages(self, node, messages):
-        # Push the messages into the database, recording them for this node.
+            batch.append((node, messages))
+            batch_size += len(messages)
+            if batch_size >= self.batch_size:
+                self.dbtasks.addTask(self._processMessages, batch)
+                batch, batch_size = [], 0
+        if len(batch) != 0:
+            self.dbtasks.addTask(self._processMessages, batch)
+
+    def _processMessages(self, tasks):
+        # Push the messages into the database, recording them for each node.
         # This should be called in a non-reactor thread with a pre-existing
         # connection (e.g. via deferToDatabase).
         if in_transaction():
@@ -273,18 +294,45 @@ class StatusWorkerService(TimerService, object):
                 "outside of a transaction.")
         else:
             # Here we're in a database thread, with a database connection.
-            for idx, message in enumerate(messages):
+            try:
+                self._processMessagesBatch(tasks)
+            except:
+                log.err(None, "Failed to process status messages.")
+
+    @transactional
+    def _processMessagesBatch(self, tasks):
+        """Process messages for many nodes in a single transaction.
+
+        :param tasks: A list of ``(node, messages)`` tuples.
+        """
+        # Validate that the nodes still exist since this is a new
+        # transaction. Messages for nodes that have since been deleted are
+        # dropped.
+        nodes = Node.objects.in_bulk([node.id for node, _ in tasks])
+        # Each message is applied in its own savepoint, so that a failure
+        # loses only that message.
+        applyMessage = transactional(self._applyMessage)
+        events = []
+        for node, messages in tasks:
+            node = nodes.get(node.id)
+            if node is None:
+                continue
+            for message in messages:
+                node_events = []
                 try:
-                    exists = self._processMessage(node, message)
-                    if not exists:
-                        # Node has been deleted no reason to continue saving
-                        # the events for this node.
-                        break
-                except:
+                    applyMessage(node, message, node_events)
+                except Exception as error:
+                    if is_retryable_failure(error):
+                        raise  # Retry the whole batch.
                     log.err(
                         None,
                         "Failed to process message "
                         "for node: %s" % node.hostname)
+                    # The node may have been modified before the failure.
+                    node = Node.objects.get(id=node.id)
+                else:
+                    events.extend(node_events)
+        Event.objects.bulk_create(events)
 
     @transactional
     def _processMessage(self, node, message):
@@ -293,7 +341,17 @@ class StatusWorkerService(TimerService, object):
             node = Node.objects.get(id=node.id)
         except Node.DoesNotExist:
             return False
+        else:
+            self._applyMessage(node, message)
+            return True
+
+    def _applyMessage(self, node, message, events=None):
+        """Apply `message` to `node` in the current transaction.
 
+        :param events: If given, a list to which this message's event is
+            appended, unsaved, instead of being added to the node's event
+            log. The caller is responsible for saving it.
+        """
         event_type = message['event_type']
         origin = message['origin']
         activity_name = message['name']
@@ -306,9 +364,14 @@ class StatusWorkerService(TimerService, object):
         default_exit_status = 1 if failed else 0
 
         # Add this event to the node event log.
-        add_event_to_node_event_log(
-            node, origin, activity_name, description, result,
-            message['timestamp'])
+        if events is None:
+            add_event_to_node_event_log(
+                node, origin, activity_name, description, result,
+                message['timestamp'])
+        else:
+            events.append(make_node_event(
+                node, origin, activity_name, description, result,
+                message['timestamp']))
 
         # Group files together with the ScriptResult they belong.
         results = {}
@@ -421,7 +484,6 @@ class StatusWorkerService(TimerService, object):
 
         if save_node:
             node.save()
-        return True
 
     def _retrieve_content(self, compression, encoding, content):
         """Extract the content of the sent file."""
@@ -503,3 +565,6 @@ class StatusWorkerService(TimerService, object):
             return d
         else:
             self.queue[authorization].append(message)
+            self.queue_size += 1
+            if self.queue_size >= self.flush_threshold:
+                self._tryUpdateNodes()
@@ -23,6 +23,7 @@ from django.db.models import (
 from maasserver.fields import JSONObjectField
 from maasserver.models.cleansave import CleanSave
 from maasserver.models.event import Event
+from maasserver.models.nodeprobeddetails import script_output_nsmap
 from maasserver.models.physicalblockdevice import PhysicalBlockDevice
 from maasserver.models.timestampedmodel import (
     now,
@@ -328,6 +329,21 @@ class ScriptResult(CleanSave, TimestampedModel):
 
         self.save()
 
+        # Controllers refresh their details outside of commissioning, which
+        # is when machines have their tags evaluated. Re-evaluate the tags
+        # of just this controller whenever its probed details change.
+        node = self.script_set.node
+        if (node.is_controller and self.status == SCRIPT_STATUS.PASSED and
+                self.name in script_output_nsmap and stdout is not None):
+            # Circular imports.
+            from maasserver.models import Tag
+            from maasserver.populate_tags import populate_tags_for_single_node
+            from metadataserver.api import try_or_log_event
+            try_or_log_event(
+                node, None, "Failed to update tags.",
+                populate_tags_for_single_node,
+                Tag.objects.exclude(definition=None), node)
+
     @property
     def history(self):
         qs = ScriptResult.objects.filter(
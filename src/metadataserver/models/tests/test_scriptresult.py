@@ -8,9 +8,13 @@ from datetime import (
     timedelta,
 )
 import random
-from unittest.mock import MagicMock
+from unittest.mock import (
+    ANY,
+    MagicMock,
+)
 
 from django.core.exceptions import ValidationError
+from maasserver import populate_tags as populate_tags_module
 from maasserver.enum import NODE_TYPE
 from maasserver.models import (
     Event,
@@ -23,6 +27,7 @@ from maastesting.djangotestcase import CountQueries
 from maastesting.matchers import (
     DocTestMatches,
     MockCalledOnceWith,
+    MockNotCalled,
 )
 from metadataserver.builtin_scripts.hooks import NODE_INFO_SCRIPTS
 from metadataserver.enum import (
@@ -36,6 +41,7 @@ from metadataserver.models import (
     scriptresult as scriptresult_module,
 )
 from provisioningserver.events import EVENT_TYPES
+from provisioningserver.refresh.node_info_scripts import LLDP_OUTPUT_NAME
 import yaml
 
 
@@ -276,6 +282,36 @@ class TestScriptResult(MAASServerTestCase):
             MockCalledOnceWith(
                 node=script_set.node, output=stdout, exit_status=exit_status))
 
+    def test_store_result_populates_tags_for_controllers(self):
+        node = factory.make_Node(node_type=random.choice([
+            NODE_TYPE.REGION_AND_RACK_CONTROLLER, NODE_TYPE.REGION_CONTROLLER,
+            NODE_TYPE.RACK_CONTROLLER]))
+        script_set = factory.make_ScriptSet(
+            node=node, result_type=RESULT_TYPE.COMMISSIONING)
+        script_result = factory.make_ScriptResult(
+            script_set=script_set, status=SCRIPT_STATUS.PASSED,
+            script_name=LLDP_OUTPUT_NAME)
+        populate_tags_for_single_node = self.patch(
+            populate_tags_module, "populate_tags_for_single_node")
+
+        script_result.store_result(0, stdout=b"<lldp/>")
+
+        self.assertThat(
+            populate_tags_for_single_node, MockCalledOnceWith(ANY, node))
+
+    def test_store_result_does_not_populate_tags_for_machines(self):
+        script_set = factory.make_ScriptSet(
+            result_type=RESULT_TYPE.COMMISSIONING)
+        script_result = factory.make_ScriptResult(
+            script_set=script_set, status=SCRIPT_STATUS.RUNNING,
+            script_name=LLDP_OUTPUT_NAME)
+        populate_tags_for_single_node = self.patch(
+            populate_tags_module, "populate_tags_for_single_node")
+
+        script_result.store_result(0, stdout=b"<lldp/>")
+
+        self.assertThat(populate_tags_for_single_node, MockNotCalled())
+
     def test_store_result_logs_event_upon_hook_failure(self):
         script_set = factory.make_ScriptSet(
             result_type=RESULT_TYPE.COMMISSIONING)
@@ -77,10 +77,13 @@ from metadataserver.api import (
     get_node_for_mac,
     get_node_for_request,
     get_queried_node,
+    make_archive_response,
     make_list_response,
     make_text_response,
     MetaDataHandler,
+    normalise_etag,
     process_file,
+    ScriptsArchive,
     UnknownMetadataVersion,
 )
 from metadataserver.enum import (
@@ -155,6 +158,37 @@ class TestHelpers(MAASServerTestCase):
     def test_check_version_reports_unknown_version(self):
         self.assertRaises(UnknownMetadataVersion, check_version, '2.0')
 
+    def test_normalise_etag_strips_weak_prefix_and_gzip_suffix(self):
+        self.assertEqual('"abc"', normalise_etag(' W/"abc;gzip"'))
+        self.assertEqual('"abc"', normalise_etag('"abc"'))
+
+    def test_ScriptsArchive_etag_depends_only_on_files(self):
+        archive1, archive2 = ScriptsArchive(), ScriptsArchive()
+        for archive in archive1, archive2:
+            archive.add('foo', b'bar')
+        self.assertEqual(archive1.get_etag(), archive2.get_etag())
+        self.assertNotEqual(
+            archive1.getvalue(1), archive2.getvalue(2))
+        archive2.add('baz', b'')
+        self.assertNotEqual(archive1.get_etag(), archive2.get_etag())
+
+    def test_ScriptsArchive_getvalue_returns_tar(self):
+        archive = ScriptsArchive()
+        archive.add('foo', b'bar', 0o644)
+        tar = tarfile.open(
+            mode='r', fileobj=BytesIO(archive.getvalue(1000)))
+        member = tar.getmember('foo')
+        self.assertEqual((0o644, 1000), (member.mode, member.mtime))
+        self.assertEqual(b'bar', tar.extractfile(member).read())
+
+    def test_make_archive_response_skips_archive_when_not_modified(self):
+        get_archive = Mock()
+        response = make_archive_response(
+            self.fake_request(HTTP_IF_NONE_MATCH='"abc;gzip"'), '"abc"',
+            get_archive, 'application/x-tar')
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
+        self.assertThat(get_archive, MockNotCalled())
+
     def test_get_node_for_request_finds_node(self):
         node = factory.make_Node()
         token = NodeKey.objects.get_token_for_node(node)
@@ -1533,6 +1567,26 @@ class TestMAASScripts(MAASServerTestCase):
             "Unexpected response %d: %s"
             % (response.status_code, response.content))
 
+    def test__returns_not_modified_when_etag_matches(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.TESTING, with_empty_script_sets=True)
+        client = make_node_client(node=node)
+        etag = client.get(reverse('maas-scripts', args=['latest']))['ETag']
+        response = client.get(
+            reverse('maas-scripts', args=['latest']),
+            HTTP_IF_NONE_MATCH='"other", %s' % etag)
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
+        self.assertEqual(etag, response['ETag'])
+
+    def test__returns_scripts_when_etag_does_not_match(self):
+        node = factory.make_Node(
+            status=NODE_STATUS.TESTING, with_empty_script_sets=True)
+        response = make_node_client(node=node).get(
+            reverse('maas-scripts', args=['latest']),
+            HTTP_IF_NONE_MATCH='"other"')
+        self.assertEqual(http.client.OK, response.status_code)
+        self.assertEquals('application/x-tar', response['Content-Type'])
+
 
 class TestCommissioningAPI(MAASServerTestCase):
 
@@ -1598,6 +1652,43 @@ class TestCommissioningAPI(MAASServerTestCase):
             text_script.script.data,
             archive.extractfile(path).read().decode('utf-8'))
 
+    def test_commissioning_scripts_reuses_archive(self):
+        factory.make_Script(script_type=SCRIPT_TYPE.COMMISSIONING)
+        client = make_node_client()
+        response1 = client.get(
+            reverse('commissioning-scripts', args=['latest']))
+        response2 = client.get(
+            reverse('commissioning-scripts', args=['latest']))
+        self.assertEqual(response1.content, response2.content)
+        self.assertEqual(response1['ETag'], response2['ETag'])
+
+    def test_commissioning_scripts_rebuilds_archive_when_scripts_change(self):
+        script = factory.make_Script(script_type=SCRIPT_TYPE.COMMISSIONING)
+        client = make_node_client()
+        response1 = client.get(
+            reverse('commissioning-scripts', args=['latest']))
+        script.script = script.script.update(factory.make_string())
+        script.save()
+        response2 = client.get(
+            reverse('commissioning-scripts', args=['latest']))
+        self.assertNotEqual(response1['ETag'], response2['ETag'])
+        archive = tarfile.open(fileobj=BytesIO(response2.content))
+        self.assertEqual(
+            script.script.data.encode(),
+            archive.extractfile(
+                os.path.join('commissioning.d', script.name)).read())
+
+    def test_commissioning_scripts_not_modified_when_etag_matches(self):
+        factory.make_Script(script_type=SCRIPT_TYPE.COMMISSIONING)
+        client = make_node_client()
+        etag = client.get(
+            reverse('commissioning-scripts', args=['latest']))['ETag']
+        response = client.get(
+            reverse('commissioning-scripts', args=['latest']),
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(http.client.NOT_MODIFIED, response.status_code)
+        self.assertEqual(b'', response.content)
+
     def test_other_user_than_node_cannot_signal_commissioning_result(self):
         node = factory.make_Node(status=NODE_STATUS.COMMISSIONING)
         client = MAASSensibleOAuthClient(factory.make_User())
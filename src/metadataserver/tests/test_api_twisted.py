@@ -37,6 +37,7 @@ from maasserver.testing.testcase import (
     MAASTransactionServerTestCase,
 )
 from maasserver.utils.orm import (
+    make_serialization_failure,
     reload_object,
     transactional,
     TransactionManagementError,
@@ -49,6 +50,7 @@ from maastesting.matchers import (
     MockNotCalled,
 )
 from maastesting.testcase import MAASTestCase
+from maastesting.twisted import TwistedLoggerFixture
 from metadataserver import (
     api,
     api_twisted as api_twisted_module,
@@ -230,8 +232,9 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
                 worker.queueMessage(token.key, message)
         yield worker._tryUpdateNodes()
         call_args = [
-            (call_arg[0][1], call_arg[0][2])
+            task
             for call_arg in dbtasks.addTask.call_args_list
+            for task in call_arg[0][1]
         ]
         self.assertThat(call_args, MatchesSetwise(*[
             MatchesListwise([Equals(node), Equals(messages)])
@@ -245,7 +248,7 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
         with ExpectedException(TransactionManagementError):
             yield deferToDatabase(
                 transactional(worker._processMessages),
-                sentinel.node, [sentinel.message])
+                [(sentinel.node, [sentinel.message])])
 
     @wait_for_reactor
     @inlineCallbacks
@@ -258,30 +261,55 @@ class TestStatusWorkerServiceTransactional(MAASTransactionServerTestCase):
 
     @wait_for_reactor
     @inlineCallbacks
-    def test__processMessages_doesnt_call_when_node_deleted(self):
+    def test__processMessages_calls_processMessagesBatch(self):
         worker = StatusWorkerService(sentinel.dbtasks)
-        mock_processMessage = self.patch(worker, "_processMessage")
-        mock_processMessage.return_value = False
-        yield deferToDatabase(
-            worker._processMessages, sentinel.node,
-            [sentinel.message1, sentinel.message2])
+        mock_processMessagesBatch = self.patch(
+            worker, "_processMessagesBatch")
+        tasks = [(sentinel.node, [sentinel.message1, sentinel.message2])]
+        yield deferToDatabase(worker._processMessages, tasks)
         self.assertThat(
-            mock_processMessage,
-            MockCalledOnceWith(sentinel.node, sentinel.message1))
+            mock_processMessagesBatch, MockCalledOnceWith(tasks))
 
     @wait_for_reactor
     @inlineCallbacks
-    def test__processMessages_calls_processMessage(self):
+    def test__processMessages_logs_failure(self):
         worker = StatusWorkerService(sentinel.dbtasks)
-        mock_processMessage = self.patch(worker, "_processMessage")
-        yield deferToDatabase(
-            worker._processMessages, sentinel.node,
-            [sentinel.message1, sentinel.message2])
+        mock_processMessagesBatch = self.patch(
+            worker, "_processMessagesBatch")
+        mock_processMessagesBatch.side_effect = factory.make_exception()
+        with TwistedLoggerFixture() as logger:
+            yield deferToDatabase(
+                worker._processMessages, [(sentinel.node, [sentinel.msg])])
+        self.assertThat(logger.output, DocTestMatches(
+            "Failed to process status messages.\n..."))
+
+    def test__processMessagesLater_batches_messages(self):
+        dbtasks = Mock()
+        worker = StatusWorkerService(dbtasks)
+        worker.batch_size = 3
+        tasks = [
+            (sentinel.node1, [sentinel.message1, sentinel.message2]),
+            (sentinel.node2, [sentinel.message3]),
+            (sentinel.node3, [sentinel.message4]),
+        ]
+        worker._processMessagesLater(tasks)
         self.assertThat(
-            mock_processMessage,
-            MockCallsMatch(
-                call(sentinel.node, sentinel.message1),
-                call(sentinel.node, sentinel.message2)))
+            dbtasks.addTask, MockCallsMatch(
+                call(worker._processMessages, tasks[:2]),
+                call(worker._processMessages, tasks[2:])))
+
+    @wait_for_reactor
+    @inlineCallbacks
+    def test_queueMessages_processes_queue_early_when_busy(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        worker.flush_threshold = 2
+        mock_tryUpdateNodes = self.patch(worker, "_tryUpdateNodes")
+        yield worker.queueMessage(
+            factory.make_name("token"), self.make_message())
+        self.assertThat(mock_tryUpdateNodes, MockNotCalled())
+        yield worker.queueMessage(
+            factory.make_name("token"), self.make_message())
+        self.assertThat(mock_tryUpdateNodes, MockCalledOnceWith())
 
     @wait_for_reactor
     @inlineCallbacks
@@ -371,6 +399,77 @@ class TestStatusWorkerService(MAASServerTestCase):
         }
         self.assertFalse(self.processMessage(node1, payload))
 
+    def make_status_message(self):
+        return {
+            'event_type': 'progress',
+            'origin': 'curtin',
+            'name': factory.make_name('name'),
+            'description': factory.make_name('description'),
+            'timestamp': datetime.utcnow(),
+        }
+
+    def test_process_messages_batch_saves_events_for_all_nodes(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        nodes = [
+            factory.make_Node(status=NODE_STATUS.DEPLOYING)
+            for _ in range(3)
+        ]
+        tasks = [
+            (node, [self.make_status_message() for _ in range(2)])
+            for node in nodes
+        ]
+        worker._processMessagesBatch(tasks)
+        for node, messages in tasks:
+            self.assertItemsEqual(
+                [message['name'] for message in messages],
+                Event.objects.filter(node=node).values_list(
+                    'action', flat=True))
+
+    def test_process_messages_batch_skips_deleted_nodes(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        node1 = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        node2 = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        message1 = self.make_status_message()
+        message2 = self.make_status_message()
+        node1.delete()
+        worker._processMessagesBatch([
+            (node1, [message1]),
+            (node2, [message2]),
+        ])
+        self.assertItemsEqual(
+            [(node2.system_id, message2['name'])],
+            Event.objects.filter(
+                action__in=[message1['name'], message2['name']]).values_list(
+                    'node_system_id', 'action'))
+
+    def test_process_messages_batch_continues_after_failure(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        node = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        bad_message = self.make_status_message()
+        bad_message['files'] = [{
+            "path": "sample.txt",
+            "encoding": "uuencode",
+            "content": encode_as_base64(b"content"),
+        }]
+        message = self.make_status_message()
+        with TwistedLoggerFixture() as logger:
+            worker._processMessagesBatch([(node, [bad_message, message])])
+        self.assertItemsEqual(
+            [message['name']],
+            Event.objects.filter(node=node).values_list('action', flat=True))
+        self.assertThat(logger.output, DocTestMatches(
+            "Failed to process message for node: %s\n..." % node.hostname))
+
+    def test_process_messages_batch_reraises_retryable_failures(self):
+        worker = StatusWorkerService(sentinel.dbtasks)
+        node = factory.make_Node(status=NODE_STATUS.DEPLOYING)
+        error = make_serialization_failure()
+        self.patch(worker, "_applyMessage").side_effect = error
+        raised = self.assertRaises(
+            type(error), worker._processMessagesBatch,
+            [(node, [self.make_status_message()])])
+        self.assertIs(error, raised)
+
     def test_status_installation_result_does_not_affect_other_node(self):
         node1 = factory.make_Node(status=NODE_STATUS.DEPLOYING)
         node2 = factory.make_Node(status=NODE_STATUS.DEPLOYING)
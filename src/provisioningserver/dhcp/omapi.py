@@ -0,0 +1,374 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Native client for the OMAPI protocol spoken by the ISC DHCP server.
+
+This manages host maps like `Omshell`, but over a single authenticated
+connection, and with many operations in flight at once.
+"""
+
+__all__ = [
+    "OmapiClient",
+    "OmapiError",
+    ]
+
+import base64
+import hashlib
+import hmac
+from itertools import count
+import random
+import socket
+import struct
+import threading
+
+from netaddr import IPAddress
+from provisioningserver.logger import LegacyLogger
+from provisioningserver.utils import typed
+
+
+log = LegacyLogger()
+
+
+OMAPI_PROTOCOL_VERSION = 100
+OMAPI_HEADER_SIZE = 24
+
+OMAPI_OP_OPEN = 1
+OMAPI_OP_UPDATE = 3
+OMAPI_OP_STATUS = 5
+OMAPI_OP_DELETE = 6
+
+# Result codes from the ISC library that the DHCP server reports in status
+# messages. See isc/result.h.
+ISC_R_SUCCESS = 0
+ISC_R_EXISTS = 18
+ISC_R_NOTFOUND = 23
+ISC_R_IOERROR = 26
+
+# The key defined by the DHCP server configuration templates.
+OMAPI_KEY_NAME = b"omapi_key"
+OMAPI_KEY_ALGORITHM = b"hmac-md5.SIG-ALG.REG.INT."
+OMAPI_SIGNATURE_SIZE = 16
+
+
+class OmapiError(Exception):
+    """Communicating with the DHCP server over OMAPI failed."""
+
+
+def _pack_pairs(pairs):
+    """Pack name/value `pairs` as OMAPI expects, terminated by an empty name.
+    """
+    packed = [
+        struct.pack("!H", len(name)) + name +
+        struct.pack("!I", len(value)) + value
+        for name, value in pairs
+    ]
+    packed.append(struct.pack("!H", 0))
+    return b"".join(packed)
+
+
+def _pack_host(mac_address, ip_address=None):
+    """Return OMAPI object attributes for a host map.
+
+    The "name" is not a host name; it's an identifier used within the DHCP
+    server. We use the MAC address, as `Omshell` does.
+    """
+    attributes = [(b"name", mac_address.replace(":", "-").encode("ascii"))]
+    if ip_address is not None:
+        attributes.extend([
+            (b"ip-address", IPAddress(ip_address).packed),
+            (b"hardware-address", bytes.fromhex(mac_address.replace(":", ""))),
+            (b"hardware-type", struct.pack("!I", 1)),
+        ])
+    return attributes
+
+
+class OmapiMessage:
+    """A message in the OMAPI protocol.
+
+    :ivar message: Name/value pairs describing the operation.
+    :ivar obj: Name/value pairs for the attributes of the object operated on.
+    """
+
+    def __init__(self, opcode, handle=0, tid=0, rid=0, message=(), obj=()):
+        self.opcode = opcode
+        self.handle = handle
+        self.tid = tid
+        self.rid = rid
+        self.message = list(message)
+        self.obj = list(obj)
+
+    def pack(self, authid=0, key=None):
+        """Pack this message, signing it with `key` if given."""
+        body = struct.pack(
+            "!IIII", self.opcode, self.handle, self.tid, self.rid)
+        body += _pack_pairs(self.message) + _pack_pairs(self.obj)
+        if key is None:
+            return struct.pack("!II", 0, 0) + body
+        else:
+            # The signature covers everything except the authenticator ID.
+            authlen = struct.pack("!I", OMAPI_SIGNATURE_SIZE)
+            signature = hmac.new(key, authlen + body, hashlib.md5).digest()
+            return struct.pack("!I", authid) + authlen + body + signature
+
+    def get_result(self):
+        """Return the result code of a status message."""
+        for name, value in self.message:
+            if name == b"result":
+                return struct.unpack("!I", value)[0]
+        return None
+
+    def get_error(self):
+        """Return a description of the error in a status message."""
+        for name, value in self.message:
+            if name == b"message":
+                return value.decode("utf-8", "replace")
+        return "OMAPI operation failed (opcode %d, result %r)." % (
+            self.opcode, self.get_result())
+
+
+class OmapiClient:
+    """Manage host maps in the DHCP server over OMAPI.
+
+    The connection is opened by `connect` and kept open until `close`, so
+    that it can be used for many batches of operations. Each batch is
+    pipelined: up to `window` messages are sent before waiting for their
+    responses.
+
+    :param server_address: The address for the DHCP server (ip or hostname)
+    :param shared_key: The base64-encoded HMAC-MD5 key set in the DHCP
+        server's config. See `Omshell`.
+    """
+
+    # The most messages to send before reading their responses. The DHCP
+    # server stops reading if its responses are not read, so this must be
+    # small enough that neither side's socket buffers fill.
+    window = 64
+
+    # Seconds to wait for the DHCP server before giving up.
+    timeout = 30
+
+    def __init__(self, server_address, shared_key, ipv6=False):
+        self.server_address = server_address
+        self.shared_key = shared_key
+        self.ipv6 = ipv6
+        if ipv6 is True:
+            self.server_port = 7912
+        else:
+            self.server_port = 7911
+        self.lock = threading.Lock()
+        self._key = base64.b64decode(shared_key)
+        self._tids = count(random.randint(1, 2 ** 31))
+        self._authid = None
+        self._socket = None
+        self._stream = None
+
+    @property
+    def connected(self):
+        return self._socket is not None
+
+    def connect(self):
+        """Connect and authenticate to the DHCP server.
+
+        :raise OmapiError: If the connection could not be made or was
+            refused by the DHCP server.
+        """
+        try:
+            self._socket = socket.create_connection(
+                (self.server_address, self.server_port), self.timeout)
+            self._stream = self._socket.makefile("rb")
+            startup = struct.pack(
+                "!II", OMAPI_PROTOCOL_VERSION, OMAPI_HEADER_SIZE)
+            self._socket.sendall(startup)
+            if self._read(len(startup)) != startup:
+                raise OmapiError("Unsupported OMAPI protocol version.")
+            response, = self._pipeline([self._make_message(
+                OMAPI_OP_OPEN, message=[(b"type", b"authenticator")],
+                obj=[
+                    (b"name", OMAPI_KEY_NAME),
+                    (b"algorithm", OMAPI_KEY_ALGORITHM),
+                ])])
+            if response.opcode != OMAPI_OP_UPDATE:
+                raise OmapiError(
+                    "Authentication failed: %s" % response.get_error())
+            self._authid = response.handle
+        except OSError as error:
+            self.close()
+            raise OmapiError(
+                "Could not connect to %s:%d: %s" % (
+                    self.server_address, self.server_port, error)) from error
+        except OmapiError:
+            self.close()
+            raise
+
+    def close(self):
+        """Close the connection, if open."""
+        if self._stream is not None:
+            self._stream.close()
+        if self._socket is not None:
+            self._socket.close()
+        self._socket = self._stream = None
+        self._authid = None
+
+    def _make_message(self, opcode, **kwargs):
+        return OmapiMessage(opcode, tid=next(self._tids) % 2 ** 32, **kwargs)
+
+    def _read(self, size):
+        data = self._stream.read(size)
+        if len(data) != size:
+            raise OmapiError("Connection closed by the DHCP server.")
+        return data
+
+    def _read_pairs(self):
+        pairs = []
+        while True:
+            name_size, = struct.unpack("!H", self._read(2))
+            if name_size == 0:
+                return pairs
+            name = self._read(name_size)
+            value_size, = struct.unpack("!I", self._read(4))
+            pairs.append((name, self._read(value_size)))
+
+    def _receive(self):
+        (authid, authlen, opcode, handle, tid, rid) = struct.unpack(
+            "!IIIIII", self._read(OMAPI_HEADER_SIZE))
+        message = self._read_pairs()
+        obj = self._read_pairs()
+        self._read(authlen)  # Signature.
+        return OmapiMessage(opcode, handle, tid, rid, message, obj)
+
+    def _pipeline(self, messages):
+        """Send `messages` and return their responses, in the same order.
+
+        :raise OmapiError: If the connection fails; the connection is closed.
+        """
+        if self._socket is None:
+            raise OmapiError("Not connected to the DHCP server.")
+        if self._authid is None:
+            key = None
+        else:
+            key = self._key
+        responses = {}
+        outstanding = 0
+        try:
+            for message in messages:
+                if outstanding >= self.window:
+                    response = self._receive()
+                    responses[response.rid] = response
+                    outstanding -= 1
+                self._socket.sendall(message.pack(self._authid, key))
+                outstanding += 1
+            for _ in range(outstanding):
+                response = self._receive()
+                responses[response.rid] = response
+        except (OSError, struct.error) as error:
+            self.close()
+            raise OmapiError(
+                "Lost connection to the DHCP server: %s" % error) from error
+        except OmapiError:
+            self.close()
+            raise
+        try:
+            return [responses[message.tid] for message in messages]
+        except KeyError:
+            self.close()
+            raise OmapiError("Unexpected response from the DHCP server.")
+
+    def _open_hosts(self, mac_addresses):
+        """Open existing host maps for `mac_addresses`.
+
+        :return: A list of responses, in the same order.
+        """
+        return self._pipeline([
+            self._make_message(
+                OMAPI_OP_OPEN, message=[(b"type", b"host")],
+                obj=_pack_host(mac_address))
+            for mac_address in mac_addresses
+        ])
+
+    @typed
+    def create(self, hosts: list):
+        """Create host maps.
+
+        Host maps that already exist are treated as success, as `Omshell`
+        does.
+
+        :param hosts: A list of ``(mac_address, ip_address)`` tuples.
+        :return: A ``{mac_address: error}`` dict of the failures.
+        """
+        with self.lock:
+            responses = self._pipeline([
+                self._make_message(
+                    OMAPI_OP_OPEN, message=[
+                        (b"type", b"host"),
+                        (b"create", struct.pack("!I", 1)),
+                        (b"exclusive", struct.pack("!I", 1)),
+                    ],
+                    obj=_pack_host(mac_address, ip_address))
+                for mac_address, ip_address in hosts
+            ])
+        failures = {}
+        for (mac_address, _), response in zip(hosts, responses):
+            if response.opcode == OMAPI_OP_UPDATE:
+                continue
+            elif response.get_result() in (ISC_R_EXISTS, ISC_R_IOERROR):
+                # Host map already existed.
+                continue
+            else:
+                failures[mac_address] = response.get_error()
+        return failures
+
+    @typed
+    def modify(self, hosts: list):
+        """Modify host maps.
+
+        :param hosts: A list of ``(mac_address, ip_address)`` tuples.
+        :return: A ``{mac_address: error}`` dict of the failures.
+        """
+        failures = {}
+        with self.lock:
+            opened = self._open_hosts(
+                [mac_address for mac_address, _ in hosts])
+            updates = []
+            for (mac_address, ip_address), response in zip(hosts, opened):
+                if response.opcode == OMAPI_OP_UPDATE:
+                    update = self._make_message(
+                        OMAPI_OP_UPDATE, handle=response.handle,
+                        obj=_pack_host(mac_address, ip_address)[1:])
+                    updates.append((mac_address, update))
+                else:
+                    failures[mac_address] = response.get_error()
+            responses = self._pipeline([update for _, update in updates])
+        for (mac_address, _), response in zip(updates, responses):
+            if response.opcode != OMAPI_OP_UPDATE:
+                failures[mac_address] = response.get_error()
+        return failures
+
+    @typed
+    def remove(self, mac_addresses: list):
+        """Remove host maps.
+
+        Host maps that do not exist are treated as success, as `Omshell`
+        does.
+
+        :param mac_addresses: A list of MAC addresses.
+        :return: A ``{mac_address: error}`` dict of the failures.
+        """
+        failures = {}
+        with self.lock:
+            opened = self._open_hosts(mac_addresses)
+            deletes = []
+            for mac_address, response in zip(mac_addresses, opened):
+                if response.opcode == OMAPI_OP_UPDATE:
+                    delete = self._make_message(
+                        OMAPI_OP_DELETE, handle=response.handle)
+                    deletes.append((mac_address, delete))
+                elif response.get_result() == ISC_R_NOTFOUND:
+                    # It was already removed.
+                    continue
+                else:
+                    failures[mac_address] = response.get_error()
+            responses = self._pipeline([delete for _, delete in deletes])
+        for (mac_address, _), response in zip(deletes, responses):
+            if response.get_result() != ISC_R_SUCCESS:
+                failures[mac_address] = response.get_error()
+        return failures
@@ -0,0 +1,262 @@
+# Copyright 2018 Canonical Ltd.  This software is licensed under the
+# GNU Affero General Public License version 3 (see the file LICENSE).
+
+"""Tests for the native OMAPI client."""
+
+__all__ = []
+
+import base64
+import hashlib
+import hmac
+import socket
+import struct
+import threading
+
+from maastesting.factory import factory
+from maastesting.testcase import MAASTestCase
+from provisioningserver.dhcp.omapi import (
+    ISC_R_EXISTS,
+    ISC_R_NOTFOUND,
+    ISC_R_SUCCESS,
+    OMAPI_HEADER_SIZE,
+    OMAPI_OP_DELETE,
+    OMAPI_OP_OPEN,
+    OMAPI_OP_STATUS,
+    OMAPI_OP_UPDATE,
+    OmapiClient,
+    OmapiError,
+    OmapiMessage,
+)
+from testtools.matchers import MatchesStructure
+
+
+def read_exactly(stream, size):
+    data = stream.read(size)
+    assert len(data) == size, "Short read"
+    return data
+
+
+def read_pairs(stream):
+    pairs = []
+    while True:
+        name_size, = struct.unpack("!H", read_exactly(stream, 2))
+        if name_size == 0:
+            return pairs
+        name = read_exactly(stream, name_size)
+        value_size, = struct.unpack("!I", read_exactly(stream, 4))
+        pairs.append((name, read_exactly(stream, value_size)))
+
+
+def status(request, result, message=b"Failed."):
+    return OmapiMessage(
+        OMAPI_OP_STATUS, rid=request.tid, message=[
+            (b"result", struct.pack("!I", result)),
+            (b"message", message),
+        ])
+
+
+class FakeOmapiServer:
+    """A DHCP server's side of an OMAPI connection, in a thread.
+
+    Requests are recorded in `requests`, with their ``authid`` and
+    ``signature``. Each host map in `hosts`, keyed by name, is a dict of its
+    attributes.
+    """
+
+    def __init__(self):
+        self.client_socket, self.server_socket = socket.socketpair()
+        self.requests = []
+        self.hosts = {}
+        self.handles = {}
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def serve(self):
+        stream = self.server_socket.makefile("rb")
+        startup = read_exactly(stream, 8)
+        self.server_socket.sendall(startup)
+        while True:
+            header = stream.read(OMAPI_HEADER_SIZE)
+            if len(header) != OMAPI_HEADER_SIZE:
+                break
+            authid, authlen, opcode, handle, tid, rid = struct.unpack(
+                "!IIIIII", header)
+            request = OmapiMessage(
+                opcode, handle, tid, rid, read_pairs(stream),
+                read_pairs(stream))
+            request.authid = authid
+            request.signature = read_exactly(stream, authlen)
+            self.requests.append(request)
+            try:
+                self.server_socket.sendall(self.respond(request).pack())
+            except OSError:
+                break  # The client has gone away.
+        self.server_socket.close()
+
+    def respond(self, request):
+        message, obj = dict(request.message), dict(request.obj)
+        if request.opcode == OMAPI_OP_OPEN:
+            if message[b"type"] == b"authenticator":
+                return OmapiMessage(
+                    OMAPI_OP_UPDATE, handle=1, rid=request.tid)
+            name = obj[b"name"]
+            if b"create" in message:
+                if name in self.hosts:
+                    return status(request, ISC_R_EXISTS)
+                self.hosts[name] = obj
+            elif name not in self.hosts:
+                return status(request, ISC_R_NOTFOUND)
+            handle = len(self.handles) + 2
+            self.handles[handle] = name
+            return OmapiMessage(
+                OMAPI_OP_UPDATE, handle=handle, rid=request.tid,
+                obj=self.hosts[name].items())
+        elif request.opcode == OMAPI_OP_UPDATE:
+            name = self.handles[request.handle]
+            self.hosts[name].update(obj)
+            return OmapiMessage(
+                OMAPI_OP_UPDATE, handle=request.handle, rid=request.tid,
+                obj=self.hosts[name].items())
+        elif request.opcode == OMAPI_OP_DELETE:
+            del self.hosts[self.handles[request.handle]]
+            return status(request, ISC_R_SUCCESS, b"")
+
+
+class TestOmapiMessage(MAASTestCase):
+
+    def test_pack_unsigned(self):
+        message = OmapiMessage(
+            OMAPI_OP_OPEN, handle=2, tid=3, rid=4,
+            message=[(b"type", b"host")], obj=[(b"name", b"foo")])
+        self.assertEqual(
+            struct.pack("!IIIIII", 0, 0, OMAPI_OP_OPEN, 2, 3, 4) +
+            b"\x00\x04type\x00\x00\x00\x04host\x00\x00" +
+            b"\x00\x04name\x00\x00\x00\x03foo\x00\x00",
+            message.pack())
+
+    def test_pack_signed(self):
+        key = factory.make_bytes()
+        message = OmapiMessage(OMAPI_OP_DELETE, handle=2, tid=3)
+        packed = message.pack(authid=7, key=key)
+        body = struct.pack("!IIII", OMAPI_OP_DELETE, 2, 3, 0) + b"\x00" * 4
+        self.assertEqual(struct.pack("!II", 7, 16), packed[:8])
+        self.assertEqual(body, packed[8:-16])
+        self.assertEqual(
+            hmac.new(
+                key, struct.pack("!I", 16) + body, hashlib.md5).digest(),
+            packed[-16:])
+
+    def test_get_result_and_error(self):
+        message = status(OmapiMessage(OMAPI_OP_OPEN), ISC_R_NOTFOUND, b"Oops")
+        self.assertEqual(ISC_R_NOTFOUND, message.get_result())
+        self.assertEqual("Oops", message.get_error())
+
+
+class TestOmapiClient(MAASTestCase):
+
+    def make_client(self):
+        server = FakeOmapiServer()
+        self.addCleanup(server.thread.join, 5)
+        self.patch(socket, "create_connection").return_value = (
+            server.client_socket)
+        key = base64.b64encode(factory.make_bytes()).decode("ascii")
+        client = OmapiClient("127.0.0.1", key)
+        self.addCleanup(client.close)
+        client.connect()
+        return client, server
+
+    def test_initialisation(self):
+        client = OmapiClient("127.0.0.1", "", ipv6=True)
+        self.assertThat(client, MatchesStructure.byEquality(
+            server_address="127.0.0.1", shared_key="", server_port=7912))
+
+    def test_connect_authenticates(self):
+        client, server = self.make_client()
+        self.assertTrue(client.connected)
+        request, = server.requests
+        self.assertEqual(OMAPI_OP_OPEN, request.opcode)
+        self.assertEqual(
+            [(b"name", b"omapi_key"),
+             (b"algorithm", b"hmac-md5.SIG-ALG.REG.INT.")],
+            request.obj)
+
+    def test_connect_raises_OmapiError_when_refused(self):
+        self.patch(socket, "create_connection").side_effect = (
+            ConnectionRefusedError())
+        client = OmapiClient("127.0.0.1", "")
+        self.assertRaises(OmapiError, client.connect)
+        self.assertFalse(client.connected)
+
+    def test_create_creates_host_maps(self):
+        client, server = self.make_client()
+        self.assertEqual({}, client.create([
+            ("00:11:22:33:44:55", "10.0.0.1"),
+            ("00:11:22:33:44:66", "10.0.0.2"),
+        ]))
+        self.assertEqual({
+            b"name": b"00-11-22-33-44-55",
+            b"ip-address": bytes([10, 0, 0, 1]),
+            b"hardware-address": bytes.fromhex("001122334455"),
+            b"hardware-type": struct.pack("!I", 1),
+        }, server.hosts[b"00-11-22-33-44-55"])
+        self.assertIn(b"00-11-22-33-44-66", server.hosts)
+
+    def test_create_treats_existing_host_map_as_success(self):
+        client, server = self.make_client()
+        client.create([("00:11:22:33:44:55", "10.0.0.1")])
+        self.assertEqual(
+            {}, client.create([("00:11:22:33:44:55", "10.0.0.1")]))
+
+    def test_create_signs_requests(self):
+        client, server = self.make_client()
+        client.create([("00:11:22:33:44:55", "10.0.0.1")])
+        request = server.requests[-1]
+        self.assertEqual(1, request.authid)
+        self.assertEqual(
+            OmapiMessage(
+                request.opcode, request.handle, request.tid, request.rid,
+                request.message, request.obj).pack(
+                    1, base64.b64decode(client.shared_key))[-16:],
+            request.signature)
+
+    def test_modify_updates_host_maps(self):
+        client, server = self.make_client()
+        client.create([("00:11:22:33:44:55", "10.0.0.1")])
+        self.assertEqual(
+            {}, client.modify([("00:11:22:33:44:55", "10.0.0.9")]))
+        self.assertEqual(
+            bytes([10, 0, 0, 9]),
+            server.hosts[b"00-11-22-33-44-55"][b"ip-address"])
+
+    def test_modify_reports_missing_host_maps(self):
+        client, server = self.make_client()
+        self.assertEqual(
+            {"00:11:22:33:44:55": "Failed."},
+            client.modify([("00:11:22:33:44:55", "10.0.0.9")]))
+
+    def test_remove_deletes_host_maps(self):
+        client, server = self.make_client()
+        client.create([("00:11:22:33:44:55", "10.0.0.1")])
+        self.assertEqual({}, client.remove(["00:11:22:33:44:55"]))
+        self.assertEqual({}, server.hosts)
+
+    def test_remove_treats_missing_host_map_as_success(self):
+        client, server = self.make_client()
+        self.assertEqual({}, client.remove(["00:11:22:33:44:55"]))
+
+    def test_pipelines_more_operations_than_window(self):
+        client, server = self.make_client()
+        client.window = 3
+        hosts = [
+            ("00:11:22:33:44:%02x" % index, "10.0.0.%d" % index)
+            for index in range(10)
+        ]
+        self.assertEqual({}, client.create(hosts))
+        self.assertEqual(10, len(server.hosts))
+
+    def test_closes_connection_when_lost(self):
+        client, server = self.make_client()
+        server.client_socket.shutdown(socket.SHUT_RD)
+        self.assertRaises(
+            OmapiError, client.create, [("00:11:22:33:44:55", "10.0.0.1")])
+        self.assertFalse(client.connected)
@@ -68,14 +68,16 @@ def bind_reload_with_retries(attempts=10, interval=2):
 
     :param attempts: The number of attempts.
     :param interval: The time in seconds to sleep between each attempt.
+    :return: True if success, False otherwise.
     """
     for countdown in range(attempts - 1, -1, -1):
         if bind_reload():
-            break
+            return True
         if countdown == 0:
             break
         else:
             sleep(interval)
+    return False
 
 
 def bind_reload_zones(zone_list):
@@ -108,6 +110,8 @@ def bind_write_configuration(zones, trusted_networks):
 
     :param trusted_networks: A sequence of CIDR network specifications that
         are permitted to use the DNS server as a forwarder.
+    :return: True if the configuration was written, False if it was
+        unchanged.
     """
     # trusted_networks was formerly specified as a single IP address with
     # netmask. These assertions are here to prevent code that assumes that
@@ -116,7 +120,7 @@ def bind_write_configuration(zones, trusted_networks):
     assert isinstance(trusted_networks, collections.Sequence)
 
     dns_config = DNSConfig(zones=zones)
-    dns_config.write_config(trusted_networks=trusted_networks)
+    return dns_config.write_config(trusted_networks=trusted_networks)
 
 
 def bind_write_options(upstream_dns, dnssec_validation):
@@ -124,13 +128,14 @@ def bind_write_options(upstream_dns, dnssec_validation):
 
     :param upstream_dns: A sequence of upstream DNS servers.
     :param dnssec_validation: Whether to enable DNSSec.
+    :return: True if the options were written, False if they were unchanged.
     """
     # upstream_dns was formerly specified as a single IP address. These
     # assertions are here to prevent code that assumes that slipping through.
     assert not isinstance(upstream_dns, (bytes, str))
     assert isinstance(upstream_dns, collections.Sequence)
 
-    set_up_options_conf(
+    return set_up_options_conf(
         upstream_dns=upstream_dns, dnssec_validation=dnssec_validation)
 
 
@@ -139,6 +144,10 @@ def bind_write_zones(zones):
 
     :param zones: Those zones to write.
     :type zones: Sequence of :py:class:`DomainData`.
+    :return: A list of the names of the zones whose files were written; the
+        others were unchanged.
     """
+    written = []
     for zone in zones:
-        zone.write_config()
+        written.extend(zone.write_config())
+    return written
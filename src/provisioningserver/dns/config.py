@@ -15,6 +15,7 @@ from collections import namedtuple
 from contextlib import contextmanager
 from datetime import datetime
 import errno
+import hashlib
 import os
 import os.path
 import re
@@ -37,6 +38,10 @@ MAAS_NAMED_CONF_OPTIONS_INSIDE_NAME = 'named.conf.options.inside.maas'
 MAAS_NAMED_RNDC_CONF_NAME = 'named.conf.rndc.maas'
 MAAS_RNDC_CONF_NAME = 'rndc.conf.maas'
 
+# Digests of the content this process last wrote to each DNS configuration or
+# zone file. See `write_if_changed`.
+_written_digests = {}
+
 
 def get_dns_config_dir():
     """Location of MAAS' bind configuration files."""
@@ -187,6 +192,8 @@ def set_up_options_conf(overwrite=True, **kwargs):
     inside its 'options' block.  MAAS cannot write the options file itself,
     so relies on either the DNSFixture in the test suite, or the packaging.
     Both should set that file up appropriately to include our file.
+
+    :return: True if the file was written, False if it was unchanged.
     """
     template = load_template('dns', 'named.conf.options.inside.maas.template')
 
@@ -226,7 +233,7 @@ def set_up_options_conf(overwrite=True, **kwargs):
         rendered = rendered.encode("ascii")
 
     target_path = compose_config_path(MAAS_NAMED_CONF_OPTIONS_INSIDE_NAME)
-    atomic_write(rendered, target_path, overwrite=overwrite, mode=0o644)
+    return write_if_changed(rendered, target_path, overwrite=overwrite)
 
 
 def compose_config_path(filename):
@@ -239,6 +246,43 @@ def compose_bind_config_path(filename):
     return os.path.join(get_bind_config_dir(), filename)
 
 
+def write_if_changed(
+        content, target_path, substitutions=None, overwrite=True,
+        mode=0o644):
+    """Write `content` to `target_path` unless it has not changed.
+
+    The content is considered unchanged if this process last wrote the same
+    content to `target_path`, and the file still exists. If `overwrite` is
+    false, an existing file is never written.
+
+    :param content: The content to write, as `bytes`.
+    :param substitutions: A dict of placeholders in `content` to be replaced
+        by values before writing. Only the placeholders, not the values, are
+        compared, so values like timestamps do not cause a rewrite.
+    :return: True if the file was written, False if it was unchanged.
+    """
+    if not overwrite and os.path.exists(target_path):
+        return False
+    digest = hashlib.sha1(content).digest()
+    if (_written_digests.get(target_path) == digest and
+            os.path.exists(target_path)):
+        return False
+    if substitutions is not None:
+        for placeholder, value in substitutions.items():
+            content = content.replace(placeholder, value)
+    atomic_write(content, target_path, overwrite=overwrite, mode=mode)
+    _written_digests[target_path] = digest
+    return True
+
+
+def forget_written_content():
+    """Forget what `write_if_changed` has written.
+
+    Every file will be written next time, whether it has changed or not.
+    """
+    _written_digests.clear()
+
+
 def render_dns_template(template_name, *parameters):
     """Generate contents for a DNS configuration or zone file.
 
@@ -296,6 +340,7 @@ class DNSConfig:
 
         :raises DNSConfigDirectoryMissing: if the DNS configuration directory
             does not exist.
+        :return: True if the file was written, False if it was unchanged.
         """
         trusted_networks = kwargs.pop("trusted_networks", "")
         context = {
@@ -312,7 +357,7 @@ class DNSConfig:
         content = content.encode("ascii")
         target_path = compose_config_path(self.target_file_name)
         with report_missing_config_dir():
-            atomic_write(content, target_path, overwrite=overwrite, mode=0o644)
+            return write_if_changed(content, target_path, overwrite=overwrite)
 
     @classmethod
     def get_include_snippet(cls):
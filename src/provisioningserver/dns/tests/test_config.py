@@ -14,6 +14,7 @@ from unittest.mock import Mock
 from fixtures import EnvironmentVariable
 from maastesting.factory import factory
 from maastesting.fakemethod import FakeMethod
+from maastesting.matchers import MockNotCalled
 from maastesting.testcase import MAASTestCase
 from netaddr import IPNetwork
 from provisioningserver.dns import config
@@ -36,6 +37,7 @@ from provisioningserver.dns.config import (
     set_up_options_conf,
     set_up_rndc,
     uncomment_named_conf,
+    write_if_changed,
 )
 from provisioningserver.dns.testing import (
     patch_dns_config_path,
@@ -354,6 +356,59 @@ class TestComposeConfigPath(MAASTestCase):
             compose_config_path(filename))
 
 
+class TestWriteIfChanged(MAASTestCase):
+    """Tests for `write_if_changed`."""
+
+    def test_writes_new_file(self):
+        path = os.path.join(self.make_dir(), factory.make_name('zone'))
+        content = factory.make_string()
+        self.assertTrue(write_if_changed(content.encode("ascii"), path))
+        self.assertThat(path, FileContains(content))
+
+    def test_does_not_rewrite_unchanged_content(self):
+        path = os.path.join(self.make_dir(), factory.make_name('zone'))
+        content = factory.make_bytes()
+        write_if_changed(content, path)
+        atomic_write = self.patch(config, 'atomic_write')
+        self.assertFalse(write_if_changed(content, path))
+        self.assertThat(atomic_write, MockNotCalled())
+
+    def test_rewrites_changed_content(self):
+        path = os.path.join(self.make_dir(), factory.make_name('zone'))
+        write_if_changed(factory.make_bytes(), path)
+        content = factory.make_string()
+        self.assertTrue(write_if_changed(content.encode("ascii"), path))
+        self.assertThat(path, FileContains(content))
+
+    def test_rewrites_removed_file(self):
+        path = os.path.join(self.make_dir(), factory.make_name('zone'))
+        content = factory.make_string()
+        write_if_changed(content.encode("ascii"), path)
+        os.unlink(path)
+        self.assertTrue(write_if_changed(content.encode("ascii"), path))
+        self.assertThat(path, FileContains(content))
+
+    def test_rewrites_everything_after_forget_written_content(self):
+        path = os.path.join(self.make_dir(), factory.make_name('zone'))
+        content = factory.make_bytes()
+        write_if_changed(content, path)
+        config.forget_written_content()
+        self.assertTrue(write_if_changed(content, path))
+
+    def test_ignores_substituted_values(self):
+        path = os.path.join(self.make_dir(), factory.make_name('zone'))
+        write_if_changed(b"serial @@serial@@", path, {b"@@serial@@": b"1"})
+        self.assertFalse(write_if_changed(
+            b"serial @@serial@@", path, {b"@@serial@@": b"2"}))
+        self.assertThat(path, FileContains("serial 1"))
+
+    def test_does_not_overwrite_if_told_not_to(self):
+        path = self.make_file(contents="existing")
+        self.assertFalse(
+            write_if_changed(factory.make_bytes(), path, overwrite=False))
+        self.assertThat(path, FileContains("existing"))
+
+
 class TestRenderDNSTemplate(MAASTestCase):
     """Tests for `render_dns_template`."""
 
@@ -281,6 +281,38 @@ class TestDNSForwardZoneConfig(MAASTestCase):
         dns_zone_config.write_config()
         self.assertThat(get_generate_directives, MockNotCalled())
 
+    def test_write_config_returns_written_zone_names(self):
+        patch_dns_config_path(self)
+        dns_zone_config = DNSForwardZoneConfig(
+            factory.make_string(), serial=random.randint(1, 100))
+        self.assertEqual(
+            [dns_zone_config.domain], dns_zone_config.write_config())
+
+    def test_write_config_skips_zone_when_only_serial_changes(self):
+        target_dir = patch_dns_config_path(self)
+        domain = factory.make_string()
+        DNSForwardZoneConfig(domain, serial=1).write_config()
+        self.assertEqual(
+            [], DNSForwardZoneConfig(domain, serial=2).write_config())
+        self.assertThat(
+            os.path.join(target_dir, 'zone.%s' % domain),
+            FileContains(matcher=Contains('1 ; serial')))
+
+    def test_write_config_rewrites_zone_when_records_change(self):
+        target_dir = patch_dns_config_path(self)
+        domain = factory.make_string()
+        DNSForwardZoneConfig(domain, serial=1).write_config()
+        hostname = factory.make_name('host')
+        ip = factory.make_ipv4_address()
+        mapping = {hostname: HostnameIPMapping(None, 30, {ip})}
+        self.assertEqual(
+            [domain], DNSForwardZoneConfig(
+                domain, serial=2, mapping=mapping).write_config())
+        self.assertThat(
+            os.path.join(target_dir, 'zone.%s' % domain),
+            FileContains(matcher=ContainsAll([
+                '2 ; serial', '%s 30 IN A %s' % (hostname, ip)])))
+
     def test_config_file_is_world_readable(self):
         patch_dns_config_path(self)
         dns_zone_config = DNSForwardZoneConfig(
@@ -22,8 +22,8 @@ from provisioningserver.dns.config import (
     compose_config_path,
     render_dns_template,
     report_missing_config_dir,
+    write_if_changed,
 )
-from provisioningserver.utils.fs import incremental_write
 from provisioningserver.utils.network import (
     intersect_iprange,
     ip_range_within_network,
@@ -171,14 +171,32 @@ class DomainConfigBase:
         increase with every rewrite.  Some filesystems (ext3?) only seem to
         support a resolution of one second, and so this method may set an
         unexpected modification time in order to maintain that property.
+
+        A zone file is not rewritten if only its serial and modification time
+        would change.
+
+        :return: True if any file was written, False if all were unchanged.
         """
         if not isinstance(output_file, list):
             output_file = [output_file]
+        # Render placeholders for the serial and modification time so that
+        # they are not considered when checking for changes.
+        placeholders, substitutions = {}, {}
+        for params in parameters:
+            for name in ('serial', 'modified'):
+                if name in params:
+                    placeholder = '@@%s@@' % name
+                    placeholders[name] = placeholder
+                    substitutions[placeholder.encode("ascii")] = (
+                        str(params[name]).encode("utf-8"))
+        written = False
         for outfile in output_file:
-            content = render_dns_template(cls.template_file_name, *parameters)
+            content = render_dns_template(
+                cls.template_file_name, *parameters, placeholders)
             with report_missing_config_dir():
-                incremental_write(content.encode("utf-8"), outfile, mode=0o644)
-        pass
+                written |= write_if_changed(
+                    content.encode("utf-8"), outfile, substitutions)
+        return written
 
 
 class DNSForwardZoneConfig(DomainConfigBase):
@@ -293,7 +311,11 @@ class DNSForwardZoneConfig(DomainConfigBase):
             generate_directives, key=lambda directive: directive[2])
 
     def write_config(self):
-        """Write the zone file."""
+        """Write the zone file.
+
+        :return: A list of the names of the zones whose files were written.
+        """
+        written = []
         # Create GENERATE directives for IPv4 ranges.
         for zi in self.zone_info:
             generate_directives = list(
@@ -302,21 +324,23 @@ class DNSForwardZoneConfig(DomainConfigBase):
                     for dynamic_range in self._dynamic_ranges
                     if dynamic_range.version == 4
                 ))
-            self.write_zone_file(
-                zi.target_path, self.make_parameters(),
-                {
-                    'mappings': {
-                        'A': self.get_A_mapping(
-                            self._mapping, self._ipv4_ttl),
-                        'AAAA': self.get_AAAA_mapping(
-                            self._mapping, self._ipv6_ttl),
-                    },
-                    'other_mapping': enumerate_rrset_mapping(
-                        self._other_mapping),
-                    'generate_directives': {
-                        'A': generate_directives,
-                    }
-                })
+            records = {
+                'mappings': {
+                    'A': self.get_A_mapping(
+                        self._mapping, self._ipv4_ttl),
+                    'AAAA': self.get_AAAA_mapping(
+                        self._mapping, self._ipv6_ttl),
+                },
+                'other_mapping': enumerate_rrset_mapping(
+                    self._other_mapping),
+                'generate_directives': {
+                    'A': generate_directives,
+                }
+            }
+            if self.write_zone_file(
+                    zi.target_path, self.make_parameters(), records):
+                written.append(zi.zone_name)
+        return written
 
 
 class DNSReverseZoneConfig(DomainConfigBase):
@@ -531,7 +555,11 @@ class DNSReverseZoneConfig(DomainConfigBase):
         return sorted(generate_directives)
 
     def write_config(self):
-        """Write the zone file."""
+        """Write the zone file.
+
+        :return: A list of the names of the zones whose files were written.
+        """
+        written = []
         # Create GENERATE directives for IPv4 ranges.
         for zi in self.zone_info:
             generate_directives = list(
@@ -543,20 +571,21 @@ class DNSReverseZoneConfig(DomainConfigBase):
                     for dynamic_range in self._dynamic_ranges
                     if dynamic_range.version == 4
                 ))
-            self.write_zone_file(
-                zi.target_path, self.make_parameters(),
-                {
-                    'mappings': {
-                        'PTR': self.get_PTR_mapping(
-                            self._mapping, zi.subnetwork),
-                    },
-                    'other_mapping': [],
-                    'generate_directives': {
-                        'PTR': generate_directives,
-                        'CNAME': self.get_rfc2317_GENERATE_directives(
-                            zi.subnetwork,
-                            self._rfc2317_ranges,
-                            self.domain),
-                    }
+            records = {
+                'mappings': {
+                    'PTR': self.get_PTR_mapping(
+                        self._mapping, zi.subnetwork),
+                },
+                'other_mapping': [],
+                'generate_directives': {
+                    'PTR': generate_directives,
+                    'CNAME': self.get_rfc2317_GENERATE_directives(
+                        zi.subnetwork,
+                        self._rfc2317_ranges,
+                        self.domain),
                 }
-            )
+            }
+            if self.write_zone_file(
+                    zi.target_path, self.make_parameters(), records):
+                written.append(zi.zone_name)
+        return written
@@ -278,6 +278,12 @@ class PowerDriver(PowerDriverBase):
     wait_time = DEFAULT_WAITING_POLICY
     queryable = True
 
+    # The (minimum, maximum) number of power queries for this driver that
+    # the power monitor runs at once. Blocking queries each tie up a thread
+    # in the reactor's thread pool, so keep these low unless `power_query`
+    # is genuinely asynchronous.
+    query_concurrency = (1, 5)
+
     def __init__(self, clock=reactor):
         self.clock = reactor
 
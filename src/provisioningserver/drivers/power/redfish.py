@@ -130,6 +130,9 @@ class RedfishPowerDriver(RedfishPowerDriverBase):
 
     chassis = True  # Redfish API endpoints can be probed and enlisted.
 
+    # Queries are non-blocking HTTP requests, so many can run at once.
+    query_concurrency = (1, 50)
+
     name = 'redfish'
     description = "Redfish"
     settings = [
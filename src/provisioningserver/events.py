@@ -11,7 +11,14 @@ __all__ = [
     'send_rack_event',
     ]
 
-from collections import namedtuple
+from collections import (
+    deque,
+    namedtuple,
+)
+from datetime import (
+    datetime,
+    timezone,
+)
 from logging import (
     DEBUG,
     ERROR,
@@ -25,6 +32,7 @@ from provisioningserver.logger import (
 )
 from provisioningserver.rpc import getRegionClient
 from provisioningserver.rpc.exceptions import (
+    NoConnectionsAvailable,
     NoSuchEventType,
     NoSuchNode,
 )
@@ -33,6 +41,7 @@ from provisioningserver.rpc.region import (
     SendEvent,
     SendEventIPAddress,
     SendEventMACAddress,
+    SendEvents,
 )
 from provisioningserver.utils.env import get_maas_id
 from provisioningserver.utils.twisted import (
@@ -40,12 +49,16 @@ from provisioningserver.utils.twisted import (
     callOut,
     DeferredValue,
     FOREVER,
+    pause,
     suppress,
 )
 from twisted.internet.defer import (
+    inlineCallbacks,
     maybeDeferred,
     succeed,
 )
+from twisted.internet.task import deferLater
+from twisted.protocols.amp import UnhandledCommand
 
 
 maaslog = get_maas_logger("events")
@@ -409,12 +422,38 @@ class NodeEventHub:
 
     This automatically ensures that the event type is registered before
     sending logs to the region.
+
+    Events logged with `logByID`, `logByMAC` and `logByIP` are sent one at a
+    time, and the caller can wait for each to be sent. Events queued with
+    `queueByID`, `queueByMAC` and `queueByIP` are sent in batches with
+    `SendEvents`. They are kept until the region has stored them, so they
+    survive the region being unavailable for a while.
     """
 
-    def __init__(self):
+    # Seconds to wait after an event is queued before sending, so that events
+    # queued close together are sent together.
+    flushDelay = 0.1
+
+    # Seconds to wait before sending again after a batch could not be sent.
+    retryDelay = 10.0
+
+    # The most events to send in one `SendEvents` call.
+    batchSize = 500
+
+    # How many times the region may reject a batch before it is split in two,
+    # or, when the batch is a single event, before that event is dropped.
+    maxRetries = 3
+
+    # The most events to keep while they cannot be sent; more are dropped.
+    queueSize = 10000
+
+    def __init__(self, clock=None):
         super(NodeEventHub, self).__init__()
         self._types_registering = dict()
         self._types_registered = set()
+        self.clock = clock
+        self._queue = deque()
+        self._flushing = None
 
     @asynchronous
     def registerEventType(self, event_type):
@@ -572,6 +611,158 @@ class NodeEventHub:
 
         return d
 
+    def _queueEvent(self, event_type, description, **node):
+        """Queue an event to be sent to the region with `SendEvents`.
+
+        :param node: One of ``system_id``, ``mac_address`` or ``ip_address``.
+        """
+        if event_type not in EVENT_DETAILS:
+            raise KeyError(event_type)
+        if len(self._queue) >= self.queueSize:
+            maaslog.warning(
+                "Too many events waiting to be sent to the region; "
+                "dropping %s event: %s", event_type, description)
+            return
+        event = dict(
+            node, type_name=event_type, description=description,
+            timestamp=datetime.now(timezone.utc))
+        self._queue.append(event)
+        if self._flushing is None:
+            clock = self.clock
+            if clock is None:
+                from twisted.internet import reactor as clock
+            self._flushing = deferLater(clock, self.flushDelay, self._flush)
+
+    @inlineCallbacks
+    def _flush(self):
+        """Send the queued events in batches until there are none left.
+
+        A batch that cannot be sent is put back at the front of the queue and
+        sent again after `retryDelay` seconds. While no region can be reached
+        this continues indefinitely. A batch the region fails `maxRetries`
+        times is split in two so that one bad event cannot hold up the queue,
+        and a single event that fails `maxRetries` times is dropped.
+        """
+        batchSize = self.batchSize
+        failures = 0
+        try:
+            while len(self._queue) != 0:
+                events = [
+                    self._queue.popleft()
+                    for _ in range(min(batchSize, len(self._queue)))
+                ]
+                try:
+                    yield self._sendEvents(events)
+                except NoConnectionsAvailable as error:
+                    self._queue.extendleft(reversed(events))
+                    log.msg(
+                        "Failed to send %d event(s) to the region; trying "
+                        "again in %d seconds: %s" % (
+                            len(events), self.retryDelay, error))
+                    yield pause(self.retryDelay, self.clock)
+                except Exception as error:
+                    failures += 1
+                    if failures < self.maxRetries:
+                        self._queue.extendleft(reversed(events))
+                        log.msg(
+                            "Failed to send %d event(s) to the region; "
+                            "trying again in %d seconds: %s" % (
+                                len(events), self.retryDelay, error))
+                        yield pause(self.retryDelay, self.clock)
+                    elif len(events) == 1:
+                        [event] = events
+                        maaslog.warning(
+                            "Failed to send %s event to the region %d times; "
+                            "dropping it: %s", event["type_name"], failures,
+                            error)
+                        batchSize = self.batchSize
+                        failures = 0
+                    else:
+                        self._queue.extendleft(reversed(events))
+                        batchSize = len(events) // 2
+                        failures = 0
+                        log.msg(
+                            "Failed to send %d event(s) to the region %d "
+                            "times; trying again in batches of %d: %s" % (
+                                len(events), self.maxRetries, batchSize,
+                                error))
+                else:
+                    failures = 0
+        finally:
+            self._flushing = None
+
+    @inlineCallbacks
+    def _sendEvents(self, events):
+        """Send `events` to the region in one call if it can take them."""
+        for event_type in {event["type_name"] for event in events}:
+            yield self.ensureEventTypeRegistered(event_type)
+        client = getRegionClient()
+        try:
+            yield client(SendEvents, events=events)
+        except UnhandledCommand:
+            # The region predates SendEvents; send the events one at a time.
+            for event in events:
+                details = dict(
+                    type_name=event["type_name"],
+                    description=event["description"])
+                if event.get("system_id") is not None:
+                    d = client(
+                        SendEvent, system_id=event["system_id"], **details)
+                elif event.get("mac_address") is not None:
+                    d = client(
+                        SendEventMACAddress,
+                        mac_address=event["mac_address"], **details)
+                else:
+                    d = client(
+                        SendEventIPAddress,
+                        ip_address=event["ip_address"], **details)
+                yield d.addErrback(suppress, NoSuchNode)
+
+    @asynchronous
+    def queueByID(self, event_type, system_id, description=""):
+        """Queue the given node event to be sent to the region in a batch.
+
+        The node is specified by its ID.
+
+        :param event_type: The type of the event.
+        :type event_type: unicode
+        :param system_id: The system ID of the node.
+        :type system_id: unicode
+        :param description: An optional description of the event.
+        :type description: unicode
+        """
+        self._queueEvent(event_type, description, system_id=system_id)
+
+    @asynchronous
+    def queueByMAC(self, event_type, mac_address, description=""):
+        """Queue the given node event to be sent to the region in a batch.
+
+        The node is specified by its MAC address.
+
+        :param event_type: The type of the event.
+        :type event_type: unicode
+        :param mac_address: The MAC address of the node.
+        :type mac_address: unicode
+        :param description: An optional description of the event.
+        :type description: unicode
+        """
+        self._queueEvent(event_type, description, mac_address=mac_address)
+
+    @asynchronous
+    def queueByIP(self, event_type, ip_address, description=""):
+        """Queue the given node event to be sent to the region in a batch.
+
+        The node is specified by its IP address.
+
+        :param event_type: The type of the event.
+        :type event_type: unicode
+        :param ip_address: The IP address of the node.
+        :type ip_address: unicode
+        :param description: An optional description of the event.
+        :type description: unicode
+        """
+        self._queueEvent(event_type, description, ip_address=ip_address)
+
 
 # Singleton.
 nodeEventHub = NodeEventHub()
@@ -610,6 +801,9 @@ def send_node_event_mac_address(event_type, mac_address, description=''):
 def send_node_event_ip_address(event_type, ip_address, description=''):
     """Send the given node event to the region for the given IP address.
 
+    This is used for every TFTP and HTTP request from a booting node, so the
+    event is queued and sent to the region in a batch with others.
+
     :param event_type: The type of the event.
     :type event_type: unicode
     :param ip_address: The IP Address of the node of the event.
@@ -617,7 +811,7 @@ def send_node_event_ip_address(event_type, ip_address, description=''):
     :param description: An optional description of the event.
     :type description: unicode
     """
-    return nodeEventHub.logByIP(event_type, ip_address, description)
+    return nodeEventHub.queueByIP(event_type, ip_address, description)
 
 
 @asynchronous
@@ -13,6 +13,10 @@ METRICS_DEFINITIONS = [
     MetricDefinition(
         'Histogram', 'rack_region_rpc_call_latency',
         'Latency of Rack-Region RPC call', ['call']),
+    MetricDefinition(
+        'Counter', 'rack_tftp_boot_config_cache_lookups',
+        'Number of lookups in the cache of TFTP boot configurations',
+        ['result']),
 ]
 
 
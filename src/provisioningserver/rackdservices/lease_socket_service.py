@@ -7,14 +7,24 @@ __all__ = [
     "LeaseSocketService",
     ]
 
-from collections import deque
+from collections import (
+    deque,
+    OrderedDict,
+)
+from itertools import islice
 import json
 import os
 
-from provisioningserver.logger import get_maas_logger
+from provisioningserver.logger import (
+    get_maas_logger,
+    LegacyLogger,
+)
 from provisioningserver.path import get_data_path
 from provisioningserver.rpc.exceptions import NoConnectionsAvailable
-from provisioningserver.rpc.region import UpdateLease
+from provisioningserver.rpc.region import (
+    UpdateLease,
+    UpdateLeases,
+)
 from provisioningserver.utils.twisted import (
     pause,
     retries,
@@ -24,11 +34,17 @@ from twisted.internet import (
     reactor,
     task,
 )
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import (
+    inlineCallbacks,
+    maybeDeferred,
+    returnValue,
+)
 from twisted.internet.protocol import DatagramProtocol
+from twisted.protocols.amp import UnhandledCommand
 
 
 maaslog = get_maas_logger("lease_socket_service")
+log = LegacyLogger()
 
 
 def get_socket_path():
@@ -36,12 +52,31 @@ def get_socket_path():
     return os.path.join(get_data_path("/var/lib/maas"), "dhcpd.sock")
 
 
+def coalesce_notifications(notifications):
+    """Return the last notification for each MAC and IP address pair.
+
+    The notifications are returned in the order in which the last one for
+    each pair was received, so applying them in order gives the same result
+    as applying all of `notifications` in order.
+    """
+    coalesced = OrderedDict()
+    for notification in notifications:
+        key = notification.get("mac"), notification.get("ip")
+        coalesced.pop(key, None)
+        coalesced[key] = notification
+    return list(coalesced.values())
+
+
 class LeaseSocketService(Service, DatagramProtocol):
     """Service for recieving lease information over MAAS dhcpd.sock."""
 
     # None, or a Deferred that will fire when the processor exits.
     done = None
 
+    # The most lease updates to send to the region in one `UpdateLeases`
+    # call. This keeps each call well inside AMP's 64kB value limit.
+    batch_size = 100
+
     def __init__(self, client_service, reactor):
         self.client_service = client_service
         self.reactor = reactor
@@ -92,28 +127,79 @@ class LeaseSocketService(Service, DatagramProtocol):
         self.notifications.append(notification)
 
     def processNotifications(self, clock=reactor):
-        """Process all notifications."""
-        def gen_notifications(notifications):
+        """Process all notifications.
+
+        Queued notifications are coalesced, keeping only the last one for
+        each MAC and IP address pair, and sent to the region in batches of
+        up to `batch_size`. Notifications are only removed from the queue
+        once their batch has been sent; if a batch fails, the failure is
+        logged and it is sent again, with anything queued after it, on the
+        next run.
+        """
+        failures = []
+
+        def gen_batches(notifications):
             while len(notifications) != 0:
-                yield notifications.popleft()
-        return task.coiterate(
-            self.processNotification(notification, clock=clock)
-            for notification in gen_notifications(self.notifications))
+                coalesced = coalesce_notifications(notifications)
+                notifications.clear()
+                notifications.extend(coalesced)
+                batch = list(islice(notifications, self.batch_size))
+                d = maybeDeferred(
+                    self.processNotificationBatch, batch, clock=clock)
+                d.addErrback(failures.append)
+                yield d
+                if len(failures) != 0:
+                    log.err(
+                        failures.pop(), "Failed to send %d DHCP lease "
+                        "update(s) to the region." % len(batch))
+                    break
+                for _ in batch:
+                    notifications.popleft()
+
+        return task.coiterate(gen_batches(self.notifications))
 
     @inlineCallbacks
-    def processNotification(self, notification, clock=reactor):
-        """Send a notification to the region."""
-        client = None
+    def getClient(self, clock=reactor):
+        """Return a client to the region, or `None` if none is available."""
         for elapsed, remaining, wait in retries(30, 10, clock):
             try:
                 client = yield self.client_service.getClientNow()
-                break
             except NoConnectionsAvailable:
-                yield pause(wait, self.clock)
-        else:
-            maaslog.error(
-                "Can't send DHCP lease information, no RPC "
-                "connection to region.")
+                yield pause(wait, clock)
+            else:
+                returnValue(client)
+        maaslog.error(
+            "Can't send DHCP lease information, no RPC "
+            "connection to region.")
+        returnValue(None)
+
+    @inlineCallbacks
+    def processNotificationBatch(self, notifications, clock=reactor):
+        """Send a batch of notifications to the region.
+
+        Falls back to sending them one at a time when the region does not
+        support `UpdateLeases`.
+        """
+        client = yield self.getClient(clock)
+        if client is None:
+            return
+
+        try:
+            yield client(
+                UpdateLeases, cluster_uuid=client.localIdent,
+                updates=notifications)
+        except UnhandledCommand:
+            # The region is older and cannot handle batches.
+            for notification in notifications:
+                yield client(
+                    UpdateLease, cluster_uuid=client.localIdent,
+                    **notification)
+
+    @inlineCallbacks
+    def processNotification(self, notification, clock=reactor):
+        """Send a notification to the region."""
+        client = yield self.getClient(clock)
+        if client is None:
             return
 
         # Notification contains all the required data except for the cluster
@@ -22,7 +22,10 @@ from provisioningserver.rpc.exceptions import (
 from provisioningserver.rpc.power import query_all_nodes
 from provisioningserver.rpc.region import ListNodePowerParameters
 from twisted.application.internet import TimerService
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import (
+    DeferredList,
+    inlineCallbacks,
+)
 from twisted.internet.error import ConnectionDone
 
 
@@ -34,7 +37,10 @@ class NodePowerMonitorService(TimerService, object):
     """Service to monitor the power status of all nodes in this cluster."""
 
     check_interval = timedelta(seconds=15).total_seconds()
-    max_nodes_at_once = 5
+
+    # Spread the start of the power queries in each batch over this many
+    # seconds, so that BMCs are not all queried in lockstep.
+    query_jitter = timedelta(seconds=5).total_seconds()
 
     def __init__(self, clock=None):
         # Call self.query_nodes() every self.check_interval.
@@ -61,17 +67,21 @@ class NodePowerMonitorService(TimerService, object):
     @inlineCallbacks
     def query_nodes(self, client):
         # Get the nodes' power parameters from the region. Keep getting more
-        # power parameters until the region returns an empty list.
+        # power parameters until the region returns an empty list. Each batch
+        # is queried as soon as it arrives rather than after the previous
+        # batch has finished; `query_all_nodes` bounds the concurrency.
+        queries = []
         while True:
             response = yield client(
                 ListNodePowerParameters, uuid=client.localIdent)
             power_parameters = response['nodes']
             if len(power_parameters) > 0:
-                yield query_all_nodes(
-                    power_parameters, max_concurrency=self.max_nodes_at_once,
-                    clock=self.clock)
+                queries.append(query_all_nodes(
+                    power_parameters, clock=self.clock,
+                    jitter=self.query_jitter))
             else:
                 break
+        yield DeferredList(queries)
 
     def query_nodes_failed(self, failure, localIdent):
         if failure.check(NoSuchCluster):
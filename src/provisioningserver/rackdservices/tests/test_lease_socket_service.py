@@ -10,22 +10,30 @@ import os
 import socket
 import time
 from unittest.mock import (
+    call,
     MagicMock,
     sentinel,
 )
 
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+)
 from maastesting.testcase import (
     MAASTestCase,
     MAASTwistedRunTest,
 )
+from maastesting.twisted import TwistedLoggerFixture
 from provisioningserver.rackdservices import lease_socket_service
 from provisioningserver.rackdservices.lease_socket_service import (
     LeaseSocketService,
 )
 from provisioningserver.rpc import getRegionClient
-from provisioningserver.rpc.region import UpdateLease
+from provisioningserver.rpc.region import (
+    UpdateLease,
+    UpdateLeases,
+)
 from provisioningserver.rpc.testing import MockLiveClusterToRegionRPCFixture
 from provisioningserver.utils.twisted import (
     DeferredValue,
@@ -41,8 +49,10 @@ from twisted.internet import (
     defer,
     reactor,
 )
+from twisted.internet.error import ConnectionLost
 from twisted.internet.protocol import DatagramProtocol
 from twisted.internet.threads import deferToThread
+from twisted.protocols.amp import UnhandledCommand
 
 
 class TestLeaseSocketService(MAASTestCase):
@@ -127,74 +137,170 @@ class TestLeaseSocketService(MAASTestCase):
         # Should have one notitication.
         self.assertEquals([packet], list(service.notifications))
 
+    def make_notification(self, **kwargs):
+        notification = {
+            "action": "commit",
+            "mac": factory.make_mac_address(),
+            "ip_family": "ipv4",
+            "ip": factory.make_ipv4_address(),
+            "timestamp": int(time.time()),
+            "lease_time": 30,
+            "hostname": factory.make_name("host"),
+        }
+        notification.update(kwargs)
+        return notification
+
     @defer.inlineCallbacks
-    def test_processNotification_gets_called_with_notification(self):
+    def test_processNotificationBatch_gets_called_with_notification(self):
         socket_path = self.patch_socket_path()
         service = LeaseSocketService(
             sentinel.service, reactor)
         dv = DeferredValue()
 
-        # Mock processNotifcation to catch the call.
-        def mock_processNotification(*args, **kwargs):
+        # Mock processNotificationBatch to catch the call.
+        def mock_processNotificationBatch(*args, **kwargs):
             dv.set(args)
-        self.patch(service, "processNotification", mock_processNotification)
+        self.patch(
+            service, "processNotificationBatch",
+            mock_processNotificationBatch)
 
         # Start the service and stop it at the end of the test.
         service.startService()
         self.addCleanup(service.stopService)
 
         # Create test payload to send.
-        packet = {
-            "test": factory.make_name("test")
-        }
+        packet = self.make_notification()
 
         # Send notification to the socket and wait for notification.
         yield deferToThread(self.send_notification, socket_path, packet)
         yield dv.get(timeout=10)
 
-        # Packet should be the argument passed to processNotifcation
-        self.assertEquals((packet,), dv.value)
+        # Packet should be the argument passed to processNotificationBatch.
+        self.assertEquals(([packet],), dv.value)
 
     @defer.inlineCallbacks
-    def test_processNotification_gets_called_multiple_times(self):
+    def test_processNotificationBatch_gets_all_notifications_in_order(self):
         socket_path = self.patch_socket_path()
         service = LeaseSocketService(
             sentinel.service, reactor)
-        dvs = [
-            DeferredValue(),
-            DeferredValue(),
-        ]
-
-        # Mock processNotifcation to catch the call.
-        def mock_processNotification(*args, **kwargs):
-            for dv in dvs:
-                if not dv.isSet:
-                    dv.set(args)
-                    break
-        self.patch(service, "processNotification", mock_processNotification)
+        received = []
+        dv = DeferredValue()
+
+        # Mock processNotificationBatch to catch the calls.
+        def mock_processNotificationBatch(notifications, **kwargs):
+            received.extend(notifications)
+            if len(received) >= 2:
+                dv.set(None)
+        self.patch(
+            service, "processNotificationBatch",
+            mock_processNotificationBatch)
 
         # Start the service and stop it at the end of the test.
         service.startService()
         self.addCleanup(service.stopService)
 
         # Create test payload to send.
-        packet1 = {
-            "test1": factory.make_name("test1")
-        }
-        packet2 = {
-            "test2": factory.make_name("test2")
-        }
+        packet1 = self.make_notification()
+        packet2 = self.make_notification()
 
         # Send notifications to the socket and wait for notifications.
         yield deferToThread(self.send_notification, socket_path, packet1)
         yield deferToThread(self.send_notification, socket_path, packet2)
-        yield dvs[0].get(timeout=10)
-        yield dvs[1].get(timeout=10)
+        yield dv.get(timeout=10)
+
+        # Packets should be passed to processNotificationBatch in order.
+        self.assertEquals([packet1, packet2], received)
+
+    @defer.inlineCallbacks
+    def test_processNotifications_sends_coalesced_batches(self):
+        service = LeaseSocketService(
+            sentinel.service, reactor)
+        service.batch_size = 2
+        batches = []
+        self.patch(
+            service, "processNotificationBatch",
+            lambda notifications, **kwargs: batches.append(notifications))
+        packets = [self.make_notification() for _ in range(3)]
+        # Superseded by the last packet.
+        service.notifications.append(self.make_notification(
+            mac=packets[2]["mac"], ip=packets[2]["ip"], action="expiry"))
+        service.notifications.extend(packets)
+
+        yield service.processNotifications(clock=reactor)
+        self.assertEquals([packets[:2], packets[2:]], batches)
+
+    @defer.inlineCallbacks
+    def test_processNotifications_keeps_batches_that_fail(self):
+        service = LeaseSocketService(
+            sentinel.service, reactor)
+        service.batch_size = 2
+        batches = []
+
+        def processNotificationBatch(notifications, **kwargs):
+            batches.append(notifications)
+            if len(batches) == 2:
+                return defer.fail(ConnectionLost())
+            else:
+                return defer.succeed(None)
+
+        self.patch(
+            service, "processNotificationBatch", processNotificationBatch)
+        packets = [self.make_notification() for _ in range(5)]
+        service.notifications.extend(packets)
+
+        with TwistedLoggerFixture() as logger:
+            yield service.processNotifications(clock=reactor)
+        self.assertEquals([packets[:2], packets[2:4]], batches)
+        self.assertEquals(packets[2:], list(service.notifications))
+        self.assertIn(
+            "Failed to send 2 DHCP lease update(s) to the region.",
+            logger.output)
+
+        # The batch that failed is sent again on the next run.
+        yield service.processNotifications(clock=reactor)
+        self.assertEquals(
+            [packets[:2], packets[2:4], packets[2:4], packets[4:]], batches)
+        self.assertEquals([], list(service.notifications))
+
+    @defer.inlineCallbacks
+    def test_processNotificationBatch_sends_UpdateLeases(self):
+        client = MagicMock(localIdent=factory.make_name("uuid"))
+        client.return_value = defer.succeed({})
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(rpc_service, reactor)
+        packets = [self.make_notification() for _ in range(2)]
 
-        # Packet should be the argument passed to processNotification in
-        # order.
-        self.assertEquals((packet1,), dvs[0].value)
-        self.assertEquals((packet2,), dvs[1].value)
+        yield service.processNotificationBatch(packets, clock=reactor)
+        self.assertThat(
+            client, MockCalledOnceWith(
+                UpdateLeases, cluster_uuid=client.localIdent,
+                updates=packets))
+
+    @defer.inlineCallbacks
+    def test_processNotificationBatch_falls_back_to_UpdateLease(self):
+        def call_region(command, **kwargs):
+            if command is UpdateLeases:
+                return defer.fail(UnhandledCommand())
+            else:
+                return defer.succeed({})
+
+        client = MagicMock(localIdent=factory.make_name("uuid"))
+        client.side_effect = call_region
+        rpc_service = MagicMock()
+        rpc_service.getClientNow.return_value = defer.succeed(client)
+        service = LeaseSocketService(rpc_service, reactor)
+        packets = [self.make_notification() for _ in range(2)]
+
+        yield service.processNotificationBatch(packets, clock=reactor)
+        self.assertThat(
+            client, MockCallsMatch(
+                call(
+                    UpdateLeases, cluster_uuid=client.localIdent,
+                    updates=packets),
+                *(call(
+                    UpdateLease, cluster_uuid=client.localIdent, **packet)
+                  for packet in packets)))
 
     @defer.inlineCallbacks
     def test_processNotification_send_to_region(self):
@@ -230,3 +336,16 @@ class TestLeaseSocketService(MAASTestCase):
                 timestamp=packet["timestamp"],
                 lease_time=packet["lease_time"],
                 hostname=packet["hostname"]))
+
+
+class TestCoalesceNotifications(MAASTestCase):
+
+    def test_keeps_last_notification_per_mac_and_ip(self):
+        mac = factory.make_mac_address()
+        ip = factory.make_ipv4_address()
+        first = {"mac": mac, "ip": ip, "action": "commit"}
+        other = {"mac": mac, "ip": factory.make_ipv4_address()}
+        last = {"mac": mac, "ip": ip, "action": "expiry"}
+        self.assertEqual(
+            [other, last],
+            lease_socket_service.coalesce_notifications([first, other, last]))
@@ -8,13 +8,17 @@ __all__ = []
 
 from unittest.mock import (
     ANY,
+    call,
     Mock,
     sentinel,
 )
 
 from fixtures import FakeLogger
 from maastesting.factory import factory
-from maastesting.matchers import MockCalledOnceWith
+from maastesting.matchers import (
+    MockCalledOnceWith,
+    MockCallsMatch,
+)
 from maastesting.testcase import (
     MAASTestCase,
     MAASTwistedRunTest,
@@ -34,6 +38,7 @@ from provisioningserver.rpc import (
 from provisioningserver.rpc.testing import MockClusterToRegionRPCFixture
 from testtools.matchers import MatchesStructure
 from twisted.internet.defer import (
+    Deferred,
     fail,
     succeed,
 )
@@ -75,7 +80,7 @@ class TestNodePowerMonitorService(MAASTestCase):
 
     def test_query_nodes_calls_query_all_nodes(self):
         service = self.make_monitor_service()
-        service.max_nodes_at_once = sentinel.max_nodes_at_once
+        service.query_jitter = sentinel.query_jitter
 
         example_power_parameters = {
             "system_id": factory.make_UUID(),
@@ -94,6 +99,7 @@ class TestNodePowerMonitorService(MAASTestCase):
         ]
 
         query_all_nodes = self.patch(npms, "query_all_nodes")
+        query_all_nodes.return_value = succeed(None)
 
         d = service.query_nodes(getRegionClient())
         io.flush()
@@ -103,8 +109,46 @@ class TestNodePowerMonitorService(MAASTestCase):
             query_all_nodes,
             MockCalledOnceWith(
                 [example_power_parameters],
-                max_concurrency=sentinel.max_nodes_at_once,
-                clock=service.clock))
+                clock=service.clock, jitter=sentinel.query_jitter))
+
+    def test_query_nodes_does_not_wait_for_batch_before_next(self):
+        service = self.make_monitor_service()
+
+        rpc_fixture = self.useFixture(MockClusterToRegionRPCFixture())
+        proto_region, io = rpc_fixture.makeEventLoop(
+            region.ListNodePowerParameters)
+        node1, node2 = [
+            {
+                "system_id": factory.make_UUID(),
+                "hostname": factory.make_hostname(),
+                "power_state": factory.make_name("power_state"),
+                "power_type": factory.make_name("power_type"),
+                "context": {},
+            }
+            for _ in range(2)
+        ]
+        proto_region.ListNodePowerParameters.side_effect = [
+            succeed({"nodes": [node1]}),
+            succeed({"nodes": [node2]}),
+            succeed({"nodes": []}),
+        ]
+
+        queries = [Deferred(), Deferred()]
+        query_all_nodes = self.patch(npms, "query_all_nodes")
+        query_all_nodes.side_effect = queries
+
+        d = service.query_nodes(getRegionClient())
+        io.flush()
+
+        # Both batches are being queried, and query_nodes waits for them.
+        self.assertThat(
+            query_all_nodes, MockCallsMatch(
+                call([node1], clock=ANY, jitter=ANY),
+                call([node2], clock=ANY, jitter=ANY)))
+        self.assertFalse(d.called)
+        for query in queries:
+            query.callback(None)
+        self.assertEqual(None, extract_result(d))
 
     def test_query_nodes_copes_with_NoSuchCluster(self):
         service = self.make_monitor_service()
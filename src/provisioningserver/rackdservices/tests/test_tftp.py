@@ -16,6 +16,7 @@ from socket import (
 )
 from unittest.mock import (
     ANY,
+    call,
     Mock,
     sentinel,
 )
@@ -23,13 +24,17 @@ from unittest.mock import (
 from maastesting.factory import factory
 from maastesting.matchers import (
     MockCalledOnceWith,
+    MockCallsMatch,
     MockNotCalled,
 )
 from maastesting.testcase import (
     MAASTestCase,
     MAASTwistedRunTest,
 )
-from maastesting.twisted import TwistedLoggerFixture
+from maastesting.twisted import (
+    extract_result,
+    TwistedLoggerFixture,
+)
 from netaddr import IPNetwork
 from netaddr.ip import (
     IPV4_LINK_LOCAL,
@@ -41,6 +46,7 @@ from provisioningserver.boot.tests.test_pxe import compose_config_path
 from provisioningserver.events import EVENT_TYPES
 from provisioningserver.rackdservices import tftp as tftp_module
 from provisioningserver.rackdservices.tftp import (
+    BootConfigCache,
     get_boot_image,
     log_request,
     Port,
@@ -425,7 +431,8 @@ class TestTFTPBackend(MAASTestCase):
         reader = yield backend.get_boot_method_reader(method, params_with_ip)
         self.addCleanup(reader.finish)
 
-        # Get the reader twice.
+        # Get the reader twice, without the configuration cached.
+        backend.boot_configs.clear()
         params_with_ip = dict(fake_params)
         params_with_ip['remote_ip'] = remote_ip
         reader = yield backend.get_boot_method_reader(method, params_with_ip)
@@ -576,7 +583,8 @@ class TestTFTPBackend(MAASTestCase):
         # The first client is now saved.
         self.assertEquals(clients[0], backend.client_to_remote[remote_ip])
 
-        # Get the reader twice.
+        # Get the reader twice, without the configuration cached.
+        backend.boot_configs.clear()
         params_with_ip = dict(fake_params)
         params_with_ip['remote_ip'] = remote_ip
         reader = yield backend.get_boot_method_reader(method, params_with_ip)
@@ -847,6 +855,102 @@ class TestTFTPBackend(MAASTestCase):
             backend.fetcher, MockCalledOnceWith(
                 client, GetBootConfig, **params_okay))
 
+    def test_get_kernel_params_caches_boot_config(self):
+        fake_params = make_kernel_parameters(purpose="local")._asdict()
+        del fake_params["label"]
+        client = Mock()
+        client.localIdent = factory.make_name("system_id")
+        client.return_value = succeed(fake_params)
+        client_service = Mock()
+        client_service.getClientNow.return_value = succeed(client)
+        backend = TFTPBackend(self.make_dir(), client_service)
+        params = {
+            "mac": factory.make_mac_address("-"),
+            "local_ip": factory.make_ipv4_address(),
+            "remote_ip": factory.make_ipv4_address(),
+        }
+
+        first = extract_result(backend.get_kernel_params(dict(params)))
+        second = extract_result(backend.get_kernel_params(dict(params)))
+
+        self.assertIs(first, second)
+        self.assertThat(client, MockCalledOnceWith(
+            GetBootConfig, system_id=client.localIdent, **params))
+
+    def test_get_kernel_params_fetches_for_other_params(self):
+        fake_params = make_kernel_parameters(purpose="local")._asdict()
+        del fake_params["label"]
+        client = Mock()
+        client.localIdent = factory.make_name("system_id")
+        client.side_effect = lambda *args, **kwargs: succeed(
+            dict(fake_params))
+        client_service = Mock()
+        client_service.getClientNow.return_value = succeed(client)
+        backend = TFTPBackend(self.make_dir(), client_service)
+        params = {
+            "local_ip": factory.make_ipv4_address(),
+            "remote_ip": factory.make_ipv4_address(),
+        }
+
+        backend.get_kernel_params(
+            dict(params, mac=factory.make_mac_address("-")))
+        backend.get_kernel_params(
+            dict(params, mac=factory.make_mac_address("-")))
+
+        self.assertEqual(2, client.call_count)
+
+
+class TestBootConfigCache(MAASTestCase):
+    """Tests for `BootConfigCache`."""
+
+    def test_get_returns_None_when_not_cached(self):
+        cache = BootConfigCache(clock=Clock())
+        self.assertIsNone(cache.get(factory.make_name("key")))
+
+    def test_get_returns_cached_value(self):
+        cache = BootConfigCache(clock=Clock())
+        cache.set("key", sentinel.value)
+        self.assertIs(sentinel.value, cache.get("key"))
+
+    def test_get_returns_None_when_expired(self):
+        clock = Clock()
+        cache = BootConfigCache(ttl=10, clock=clock)
+        cache.set("key", sentinel.value)
+        clock.advance(9)
+        self.assertIs(sentinel.value, cache.get("key"))
+        clock.advance(1)
+        self.assertIsNone(cache.get("key"))
+
+    def test_set_discards_least_recently_used(self):
+        cache = BootConfigCache(size=2, clock=Clock())
+        cache.set("one", sentinel.one)
+        cache.set("two", sentinel.two)
+        cache.get("one")
+        cache.set("three", sentinel.three)
+        self.assertIs(sentinel.one, cache.get("one"))
+        self.assertIsNone(cache.get("two"))
+        self.assertIs(sentinel.three, cache.get("three"))
+
+    def test_clear_forgets_everything(self):
+        cache = BootConfigCache(clock=Clock())
+        cache.set("key", sentinel.value)
+        cache.clear()
+        self.assertIsNone(cache.get("key"))
+
+    def test_get_counts_hits_and_misses(self):
+        update = self.patch(tftp_module.PROMETHEUS_METRICS, "update")
+        cache = BootConfigCache(clock=Clock())
+        cache.get("key")
+        cache.set("key", sentinel.value)
+        cache.get("key")
+        self.assertThat(update, MockCallsMatch(
+            call(
+                'rack_tftp_boot_config_cache_lookups', 'inc',
+                labels={'result': 'miss'}),
+            call(
+                'rack_tftp_boot_config_cache_lookups', 'inc',
+                labels={'result': 'hit'})))
+
 
 class TestTFTPService(MAASTestCase):
 
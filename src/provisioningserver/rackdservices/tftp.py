@@ -8,6 +8,7 @@ __all__ = [
     "TFTPService",
     ]
 
+from collections import OrderedDict
 from functools import partial
 from socket import (
     AF_INET,
@@ -27,6 +28,7 @@ from provisioningserver.logger import (
     get_maas_logger,
     LegacyLogger,
 )
+from provisioningserver.prometheus.metrics import PROMETHEUS_METRICS
 from provisioningserver.rpc.boot_images import list_boot_images
 from provisioningserver.rpc.exceptions import BootConfigNoResponse
 from provisioningserver.rpc.region import (
@@ -133,6 +135,50 @@ def log_request(file_name, clock=reactor):
     d.addErrback(log.err, "Logging TFTP request failed.")
 
 
+class BootConfigCache:
+    """Boot configurations recently obtained from the region.
+
+    Firmware often asks for the same configuration several times in quick
+    succession, for example when retrying, so each configuration is kept
+    for `ttl` seconds. At most `size` configurations are kept; the least
+    recently used are discarded first.
+    """
+
+    def __init__(self, ttl=10, size=1024, clock=reactor):
+        self.ttl = ttl
+        self.size = size
+        self.clock = clock
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Return the configuration cached for `key`, or `None`."""
+        try:
+            expires, value = self._entries[key]
+        except KeyError:
+            value = None
+        else:
+            if expires > self.clock.seconds():
+                self._entries.move_to_end(key)
+            else:
+                del self._entries[key]
+                value = None
+        PROMETHEUS_METRICS.update(
+            'rack_tftp_boot_config_cache_lookups', 'inc',
+            labels={'result': 'miss' if value is None else 'hit'})
+        return value
+
+    def set(self, key, value):
+        """Cache the configuration `value` for `key`."""
+        self._entries[key] = (self.clock.seconds() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """Forget all cached configurations."""
+        self._entries.clear()
+
+
 class TFTPBackend(FilesystemSynchronousBackend):
     """A partially dynamic read-only TFTP server.
 
@@ -166,6 +212,7 @@ class TFTPBackend(FilesystemSynchronousBackend):
         self.client_to_remote = {}
         self.client_service = client_service
         self.fetcher = RPCFetcher()
+        self.boot_configs = BootConfigCache()
 
     def _get_new_client_for_remote(self, remote_ip):
         """Return a new client for the `remote_ip`.
@@ -289,12 +336,21 @@ class TFTPBackend(FilesystemSynchronousBackend):
             name: params[name] for name in arguments
             if name in params
         }
+        key = tuple(sorted(params.items()))
+        kernel_params = self.boot_configs.get(key)
+        if kernel_params is not None:
+            return kernel_params
+
+        def cache(kernel_params):
+            self.boot_configs.set(key, kernel_params)
+            return kernel_params
 
         def fetch(client, params):
             params["system_id"] = client.localIdent
             d = self.fetcher(client, GetBootConfig, **params)
             d.addCallback(self.get_boot_image, client, params['remote_ip'])
             d.addCallback(lambda data: KernelParameters(**data))
+            d.addCallback(cache)
             return d
 
         d = self.get_client_for(params)
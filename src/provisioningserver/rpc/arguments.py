@@ -6,6 +6,7 @@
 __all__ = [
     "Bytes",
     "Choice",
+    "Chunked",
     "IPAddress",
     "IPNetwork",
     "ParsedURL",
@@ -13,6 +14,7 @@ __all__ = [
 ]
 
 import collections
+from itertools import count
 import json
 import urllib.parse
 import zlib
@@ -167,6 +169,53 @@ class CompressedAmpList(AmpList):
         return fromStringProto(zlib.decompress(inString), proto)
 
 
+class Chunked(amp.Argument):
+    """Send another argument in chunks, so it can exceed AMP's value limit.
+
+    AMP values must not exceed
+    :py:data:`~twisted.protocols.amp.MAX_VALUE_LENGTH`, or ``0xffff`` bytes.
+    The serialised form of the wrapped argument is split into chunks of that
+    size: the first is sent under the argument's own name, the rest as
+    ``name.2``, ``name.3``, and so on. A value that fits in one chunk is
+    sent exactly as the wrapped argument would send it, so this can wrap an
+    existing argument without changing the protocol for small values.
+    """
+
+    def __init__(self, argument):
+        """Create a Chunked argument.
+
+        :param argument: The :py:class:`amp.Argument` to send in chunks. Its
+            ``optional`` flag is honoured.
+        """
+        super(Chunked, self).__init__(argument.optional)
+        self.argument = argument
+
+    def toBox(self, name, strings, objects, proto):
+        self.argument.toBox(name, strings, objects, proto)
+        value = strings.get(name)
+        if value is not None and len(value) > amp.MAX_VALUE_LENGTH:
+            chunks = range(0, len(value), amp.MAX_VALUE_LENGTH)
+            for number, start in enumerate(chunks, 1):
+                chunk = value[start:start + amp.MAX_VALUE_LENGTH]
+                if number == 1:
+                    strings[name] = chunk
+                else:
+                    strings[b"%s.%d" % (name, number)] = chunk
+
+    def fromBox(self, name, strings, objects, proto):
+        value = strings.get(name)
+        if value is not None:
+            chunks = [value]
+            for number in count(2):
+                chunk = strings.pop(b"%s.%d" % (name, number), None)
+                if chunk is None:
+                    break
+                else:
+                    chunks.append(chunk)
+            strings[name] = b"".join(chunks)
+        self.argument.fromBox(name, strings, objects, proto)
+
+
 class IPAddress(amp.Argument):
     """Encode a `netaddr.IPAddress` object on the wire."""
 
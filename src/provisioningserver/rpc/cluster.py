@@ -42,6 +42,7 @@ from provisioningserver.rpc.arguments import (
     AmpList,
     AmpRequestedMachine,
     Bytes,
+    Chunked,
     CompressedAmpList,
     IPAddress,
     IPNetwork,
@@ -79,15 +80,16 @@ class ListBootImages(amp.Command):
 class ListBootImagesV2(amp.Command):
     """List the boot images available on this rack controller.
 
-    This command compresses the images list to allow more images in the
-    response and to remove the amp.TooLong error.
+    This command compresses the images list, and sends it in chunks when
+    needed, to allow more images in the response and to remove the
+    amp.TooLong error.
 
     :since: 1.7.6
     """
 
     arguments = []
     response = [
-        (b"images", CompressedAmpList(
+        (b"images", Chunked(CompressedAmpList(
             [(b"osystem", amp.Unicode()),
              (b"architecture", amp.Unicode()),
              (b"subarchitecture", amp.Unicode()),
@@ -95,7 +97,7 @@ class ListBootImagesV2(amp.Command):
              (b"label", amp.Unicode()),
              (b"purpose", amp.Unicode()),
              (b"xinstall_type", amp.Unicode()),
-             (b"xinstall_path", amp.Unicode())]))
+             (b"xinstall_path", amp.Unicode())])))
     ]
     errors = []
 
@@ -392,7 +394,7 @@ class _ConfigureDHCP_V2(amp.Command):
             (b"address", amp.Unicode()),
             (b"peer_address", amp.Unicode()),
             ])),
-        (b"shared_networks", CompressedAmpList([
+        (b"shared_networks", Chunked(CompressedAmpList([
             (b"name", amp.Unicode()),
             (b"subnets", AmpList([
                 (b"subnet", amp.Unicode()),
@@ -416,8 +418,8 @@ class _ConfigureDHCP_V2(amp.Command):
                     ], optional=True)),
                 ])),
             (b"mtu", amp.Integer(optional=True)),
-        ])),
-        (b"hosts", CompressedAmpList([
+        ]))),
+        (b"hosts", Chunked(CompressedAmpList([
             (b"host", amp.Unicode()),
             (b"mac", amp.Unicode()),
             (b"ip", amp.Unicode()),
@@ -426,7 +428,7 @@ class _ConfigureDHCP_V2(amp.Command):
                 (b"description", amp.Unicode(optional=True)),
                 (b"value", amp.Unicode()),
                 ], optional=True)),
-            ])),
+            ]))),
         (b"interfaces", AmpList([
             (b"name", amp.Unicode()),
             ])),
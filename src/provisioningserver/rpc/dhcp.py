@@ -23,6 +23,10 @@ from provisioningserver.dhcp import (
     DHCPv6Server,
 )
 from provisioningserver.dhcp.config import get_config
+from provisioningserver.dhcp.omapi import (
+    OmapiClient,
+    OmapiError,
+)
 from provisioningserver.dhcp.omshell import Omshell
 from provisioningserver.logger import (
     get_maas_logger,
@@ -66,6 +70,9 @@ log = LegacyLogger()
 # Holds the current state of DHCPv4 and DHCPv6.
 _current_server_state = {}
 
+# Holds the open OMAPI connections to DHCPv4 and DHCPv6.
+_omapi_clients = {}
+
 
 DHCPStateBase = namedtuple("DHCPStateBase", [
     "omapi_key",
@@ -231,9 +238,92 @@ def _modify_host_map(omshell, mac, ip_address):
         raise CannotModifyHostMap(err)
 
 
+def _check_host_map_failures(failures, hosts, exception, message):
+    """Log and raise `exception` for the first of `hosts` in `failures`.
+
+    :param failures: A ``{mac: error}`` dict, as returned by `OmapiClient`.
+    :param message: A format string for the host's "mac", "ip" and "error".
+    """
+    for host in hosts:
+        error = failures.get(host["mac"])
+        if error is not None:
+            err = message % dict(host, error=error)
+            maaslog.error(err)
+            raise exception(err)
+
+
+def _get_omapi_client(server):
+    """Return a connected `OmapiClient` for `server`.
+
+    Connections are kept open between calls.
+
+    :raise OmapiError: If the DHCP server cannot be reached over OMAPI.
+    """
+    client = _omapi_clients.get(server.dhcp_service)
+    if client is None or client.shared_key != server.omapi_key:
+        if client is not None:
+            client.close()
+        client = _omapi_clients[server.dhcp_service] = OmapiClient(
+            server_address='127.0.0.1', shared_key=server.omapi_key,
+            ipv6=server.ipv6)
+    if not client.connected:
+        client.connect()
+    return client
+
+
+def _update_hosts_with_omapi(client, remove, add, modify):
+    """Update the hosts using a connected `OmapiClient`."""
+    _check_host_map_failures(
+        client.remove([host["mac"] for host in remove]), remove,
+        CannotRemoveHostMap, "Could not remove host map for %(mac)s: "
+        "%(error)s")
+    _check_host_map_failures(
+        client.create([(host["mac"], host["ip"]) for host in add]), add,
+        CannotCreateHostMap, "Could not create host map for %(mac)s -> "
+        "%(ip)s: %(error)s")
+    _check_host_map_failures(
+        client.modify([(host["mac"], host["ip"]) for host in modify]),
+        modify, CannotModifyHostMap, "Could not modify host map for "
+        "%(mac)s -> %(ip)s: %(error)s")
+
+
 @synchronous
 def _update_hosts(server, remove, add, modify):
-    """Update the hosts using the OMAPI."""
+    """Update the hosts using the OMAPI.
+
+    Changes are pipelined over a persistent OMAPI connection, falling back
+    to `omshell` if the DHCP server cannot be reached that way.
+    """
+    try:
+        client = _get_omapi_client(server)
+    except OmapiError as error:
+        log.debug(
+            "Updating host maps with omshell; could not connect to the "
+            "OMAPI of {name} service: {error}",
+            name=server.descriptive_name, error=error)
+        _update_hosts_with_omshell(server, remove, add, modify)
+        return
+    try:
+        _update_hosts_with_omapi(client, remove, add, modify)
+    except OmapiError:
+        # The connection may have been closed by a restart of the DHCP
+        # server since it was last used. Creating, modifying, and removing
+        # host maps can all be repeated, so try once more with a new
+        # connection, and then with omshell.
+        try:
+            client = _get_omapi_client(server)
+            _update_hosts_with_omapi(client, remove, add, modify)
+        except OmapiError as error:
+            log.debug(
+                "Updating host maps with omshell; could not update them "
+                "over the OMAPI of {name} service: {error}",
+                name=server.descriptive_name, error=error)
+            _update_hosts_with_omshell(server, remove, add, modify)
+
+
+@synchronous
+def _update_hosts_with_omshell(server, remove, add, modify):
+    """Update the hosts using `omshell`, one process per host."""
     omshell = Omshell(
         server_address='127.0.0.1', shared_key=server.omapi_key,
         ipv6=server.ipv6)
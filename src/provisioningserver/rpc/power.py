@@ -9,8 +9,10 @@ __all__ = [
     "maybe_change_power_state",
 ]
 
+from collections import deque
 from datetime import timedelta
 from functools import partial
+import random
 import sys
 
 from provisioningserver.drivers.power import (
@@ -45,13 +47,15 @@ from provisioningserver.utils.twisted import (
 from twisted.internet import reactor
 from twisted.internet.defer import (
     CancelledError,
+    Deferred,
     DeferredList,
-    DeferredSemaphore,
     inlineCallbacks,
+    maybeDeferred,
     returnValue,
     succeed,
 )
 from twisted.internet.task import deferLater
+from twisted.python.failure import Failure
 
 
 maaslog = get_maas_logger("power")
@@ -431,10 +435,13 @@ def maaslog_report_failure(node, failure):
         # log.err(failure, "Failed to refresh power state.")
 
 
-def query_node(node, clock):
+def query_node(node, clock, pool=None):
     """Calls `get_power_state` on the given node.
 
     Logs to maaslog as errors and power states change.
+
+    :param pool: An optional `PowerQueryPool` that limits how many queries
+        to the node's power driver run at once.
     """
     if node['system_id'] in power_action_registry:
         log.debug(
@@ -443,9 +450,13 @@ def query_node(node, clock):
             hostname=node['hostname'])
         return succeed(None)
     else:
-        d = get_power_state(
+        args = (
             node['system_id'], node['hostname'], node['power_type'],
-            node['context'], clock=clock)
+            node['context'])
+        if pool is None:
+            d = get_power_state(*args, clock=clock)
+        else:
+            d = pool.run(get_power_state, *args, clock=clock)
         d = report_power_state(d, node['system_id'], node['hostname'])
         d.addCallbacks(
             partial(maaslog_report_success, node),
@@ -453,16 +464,102 @@ def query_node(node, clock):
         return d
 
 
-def query_all_nodes(nodes, max_concurrency=5, clock=reactor):
+class PowerQueryPool:
+    """Limits the number of concurrent power queries for one power driver.
+
+    The limit adapts between `minimum` and `maximum`: it grows by one for
+    each query that succeeds within `target_latency` seconds, and halves for
+    each query that fails or takes longer than that. Responsive BMCs are
+    queried with as much concurrency as the driver allows, while slow or
+    failing ones are not piled onto.
+    """
+
+    # A query taking longer than this, in seconds, is a sign of overload.
+    target_latency = 10.0
+
+    def __init__(self, minimum, maximum, clock=reactor):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = maximum
+        self.running = 0
+        self.waiting = deque()
+        self.clock = clock
+
+    def run(self, f, *args, **kwargs):
+        """Call `f` once this pool has room for it.
+
+        :return: A `Deferred` firing with the result of `f`.
+        """
+        if self.running < self.limit:
+            self.running += 1
+            d = succeed(None)
+        else:
+            d = Deferred()
+            self.waiting.append(d)
+        return d.addCallback(lambda _: self._call(f, args, kwargs))
+
+    def _call(self, f, args, kwargs):
+        started = self.clock.seconds()
+        d = maybeDeferred(f, *args, **kwargs)
+        return d.addBoth(self._release, started)
+
+    def _release(self, result, started):
+        latency = self.clock.seconds() - started
+        if isinstance(result, Failure) or latency > self.target_latency:
+            self.limit = max(self.minimum, self.limit // 2)
+        else:
+            self.limit = min(self.maximum, self.limit + 1)
+        self.running -= 1
+        while len(self.waiting) > 0 and self.running < self.limit:
+            self.running += 1
+            self.waiting.popleft().callback(None)
+        return result
+
+
+# Pools of power queries, keyed by power type. These live across power
+# monitor sweeps so that the adapted limits are retained.
+power_query_pools = {}
+
+
+def get_power_query_pool(power_type, clock=reactor):
+    """Return the `PowerQueryPool` for `power_type`, creating it if needed.
+
+    The bounds of the pool come from the power driver's `query_concurrency`.
+    """
+    try:
+        return power_query_pools[power_type]
+    except KeyError:
+        driver = PowerDriverRegistry[power_type]
+        minimum, maximum = driver.query_concurrency
+        pool = power_query_pools[power_type] = PowerQueryPool(
+            minimum, maximum, clock=clock)
+        return pool
+
+
+def query_all_nodes(nodes, clock=reactor, jitter=0):
     """Queries the given nodes for their power state.
 
-    Nodes' states are reported back to the region.
+    Nodes' states are reported back to the region. The queries for each
+    power driver run in that driver's `PowerQueryPool`.
 
+    :param jitter: Delay the start of each query by a random amount up to
+        this many seconds, so that BMCs are not all queried in lockstep.
     :return: A deferred, which fires once all nodes have been queried,
         successfully or not.
     """
-    semaphore = DeferredSemaphore(tokens=max_concurrency)
+    if clock is None:
+        clock = reactor
+
+    def query(node):
+        pool = get_power_query_pool(node['power_type'], clock)
+        if jitter > 0:
+            return deferLater(
+                clock, random.uniform(0, jitter),
+                query_node, node, clock, pool)
+        else:
+            return query_node(node, clock, pool)
+
     queries = (
-        semaphore.run(query_node, node, clock)
-        for node in nodes if node['power_type'] in PowerDriverRegistry)
+        query(node) for node in nodes
+        if node['power_type'] in PowerDriverRegistry)
     return DeferredList(queries, consumeErrors=True)
@@ -31,14 +31,18 @@ __all__ = [
     "RequestNodeInfoByMACAddress",
     "SendEvent",
     "SendEventMACAddress",
+    "SendEvents",
     "UpdateInterfaces",
     "UpdateLastImageSync",
+    "UpdateLeases",
     "UpdateNodePowerState",
 ]
 
 from provisioningserver.rpc.arguments import (
     AmpList,
     Bytes,
+    Chunked,
+    CompressedAmpList,
     ParsedURL,
     StructureAsJSON,
 )
@@ -273,14 +277,14 @@ class ListNodePowerParameters(amp.Command):
         (b"uuid", amp.Unicode()),
     ]
     response = [
-        (b"nodes", AmpList(
+        (b"nodes", Chunked(AmpList(
             [(b"system_id", amp.Unicode()),
              (b"hostname", amp.Unicode()),
              (b"power_state", amp.Unicode()),
              (b"power_type", amp.Unicode()),
              # We can't define a tighter schema here because this is a highly
              # variable bag of arguments from a variety of sources.
-             (b"context", StructureAsJSON())])),
+             (b"context", StructureAsJSON())]))),
     ]
     errors = {
         NoSuchCluster: b"NoSuchCluster",
@@ -392,6 +396,30 @@ class SendEventIPAddress(amp.Command):
     }
 
 
+class SendEvents(amp.Command):
+    """Send a batch of events.
+
+    Each event identifies its node by one of `system_id`, `mac_address` or
+    `ip_address`. The region responds once the events have been stored, so
+    events that have not been acknowledged can be sent again.
+
+    :since: 2.5
+    """
+
+    arguments = [
+        (b"events", Chunked(CompressedAmpList([
+            (b"type_name", amp.Unicode()),
+            (b"description", amp.Unicode()),
+            (b"timestamp", amp.DateTime()),
+            (b"system_id", amp.Unicode(optional=True)),
+            (b"mac_address", amp.Unicode(optional=True)),
+            (b"ip_address", amp.Unicode(optional=True)),
+        ]))),
+    ]
+    response = []
+    errors = []
+
+
 class ReportForeignDHCPServer(amp.Command):
     """Report a foreign DHCP server on a rack controller's interface.
 
@@ -555,6 +583,31 @@ class UpdateLease(amp.Command):
     }
 
 
+class UpdateLeases(amp.Command):
+    """Report many DHCP lease updates from a cluster controller at once.
+
+    Each update has the same fields as the arguments to `UpdateLease`. The
+    region applies them in order, in a single transaction.
+
+    :since: 2.5
+    """
+    arguments = [
+        (b"cluster_uuid", amp.Unicode()),
+        (b"updates", CompressedAmpList(
+            [(b"action", amp.Unicode()),
+             (b"mac", amp.Unicode()),
+             (b"ip_family", amp.Unicode()),
+             (b"ip", amp.Unicode()),
+             (b"timestamp", amp.Integer()),
+             (b"lease_time", amp.Integer(optional=True)),
+             (b"hostname", amp.Unicode(optional=True))])),
+    ]
+    response = []
+    errors = {
+        NoSuchCluster: b"NoSuchCluster",
+    }
+
+
 class UpdateServices(amp.Command):
     """Report service statuses that are monitored on the rackd.
 
@@ -160,6 +160,52 @@ class TestCompressedAmpList(MAASTestCase):
             LessThan(2 ** 16))
 
 
+class TestChunked(MAASTestCase):
+
+    def test_small_value_is_sent_as_wrapped_argument_would(self):
+        argument = arguments.Chunked(amp.Unicode())
+        strings = amp.AmpBox()
+        argument.toBox(b"thing", strings, {"thing": "foo"}, proto=None)
+        self.assertEqual({b"thing": b"foo"}, strings)
+
+    def test_large_value_is_sent_in_chunks(self):
+        argument = arguments.Chunked(arguments.Bytes())
+        value = factory.make_bytes(amp.MAX_VALUE_LENGTH * 2 + 1)
+        strings = amp.AmpBox()
+        argument.toBox(b"thing", strings, {"thing": value}, proto=None)
+        self.assertEqual(
+            [b"thing", b"thing.2", b"thing.3"], sorted(strings))
+        self.assertEqual(
+            [amp.MAX_VALUE_LENGTH, amp.MAX_VALUE_LENGTH, 1],
+            [len(strings[key]) for key in sorted(strings)])
+        # The box can be serialised, so each chunk is within AMP's limit.
+        strings.serialize()
+
+    def test_round_trip(self):
+        argument = arguments.Chunked(
+            arguments.AmpList([("thing", amp.Unicode())]))
+        example = [
+            {"thing": factory.make_name("thing", size=100)}
+            for _ in range(2000)
+        ]
+        strings = amp.AmpBox()
+        argument.toBox(b"things", strings, {"things": example}, proto=None)
+        self.assertIn(b"things.2", strings)
+        objects = {}
+        argument.fromBox(b"things", strings, objects, proto=None)
+        self.assertEqual({"things": example}, objects)
+        self.assertEqual({}, strings)
+
+    def test_round_trip_omitted_optional_argument(self):
+        argument = arguments.Chunked(amp.Unicode(optional=True))
+        strings = amp.AmpBox()
+        argument.toBox(b"thing", strings, {}, proto=None)
+        self.assertEqual({}, strings)
+        objects = {}
+        argument.fromBox(b"thing", strings, objects, proto=None)
+        self.assertEqual({"thing": None}, objects)
+
+
 class TestIPAddress(MAASTestCase):
 
     argument = arguments.IPAddress()
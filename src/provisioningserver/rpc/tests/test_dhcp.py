@@ -17,6 +17,7 @@ from unittest.mock import (
 from fixtures import FakeLogger
 from maastesting.factory import factory
 from maastesting.matchers import (
+    MockCalledOnce,
     MockCalledOnceWith,
     MockCallsMatch,
     MockNotCalled,
@@ -412,26 +413,35 @@ class TestCreateHostMap(MAASTestCase):
 
 class TestUpdateHost(MAASTestCase):
 
-    def test__creates_omshell_with_correct_arguments(self):
-        omshell = self.patch(dhcp, "Omshell")
+    def setUp(self):
+        super(TestUpdateHost, self).setUp()
+        self.patch(dhcp, "_omapi_clients", {})
+
+    def make_server(self):
         server = Mock()
         server.ipv6 = factory.pick_bool()
-        dhcp._update_hosts(server, [], [], [])
+        server.dhcp_service = factory.make_name("dhcpd")
+        return server
+
+    def test__creates_omshell_with_correct_arguments(self):
+        omshell = self.patch(dhcp, "Omshell")
+        server = self.make_server()
+        dhcp._update_hosts_with_omshell(server, [], [], [])
         self.assertThat(omshell, MockCallsMatch(
             call(
                 ipv6=server.ipv6, server_address="127.0.0.1",
                 shared_key=server.omapi_key),
         ))
 
-    def test__performs_operations(self):
+    def test__performs_operations_with_omshell(self):
         omshell = Mock()
         self.patch(dhcp, "Omshell").return_value = omshell
         remove_host = make_host()
         add_host = make_host()
         modify_host = make_host()
-        server = Mock()
-        server.ipv6 = factory.pick_bool()
-        dhcp._update_hosts(server, [remove_host], [add_host], [modify_host])
+        server = self.make_server()
+        dhcp._update_hosts_with_omshell(
+            server, [remove_host], [add_host], [modify_host])
         self.assertThat(
             omshell.remove,
             MockCallsMatch(
@@ -448,6 +458,109 @@ class TestUpdateHost(MAASTestCase):
                 call(modify_host["ip"], modify_host["mac"]),
             ))
 
+    def test__creates_omapi_client_with_correct_arguments(self):
+        client = self.patch(dhcp, "OmapiClient")
+        client.return_value.connected = False
+        server = self.make_server()
+        dhcp._update_hosts(server, [], [], [])
+        self.assertThat(client, MockCalledOnceWith(
+            ipv6=server.ipv6, server_address="127.0.0.1",
+            shared_key=server.omapi_key))
+        self.assertThat(client.return_value.connect, MockCalledOnceWith())
+
+    def test__reuses_omapi_client(self):
+        client = self.patch(dhcp, "OmapiClient")
+        client.return_value.shared_key = sentinel.omapi_key
+        client.return_value.connected = True
+        server = self.make_server()
+        server.omapi_key = sentinel.omapi_key
+        dhcp._update_hosts(server, [], [], [])
+        dhcp._update_hosts(server, [], [], [])
+        self.assertThat(client, MockCalledOnce())
+
+    def test__performs_operations_with_omapi(self):
+        client = Mock()
+        client.remove.return_value = {}
+        client.create.return_value = {}
+        client.modify.return_value = {}
+        self.patch(dhcp, "_get_omapi_client").return_value = client
+        remove_host = make_host()
+        add_host = make_host()
+        modify_host = make_host()
+        dhcp._update_hosts(
+            self.make_server(), [remove_host], [add_host], [modify_host])
+        self.assertThat(
+            client.remove, MockCalledOnceWith([remove_host["mac"]]))
+        self.assertThat(
+            client.create,
+            MockCalledOnceWith([(add_host["mac"], add_host["ip"])]))
+        self.assertThat(
+            client.modify,
+            MockCalledOnceWith([(modify_host["mac"], modify_host["ip"])]))
+
+    def test__raises_error_for_failed_omapi_operation(self):
+        client = Mock()
+        add_host = make_host()
+        client.remove.return_value = {}
+        client.create.return_value = {add_host["mac"]: "Oops."}
+        self.patch(dhcp, "_get_omapi_client").return_value = client
+        with FakeLogger("maas.dhcp") as logger:
+            error = self.assertRaises(
+                exceptions.CannotCreateHostMap,
+                dhcp._update_hosts, self.make_server(), [], [add_host], [])
+        message = "Could not create host map for %s -> %s: Oops." % (
+            add_host["mac"], add_host["ip"])
+        self.assertEqual(message, str(error))
+        self.assertDocTestMatches(message, logger.output)
+
+    def test__retries_once_when_omapi_connection_lost(self):
+        client = Mock()
+        client.remove.side_effect = [dhcp.OmapiError(), {}]
+        client.create.return_value = {}
+        client.modify.return_value = {}
+        get_omapi_client = self.patch(dhcp, "_get_omapi_client")
+        get_omapi_client.return_value = client
+        dhcp._update_hosts(self.make_server(), [], [], [])
+        self.assertEqual(2, get_omapi_client.call_count)
+        self.assertEqual(2, client.remove.call_count)
+
+    def test__falls_back_to_omshell_when_omapi_reconnect_fails(self):
+        client = Mock()
+        client.remove.side_effect = dhcp.OmapiError()
+        self.patch(dhcp, "_get_omapi_client").side_effect = [
+            client, dhcp.OmapiError()]
+        update_hosts_with_omshell = self.patch(
+            dhcp, "_update_hosts_with_omshell")
+        server = self.make_server()
+        remove_host = make_host()
+        dhcp._update_hosts(server, [remove_host], [], [])
+        self.assertThat(update_hosts_with_omshell, MockCalledOnceWith(
+            server, [remove_host], [], []))
+
+    def test__falls_back_to_omshell_when_omapi_retry_fails(self):
+        client = Mock()
+        client.remove.side_effect = dhcp.OmapiError()
+        get_omapi_client = self.patch(dhcp, "_get_omapi_client")
+        get_omapi_client.return_value = client
+        update_hosts_with_omshell = self.patch(
+            dhcp, "_update_hosts_with_omshell")
+        server = self.make_server()
+        dhcp._update_hosts(server, [], [], [])
+        self.assertEqual(2, client.remove.call_count)
+        self.assertThat(update_hosts_with_omshell, MockCalledOnceWith(
+            server, [], [], []))
+
+    def test__falls_back_to_omshell_when_omapi_unreachable(self):
+        self.patch(dhcp, "_get_omapi_client").side_effect = (
+            dhcp.OmapiError())
+        update_hosts_with_omshell = self.patch(
+            dhcp, "_update_hosts_with_omshell")
+        server = self.make_server()
+        dhcp._update_hosts(
+            server, sentinel.remove, sentinel.add, sentinel.modify)
+        self.assertThat(update_hosts_with_omshell, MockCalledOnceWith(
+            server, sentinel.remove, sentinel.add, sentinel.modify))
+
 
 class TestConfigureDHCP(MAASTestCase):
 
@@ -875,7 +988,7 @@ class TestConfigureDHCP(MAASTestCase):
         added_host = make_host(dhcp_snippets=[])
         new_hosts.append(added_host)
 
-        with FakeLogger("maas") as logger:
+        with FakeLogger("maas.dhcp") as logger:
             yield self.configure(
                 omapi_key,
                 [failover_peers], [shared_network], new_hosts, [interface],
@@ -958,7 +1071,7 @@ class TestConfigureDHCP(MAASTestCase):
         self.patch_sudo_write_file()
         self.patch_sudo_delete_file()
         self.patch_ensureService().side_effect = ServiceActionError()
-        with FakeLogger("maas") as logger:
+        with FakeLogger("maas.dhcp") as logger:
             with ExpectedException(exceptions.CannotConfigureDHCP):
                 yield self.configure(
                     factory.make_name('key'), [], [], [], [], [])
@@ -970,7 +1083,7 @@ class TestConfigureDHCP(MAASTestCase):
         self.patch_sudo_delete_file()
         self.patch_ensureService().side_effect = (
             factory.make_exception("DHCP is on strike today"))
-        with FakeLogger("maas") as logger:
+        with FakeLogger("maas.dhcp") as logger:
             with ExpectedException(exceptions.CannotConfigureDHCP):
                 yield self.configure(
                     factory.make_name('key'), [], [], [], [], [])
@@ -985,7 +1098,7 @@ class TestConfigureDHCP(MAASTestCase):
         failover_peers = [make_failover_peer_config()]
         shared_networks = fix_shared_networks_failover(
             [make_shared_network()], failover_peers)
-        with FakeLogger("maas") as logger:
+        with FakeLogger("maas.dhcp") as logger:
             with ExpectedException(exceptions.CannotConfigureDHCP):
                 yield self.configure(
                     factory.make_name('key'),
@@ -1002,7 +1115,7 @@ class TestConfigureDHCP(MAASTestCase):
         failover_peers = [make_failover_peer_config()]
         shared_networks = fix_shared_networks_failover(
             [make_shared_network()], failover_peers)
-        with FakeLogger("maas") as logger:
+        with FakeLogger("maas.dhcp") as logger:
             with ExpectedException(exceptions.CannotConfigureDHCP):
                 yield self.configure(
                     factory.make_name('key'),
@@ -965,6 +965,7 @@ class TestPowerQueryAsync(MAASTestCase):
 
     def setUp(self):
         super(TestPowerQueryAsync, self).setUp()
+        self.patch(power, "power_query_pools", {})
 
     def make_node(self, power_type=None):
         system_id = factory.make_name('system_id')
@@ -1179,3 +1180,88 @@ class TestPowerQueryAsync(MAASTestCase):
         self.assertEqual(
             [(True, node1['power_state']), (True, node2['power_state'])],
             results)
+
+    @inlineCallbacks
+    def test_query_all_nodes_uses_pool_for_power_type(self):
+        node1, node2 = self.make_nodes(2)
+        get_power_state = self.patch(power, 'get_power_state')
+        get_power_state.side_effect = [
+            succeed(node1['power_state']),
+            succeed(node2['power_state']),
+        ]
+        suppress_reporting(self)
+
+        yield power.query_all_nodes([node1, node2])
+        self.assertItemsEqual(
+            {node1['power_type'], node2['power_type']},
+            power.power_query_pools)
+
+    def test_query_all_nodes_jitters_query_start(self):
+        node = self.make_node()
+        get_power_state = self.patch(power, 'get_power_state')
+        get_power_state.return_value = succeed(node['power_state'])
+        suppress_reporting(self)
+        clock = Clock()
+
+        d = power.query_all_nodes([node], clock=clock, jitter=5)
+        self.assertThat(get_power_state, MockNotCalled())
+        clock.advance(5)
+        self.assertThat(get_power_state, MockCalledOnceWith(
+            node['system_id'], node['hostname'],
+            node['power_type'], node['context'], clock=clock))
+        self.assertEqual([(True, node['power_state'])], extract_result(d))
+
+
+class TestPowerQueryPool(MAASTestCase):
+
+    def test_runs_up_to_limit_at_once(self):
+        pool = power.PowerQueryPool(1, 2, clock=Clock())
+        queries = [Deferred() for _ in range(3)]
+        results = [pool.run(lambda d: d, query) for query in queries]
+        self.assertEqual(2, pool.running)
+        self.assertEqual(1, len(pool.waiting))
+        queries[0].callback(sentinel.result)
+        self.assertEqual(sentinel.result, extract_result(results[0]))
+        self.assertEqual(2, pool.running)
+        self.assertEqual(0, len(pool.waiting))
+
+    def test_increases_limit_on_fast_success(self):
+        pool = power.PowerQueryPool(1, 4, clock=Clock())
+        pool.limit = 2
+        extract_result(pool.run(lambda: None))
+        self.assertEqual(3, pool.limit)
+
+    def test_never_exceeds_maximum(self):
+        pool = power.PowerQueryPool(1, 2, clock=Clock())
+        extract_result(pool.run(lambda: None))
+        self.assertEqual(2, pool.limit)
+
+    def test_halves_limit_on_failure(self):
+        pool = power.PowerQueryPool(1, 8, clock=Clock())
+        d = pool.run(fail, factory.make_exception())
+        self.assertRaises(Exception, extract_result, d)
+        self.assertEqual(4, pool.limit)
+
+    def test_halves_limit_on_slow_query(self):
+        clock = Clock()
+        pool = power.PowerQueryPool(1, 8, clock=clock)
+        query = Deferred()
+        d = pool.run(lambda: query)
+        clock.advance(pool.target_latency + 1)
+        query.callback(None)
+        extract_result(d)
+        self.assertEqual(4, pool.limit)
+
+    def test_never_goes_below_minimum(self):
+        pool = power.PowerQueryPool(2, 2, clock=Clock())
+        d = pool.run(fail, factory.make_exception())
+        self.assertRaises(Exception, extract_result, d)
+        self.assertEqual(2, pool.limit)
+
+    def test_get_power_query_pool_uses_driver_bounds(self):
+        self.patch(power, "power_query_pools", {})
+        pool = power.get_power_query_pool("redfish")
+        driver = PowerDriverRegistry["redfish"]
+        self.assertEqual(
+            driver.query_concurrency, (pool.minimum, pool.maximum))
+        self.assertIs(pool, power.get_power_query_pool("redfish"))
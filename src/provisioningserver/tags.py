@@ -4,6 +4,8 @@
 """Cluster-side evaluation of tags."""
 
 __all__ = [
+    'DetailsDocumentCache',
+    'get_compiled_xpath',
     'merge_details',
     'merge_details_cleanly',
     'process_node_tags',
@@ -13,6 +15,7 @@ from collections import OrderedDict
 from functools import partial
 import http.client
 import json
+import threading
 import urllib.error
 import urllib.parse
 import urllib.request
@@ -227,6 +230,92 @@ def merge_details_cleanly(details):
     return _details_do_merge(details, root)
 
 
+class DetailsDocumentCache:
+    """A bounded cache of merged node details documents.
+
+    Each document is stored with the version of the details it was merged
+    from, and is only returned while that version is still current. The
+    least recently used documents are evicted once there are more than
+    `max_size` of them.
+
+    :ivar hits: The number of times `get` has returned a document.
+    :ivar misses: The number of times `get` has returned `None`.
+    """
+
+    def __init__(self, max_size=1000):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Return the document for `key` at `version`, or `None`."""
+        with self._lock:
+            try:
+                cached_version, document = self._documents[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if cached_version != version:
+                del self._documents[key]
+                self.misses += 1
+                return None
+            self._documents.move_to_end(key)
+            self.hits += 1
+            return document
+
+    def set(self, key, version, document):
+        """Store `document` for `key` at `version`."""
+        with self._lock:
+            self._documents[key] = version, document
+            self._documents.move_to_end(key)
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+
+    def clear(self):
+        """Forget all documents."""
+        with self._lock:
+            self._documents.clear()
+
+    def __contains__(self, key):
+        return key in self._documents
+
+    def __len__(self):
+        return len(self._documents)
+
+
+# Compiled XPath expressions, per thread. See `get_compiled_xpath`.
+_compiled_xpaths = threading.local()
+
+# The most compiled XPath expressions to keep for each thread.
+COMPILED_XPATH_CACHE_SIZE = 256
+
+
+def get_compiled_xpath(definition, namespaces):
+    """Return the XPath expression `definition` compiled with `namespaces`.
+
+    Compiled expressions are cached per thread, so that each is compiled
+    once per thread and never evaluated concurrently.
+
+    :raise etree.XPathSyntaxError: If `definition` is not valid.
+    """
+    try:
+        cache = _compiled_xpaths.cache
+    except AttributeError:
+        cache = _compiled_xpaths.cache = OrderedDict()
+    key = definition, tuple(sorted(namespaces.items()))
+    try:
+        xpath = cache[key]
+    except KeyError:
+        xpath = cache[key] = etree.XPath(definition, namespaces=namespaces)
+        while len(cache) > COMPILED_XPATH_CACHE_SIZE:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return xpath
+
+
 def gen_batch_slices(count, size):
     """Generate `slice`s to split `count` objects into batches.
 
@@ -307,7 +396,7 @@ def process_node_tags(
     """
     # We evaluate this early, so we can fail before sending a bunch of data to
     # the server
-    xpath = etree.XPath(tag_definition, namespaces=tag_nsmap)
+    xpath = get_compiled_xpath(tag_definition, tag_nsmap)
     system_ids = [
         node["system_id"]
         for node in nodes
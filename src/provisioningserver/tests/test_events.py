@@ -9,6 +9,8 @@ __all__ = [
 import random
 from unittest.mock import (
     ANY,
+    call,
+    Mock,
     sentinel,
 )
 
@@ -16,12 +18,14 @@ from maastesting.factory import factory
 from maastesting.matchers import (
     MockCalledOnce,
     MockCalledOnceWith,
+    MockCallsMatch,
     MockNotCalled,
 )
 from maastesting.testcase import (
     MAASTestCase,
     MAASTwistedRunTest,
 )
+from provisioningserver import events
 from provisioningserver.events import (
     EVENT_DETAILS,
     EVENT_TYPES,
@@ -35,6 +39,7 @@ from provisioningserver.events import (
 )
 from provisioningserver.rpc import region
 from provisioningserver.rpc.exceptions import (
+    NoConnectionsAvailable,
     NoSuchEventType,
     NoSuchNode,
 )
@@ -54,6 +59,8 @@ from twisted.internet.defer import (
     inlineCallbacks,
     succeed,
 )
+from twisted.internet.task import Clock
+from twisted.protocols.amp import UnhandledCommand
 
 
 class TestEvents(MAASTestCase):
@@ -93,12 +100,12 @@ class TestSendEventNodeMACAddress(MAASTestCase):
 class TestSendEventNodeIPAddress(MAASTestCase):
     """Tests for `send_node_event_mac_address`."""
 
-    def test__calls_singleton_hub_logByIP_directly(self):
-        self.patch(nodeEventHub, "logByIP").return_value = sentinel.d
+    def test__calls_singleton_hub_queueByIP_directly(self):
+        self.patch(nodeEventHub, "queueByIP").return_value = sentinel.d
         result = send_node_event_ip_address(
             sentinel.event_type, sentinel.ip_address, sentinel.description)
         self.assertThat(result, Is(sentinel.d))
-        self.assertThat(nodeEventHub.logByIP, MockCalledOnceWith(
+        self.assertThat(nodeEventHub.queueByIP, MockCalledOnceWith(
             sentinel.event_type, sentinel.ip_address, sentinel.description))
 
 
@@ -388,3 +395,166 @@ class TestSendEventIPAddress(MAASTestCase):
             yield event_hub.logByIP(event_name, ip_address, description)
         # The event has been removed from the cache.
         self.assertThat(event_hub._types_registered, HasLength(0))
+
+
+class TestNodeEventHubQueue(MAASTestCase):
+    """Tests for `NodeEventHub.queueByID`, `queueByMAC` and `queueByIP`."""
+
+    run_tests_with = MAASTwistedRunTest.make_factory(timeout=5)
+
+    def make_event_hub(self):
+        event_hub = NodeEventHub(clock=Clock())
+        event_hub._types_registered.update(EVENT_DETAILS)
+        return event_hub
+
+    def patch_client(self, *side_effect):
+        client = Mock(side_effect=side_effect)
+        self.patch(events, "getRegionClient").return_value = client
+        return client
+
+    def flush(self, event_hub):
+        flushing = event_hub._flushing
+        event_hub.clock.advance(event_hub.flushDelay)
+        return flushing
+
+    @inlineCallbacks
+    def test__events_are_sent_to_region_in_one_call(self):
+        fixture = self.useFixture(MockLiveClusterToRegionRPCFixture())
+        protocol, connecting = fixture.makeEventLoop(region.SendEvents)
+        self.addCleanup((yield connecting))
+
+        event_hub = self.make_event_hub()
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        system_id = factory.make_name('system_id')
+        mac_address = factory.make_mac_address()
+        ip_address = factory.make_ip_address()
+        event_hub.queueByID(event_name, system_id, "by id")
+        event_hub.queueByMAC(event_name, mac_address, "by mac")
+        event_hub.queueByIP(event_name, ip_address, "by ip")
+        self.assertThat(protocol.SendEvents, MockNotCalled())
+        yield self.flush(event_hub)
+
+        self.assertThat(protocol.SendEvents, MockCalledOnceWith(
+            ANY, events=ANY))
+        [sent] = [
+            call[1]["events"] for call in protocol.SendEvents.call_args_list]
+        self.assertEqual([
+            (event_name, "by id", system_id, None, None),
+            (event_name, "by mac", None, mac_address, None),
+            (event_name, "by ip", None, None, ip_address),
+        ], [
+            (event["type_name"], event["description"], event["system_id"],
+             event["mac_address"], event["ip_address"])
+            for event in sent
+        ])
+
+    @inlineCallbacks
+    def test__events_are_sent_in_batches(self):
+        client = self.patch_client(succeed({}), succeed({}))
+        event_hub = self.make_event_hub()
+        event_hub.batchSize = 2
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        for _ in range(3):
+            event_hub.queueByIP(event_name, factory.make_ip_address())
+        yield self.flush(event_hub)
+        self.assertEqual(
+            [2, 1], [
+                len(call[1]["events"]) for call in client.call_args_list])
+        self.assertThat(event_hub._queue, HasLength(0))
+
+    @inlineCallbacks
+    def test__events_are_kept_until_the_region_can_be_reached(self):
+        client = Mock(return_value=succeed({}))
+        self.patch(events, "getRegionClient").side_effect = [
+            NoConnectionsAvailable(), client]
+        event_hub = self.make_event_hub()
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        system_id = factory.make_name('system_id')
+        event_hub.queueByID(event_name, system_id)
+        flushing = event_hub._flushing
+        event_hub.clock.advance(event_hub.flushDelay)
+        self.assertThat(client, MockNotCalled())
+        self.assertThat(event_hub._queue, HasLength(1))
+        event_hub.clock.advance(event_hub.retryDelay)
+        yield flushing
+        self.assertThat(client, MockCalledOnceWith(
+            region.SendEvents, events=ANY))
+        self.assertThat(event_hub._queue, HasLength(0))
+
+    @inlineCallbacks
+    def test__events_are_sent_one_at_a_time_to_older_regions(self):
+        client = self.patch_client(
+            fail(UnhandledCommand()), succeed({}), fail(NoSuchNode()))
+        event_hub = self.make_event_hub()
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        system_id = factory.make_name('system_id')
+        ip_address = factory.make_ip_address()
+        event_hub.queueByID(event_name, system_id, "by id")
+        event_hub.queueByIP(event_name, ip_address, "by ip")
+        yield self.flush(event_hub)
+        self.assertThat(client, MockCallsMatch(
+            call(region.SendEvents, events=ANY),
+            call(
+                region.SendEvent, system_id=system_id,
+                type_name=event_name, description="by id"),
+            call(
+                region.SendEventIPAddress, ip_address=ip_address,
+                type_name=event_name, description="by ip"),
+        ))
+        self.assertThat(event_hub._queue, HasLength(0))
+
+    def test__events_are_kept_while_no_region_can_be_reached(self):
+        self.patch(events, "getRegionClient").side_effect = (
+            NoConnectionsAvailable())
+        event_hub = self.make_event_hub()
+        event_hub.maxRetries = 1
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        event_hub.queueByID(event_name, factory.make_name('system_id'))
+        event_hub.clock.advance(event_hub.flushDelay)
+        for _ in range(3):
+            event_hub.clock.advance(event_hub.retryDelay)
+        self.assertThat(event_hub._queue, HasLength(1))
+        self.assertIsNotNone(event_hub._flushing)
+
+    @inlineCallbacks
+    def test__failing_batches_are_split_and_failing_events_dropped(self):
+        def send(command, events):
+            if any(event["description"] == "bad" for event in events):
+                return fail(ZeroDivisionError())
+            else:
+                sent.append([event["description"] for event in events])
+                return succeed({})
+
+        sent = []
+        self.patch(events, "getRegionClient").return_value = send
+        warning = self.patch(events.maaslog, "warning")
+        event_hub = self.make_event_hub()
+        event_hub.maxRetries = 2
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        for description in ("one", "bad", "two", "three"):
+            event_hub.queueByID(
+                event_name, factory.make_name('system_id'), description)
+        flushing = event_hub._flushing
+        event_hub.clock.advance(event_hub.flushDelay)
+        for _ in range(5):
+            event_hub.clock.advance(event_hub.retryDelay)
+        yield flushing
+        self.assertEqual([["one"], ["two", "three"]], sent)
+        self.assertThat(warning, MockCalledOnceWith(
+            ANY, event_name, 2, ANY))
+        self.assertThat(event_hub._queue, HasLength(0))
+
+    def test__events_beyond_queue_size_are_dropped(self):
+        event_hub = self.make_event_hub()
+        event_hub.queueSize = 1
+        event_name = random.choice(list(map_enum(EVENT_TYPES)))
+        event_hub.queueByID(event_name, factory.make_name('system_id'))
+        event_hub.queueByID(event_name, factory.make_name('system_id'))
+        self.assertThat(event_hub._queue, HasLength(1))
+
+    def test__unknown_event_types_are_rejected(self):
+        event_hub = self.make_event_hub()
+        self.assertRaises(
+            KeyError, event_hub.queueByID,
+            factory.make_name('event'), factory.make_name('system_id'))
+        self.assertThat(event_hub._queue, HasLength(0))
@@ -10,6 +10,7 @@ import http.client
 from itertools import chain
 import json
 from textwrap import dedent
+import threading
 from unittest.mock import (
     call,
     MagicMock,
@@ -352,6 +353,57 @@ class TestMergeDetails(TestMergeDetailsCleanly):
             self.logger.output)
 
 
+class TestDetailsDocumentCache(MAASTestCase):
+
+    def test_get_returns_document_at_version(self):
+        cache = tags.DetailsDocumentCache()
+        cache.set(sentinel.key, sentinel.version, sentinel.document)
+        self.assertIs(
+            sentinel.document, cache.get(sentinel.key, sentinel.version))
+
+    def test_get_returns_None_for_unknown_key(self):
+        cache = tags.DetailsDocumentCache()
+        self.assertIsNone(cache.get(sentinel.key, sentinel.version))
+
+    def test_get_discards_document_at_other_version(self):
+        cache = tags.DetailsDocumentCache()
+        cache.set(sentinel.key, sentinel.version, sentinel.document)
+        self.assertIsNone(cache.get(sentinel.key, sentinel.other))
+        self.assertEqual(0, len(cache))
+
+    def test_set_evicts_least_recently_used(self):
+        cache = tags.DetailsDocumentCache(max_size=2)
+        cache.set(sentinel.key1, sentinel.version, sentinel.document1)
+        cache.set(sentinel.key2, sentinel.version, sentinel.document2)
+        cache.get(sentinel.key1, sentinel.version)
+        cache.set(sentinel.key3, sentinel.version, sentinel.document3)
+        self.assertIsNone(cache.get(sentinel.key2, sentinel.version))
+        self.assertIs(
+            sentinel.document1, cache.get(sentinel.key1, sentinel.version))
+        self.assertIs(
+            sentinel.document3, cache.get(sentinel.key3, sentinel.version))
+
+    def test_contains_keys_with_documents(self):
+        cache = tags.DetailsDocumentCache()
+        cache.set(sentinel.key, sentinel.version, sentinel.document)
+        self.assertIn(sentinel.key, cache)
+        self.assertNotIn(sentinel.other, cache)
+
+    def test_get_counts_hits_and_misses(self):
+        cache = tags.DetailsDocumentCache()
+        cache.set(sentinel.key, sentinel.version, sentinel.document)
+        cache.get(sentinel.key, sentinel.version)
+        cache.get(sentinel.other, sentinel.version)
+        cache.get(sentinel.key, sentinel.other)
+        self.assertEqual((1, 2), (cache.hits, cache.misses))
+
+    def test_clear_forgets_all_documents(self):
+        cache = tags.DetailsDocumentCache()
+        cache.set(sentinel.key, sentinel.version, sentinel.document)
+        cache.clear()
+        self.assertIsNone(cache.get(sentinel.key, sentinel.version))
+
+
 class TestGenBatchSlices(MAASTestCase):
 
     def test_batch_of_1_no_things(self):
@@ -448,16 +500,17 @@ class TestGenNodeDetails(MAASTestCase):
         This means we can test code that uses `merge_details` without
         having to come up with example XML and match on it later.
         """
-        self.patch(
-            tags, "merge_details",
+        merge_details = self.patch(tags, "merge_details")
+        merge_details.side_effect = (
             lambda mapping: "merged:" + "+".join(mapping))
+        return merge_details
 
     def test__generates_node_details(self):
         batches = [["s1", "s2"], ["s3"]]
         responses = [
-            {"s1": {"foo": "<node>s1</node>"},
-             "s2": {"bar": "<node>s2</node>"}},
-            {"s3": {"cob": "<node>s3</node>"}},
+            {"s1": {"foo": b"<node>s1</node>"},
+             "s2": {"bar": b"<node>s2</node>"}},
+            {"s3": {"cob": b"<node>s3</node>"}},
         ]
         get_details_for_nodes = self.patch(tags, "get_details_for_nodes")
         get_details_for_nodes.side_effect = lambda *args: responses.pop(0)
@@ -472,6 +525,41 @@ class TestGenNodeDetails(MAASTestCase):
             get_details_for_nodes.mock_calls)
 
 
+class TestGetCompiledXPath(MAASTestCase):
+
+    def test_returns_compiled_expression(self):
+        xpath = tags.get_compiled_xpath("//foo:bar", {"foo": "foo"})
+        self.assertIsInstance(xpath, etree.XPath)
+        self.assertEqual("//foo:bar", xpath.path)
+
+    def test_reuses_compiled_expression(self):
+        self.assertIs(
+            tags.get_compiled_xpath("//node", {"foo": "foo"}),
+            tags.get_compiled_xpath("//node", {"foo": "foo"}))
+
+    def test_distinguishes_namespaces(self):
+        self.assertIsNot(
+            tags.get_compiled_xpath("//node", {"foo": "foo"}),
+            tags.get_compiled_xpath("//node", {"bar": "bar"}))
+
+    def test_evicts_least_recently_used(self):
+        self.patch(tags, "COMPILED_XPATH_CACHE_SIZE", 2)
+        self.patch(tags, "_compiled_xpaths", threading.local())
+        first = tags.get_compiled_xpath("//a", {})
+        tags.get_compiled_xpath("//b", {})
+        tags.get_compiled_xpath("//a", {})
+        tags.get_compiled_xpath("//c", {})
+        self.assertIs(first, tags.get_compiled_xpath("//a", {}))
+        self.assertEqual(
+            ["//c", "//a"], [
+                definition for definition, _
+                in tags._compiled_xpaths.cache])
+
+    def test_raises_syntax_errors(self):
+        self.assertRaises(
+            etree.XPathSyntaxError, tags.get_compiled_xpath, "//[", {})
+
+
 class TestTagUpdating(MAASTestCase):
 
     def setUp(self):
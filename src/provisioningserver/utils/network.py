@@ -19,6 +19,7 @@ __all__ = [
     'ip_range_within_network',
 ]
 
+from bisect import bisect_right
 import codecs
 from collections import namedtuple
 from operator import attrgetter
@@ -423,6 +424,18 @@ class MAASIPSet(set):
         self.ranges = _normalize_ipranges(self.ranges)
         self.ranges = _combine_overlapping_maasipranges(self.ranges)
         self.ranges = _coalesce_adjacent_purposes(self.ranges)
+        # The condensed ranges are sorted and do not overlap, so the range
+        # holding an address can be found by bisecting their bounds.
+        self._firsts = [item.first for item in self.ranges]
+        self._lasts = [item.last for item in self.ranges]
+
+    def _find_value(self, value) -> Optional[MAASIPRange]:
+        """Return the range holding the integer address `value`, or None."""
+        index = bisect_right(self._firsts, value) - 1
+        if index >= 0 and value <= self._lasts[index]:
+            return self.ranges[index]
+        else:
+            return None
 
     def __ior__(self, other):
         """Return self |= other."""
@@ -441,31 +454,48 @@ class MAASIPSet(set):
         within that range.)
         """
         if isinstance(search, IPRange):
-            for item in self.ranges:
-                if (item.first <= search.first <= item.last and
-                        item.first <= search.last <= item.last):
-                    return item
+            item = self._find_value(search.first)
+            if item is not None and search.last <= item.last:
+                return item
         else:
-            addr = IPAddress(search)
-            addr = int(addr)
-            for item in self.ranges:
-                if item.first <= addr <= item.last:
-                    return item
+            return self._find_value(int(IPAddress(search)))
         return None
 
+    def find_many(self, searches: Iterable) -> List[Optional[MAASIPRange]]:
+        """Find the range holding each of the addresses in `searches`.
+
+        This is equivalent to calling `find` for each address, but makes a
+        single pass over the ranges in this set.
+
+        :return: A list with, for each address in `searches`, the range it
+            belongs to, or None.
+        """
+        values = [int(IPAddress(search)) for search in searches]
+        found = [None] * len(values)
+        index, count = 0, len(self.ranges)
+        for position in sorted(range(len(values)), key=values.__getitem__):
+            value = values[position]
+            while index < count and self._lasts[index] < value:
+                index += 1
+            if index == count:
+                break
+            elif self._firsts[index] <= value:
+                found[position] = self.ranges[index]
+        return found
+
     @property
     def first(self) -> Optional[MAASIPRange]:
         """Returns the first IP address in this set."""
-        if len(self.ranges) > 0:
-            return self.ranges[0].first
+        if len(self._firsts) > 0:
+            return self._firsts[0]
         else:
             return None
 
     @property
     def last(self) -> Optional[MAASIPRange]:
         """Returns the last IP address in this set."""
-        if len(self.ranges) > 0:
-            return self.ranges[-1].last
+        if len(self._lasts) > 0:
+            return self._lasts[-1]
         else:
             return None
 
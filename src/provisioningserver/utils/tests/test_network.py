@@ -884,6 +884,34 @@ class TestMAASIPSet(MAASTestCase):
         self.assertThat(str(IPAddress(s1.first)), Equals("10.0.0.1"))
         self.assertThat(str(IPAddress(s1.last)), Equals("10.0.0.8"))
 
+    def test__find_returns_range_holding_address(self):
+        range1 = make_iprange('10.0.0.1', '10.0.0.100', purpose="foo")
+        range2 = make_iprange('10.0.0.150', purpose="bar")
+        range3 = make_iprange('10.0.0.200', '10.0.0.254', purpose="foo")
+        s = MAASIPSet([range3, range1, range2])
+        self.assertThat(s.find('10.0.0.1'), Equals(range1))
+        self.assertThat(s.find('10.0.0.100'), Equals(range1))
+        self.assertThat(s.find('10.0.0.150'), Equals(range2))
+        self.assertThat(s.find(IPAddress('10.0.0.254')), Equals(range3))
+        self.assertIsNone(s.find('10.0.0.0'))
+        self.assertIsNone(s.find('10.0.0.149'))
+        self.assertIsNone(s.find('10.0.0.255'))
+
+    def test__find_many_returns_range_for_each_address(self):
+        range1 = make_iprange('10.0.0.1', '10.0.0.100', purpose="foo")
+        range2 = make_iprange('10.0.0.200', '10.0.0.254', purpose="bar")
+        s = MAASIPSet([range1, range2])
+        self.assertThat(
+            s.find_many([
+                '10.0.0.254', '10.0.0.0', IPAddress('10.0.0.50'),
+                '10.0.0.150', '10.0.0.1', '10.0.0.255', '10.0.0.50']),
+            Equals([range2, None, range1, None, range1, None, range1]))
+
+    def test__find_many_returns_nothing_for_empty_set(self):
+        s = MAASIPSet([])
+        self.assertThat(s.find_many(['10.0.0.1']), Equals([None]))
+        self.assertThat(s.find_many([]), Equals([]))
+
 
 class TestIPRangeStatistics(MAASTestCase):
 